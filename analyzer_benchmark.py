@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+JSFX Function Analyzer Benchmark
+
+Generates a synthetic JSFX tree and times each phase of function_analyzer2.py
+against it, so we can see how the analyzer scales as the codebase grows.
+
+Usage: python3 analyzer_benchmark.py [options]
+
+Example:
+    python3 analyzer_benchmark.py                                  # Default corpus, 3 repeats
+    python3 analyzer_benchmark.py --modules 200 --functions 40     # Larger tree
+    python3 analyzer_benchmark.py --body-lines 60 --nesting 6      # Long, deeply nested functions
+    python3 analyzer_benchmark.py --keep-corpus ./bench_corpus     # Keep the generated tree
+    python3 analyzer_benchmark.py --results bench_results.jsonl    # Append results for tracking
+
+Corpus options:
+- --modules: number of .jsfx-inc modules (grouped into phase folders of 8)
+- --functions: functions declared per module
+- --body-lines: statements per function body (controls file size)
+- --call-density: probability that a statement calls a previously declared function
+- --multiline-local: fraction of functions whose local() list spans several lines
+- --nesting: maximum parenthesis nesting depth in generated expressions
+
+Each run records wall time per phase (load_modules, parse_imports,
+parse_function_declarations, parse_function_calls, the four checks and
+generate_report) together with the corpus parameters, analyzer version and git
+revision. Results are printed and, with --results, appended as one JSON line.
+"""
+
+import argparse
+import io
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from function_analyzer2 import ANALYZER_VERSION, JSFXFunctionAnalyzer
+
+
+MODULES_PER_FOLDER = 8
+
+
+def _expression(rng: random.Random, names: List[str], depth: int) -> str:
+    """Build a random arithmetic expression with up to `depth` levels of parentheses"""
+    if depth <= 0 or rng.random() < 0.3:
+        return rng.choice(names + [f"{rng.uniform(0, 10):.3f}"])
+    op = rng.choice(['+', '-', '*', '/'])
+    inner = f"{_expression(rng, names, depth - 1)} {op} {_expression(rng, names, depth - 1)}"
+    if rng.random() < 0.3:
+        return f"{rng.choice(['min', 'max'])}({inner}, {_expression(rng, names, depth - 1)})"
+    return f"({inner})"
+
+
+def generate_corpus(root: Path, modules: int = 40, functions: int = 20, body_lines: int = 12,
+                    call_density: float = 0.3, multiline_local: float = 0.25, nesting: int = 4,
+                    seed: int = 1) -> Dict[str, int]:
+    """Write a synthetic JSFX tree under `root` and return its size statistics
+
+    Functions only call functions declared before them (in earlier modules or
+    earlier in the same module), so the generated tree analyzes cleanly.
+    """
+    rng = random.Random(seed)
+    declared: List[tuple] = []  # (name, param_count)
+    imports = []
+    total_lines = 0
+    total_calls = 0
+
+    for m in range(modules):
+        folder = f"{m // MODULES_PER_FOLDER + 1:02d}_Phase"
+        relative = f"{folder}/{m % MODULES_PER_FOLDER + 1:02d}_module_{m}.jsfx-inc"
+        lines = [f"// Synthetic module {m}", "", "@init", ""]
+
+        for f in range(functions):
+            name = f"m{m}_func_{f}"
+            params = [f"p{i}" for i in range(rng.randint(0, 4))]
+            locals_ = [f"t{i}" for i in range(rng.randint(1, 5))]
+            names = params + locals_
+
+            lines.append(f"//--- {name}: generated function ---")
+            if rng.random() < multiline_local:
+                lines.append(f"function {name}({', '.join(params)}) local(")
+                for i in range(0, len(locals_), 2):
+                    lines.append(f"  {', '.join(locals_[i:i + 2])}{',' if i + 2 < len(locals_) else ''}")
+                lines.append(") (")
+            else:
+                lines.append(f"function {name}({', '.join(params)}) local({', '.join(locals_)}) (")
+
+            for _ in range(body_lines):
+                target = rng.choice(locals_)
+                expression = _expression(rng, names, nesting)
+                if declared and rng.random() < call_density:
+                    callee, callee_params = rng.choice(declared[-200:])
+                    args = ', '.join(_expression(rng, names, nesting - 1) for _ in range(callee_params))
+                    expression = f"{expression} + {callee}({args})"
+                    total_calls += 1
+                lines.append(f"  {target} = {expression}; // update {target}")
+            lines.append(f"  {locals_[0]}")
+            lines.append(");")
+            lines.append("")
+            declared.append((name, len(params)))
+
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        imports.append(relative)
+        total_lines += len(lines)
+
+    main_lines = ["desc:Synthetic benchmark plugin", "",
+                  "slider1:gain_db=0<-24,24,0.1>Gain (dB)", ""]
+    main_lines += [f"import {relative}" for relative in imports]
+    main_lines += ["", "@sample"]
+    for name, param_count in declared[-10:]:
+        main_lines.append(f"spl0 = {name}({', '.join(['spl0'] * param_count)});")
+    (root / "benchmark.jsfx").write_text('\n'.join(main_lines) + '\n', encoding='utf-8')
+
+    return {'files': modules + 1, 'lines': total_lines + len(main_lines),
+            'declarations': len(declared), 'calls': total_calls}
+
+
+def time_phases(base_path: Path, use_cache: bool = False, jobs: int = 1) -> Dict[str, float]:
+    """Run every analyzer phase once and return {phase: seconds}"""
+    timings = {}
+    # The report is rendered into memory so terminal or disk speed does not skew it
+    analyzer = JSFXFunctionAnalyzer(str(base_path), use_cache=use_cache, verbose=False, output=io.StringIO())
+
+    def timed(phase, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[phase] = time.perf_counter() - start
+        return result
+
+    timed('load_modules', analyzer.load_modules, jobs=jobs)
+    timed('parse_imports', analyzer.parse_imports)
+    timed('parse_function_declarations', analyzer.parse_function_declarations)
+    timed('parse_function_calls', analyzer.parse_function_calls)
+    undeclared = timed('analyze_function_usage', analyzer.analyze_function_usage)
+    order = timed('check_intra_file_function_order', analyzer.check_intra_file_function_order)
+    parameters = timed('check_parameter_mismatches', analyzer.check_parameter_mismatches)
+    unused = timed('check_unused_functions', analyzer.check_unused_functions)
+    timed('generate_report', analyzer.generate_report, undeclared, order, parameters, unused)
+    timings['total'] = sum(timings.values())
+    return timings
+
+
+def _git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark function_analyzer2.py on a synthetic JSFX corpus.")
+    parser.add_argument('--modules', type=int, default=40, help="number of .jsfx-inc modules (default: 40)")
+    parser.add_argument('--functions', type=int, default=20, help="functions per module (default: 20)")
+    parser.add_argument('--body-lines', type=int, default=12, help="statements per function body (default: 12)")
+    parser.add_argument('--call-density', type=float, default=0.3,
+                        help="probability a statement calls a user function (default: 0.3)")
+    parser.add_argument('--multiline-local', type=float, default=0.25,
+                        help="fraction of functions with a multi-line local() list (default: 0.25)")
+    parser.add_argument('--nesting', type=int, default=4, help="maximum parenthesis nesting depth (default: 4)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for the corpus (default: 1)")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs; the fastest is reported (default: 3)")
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes for load_modules (default: 1)")
+    parser.add_argument('--warm-cache', action='store_true',
+                        help="also time a run with a populated analysis cache")
+    parser.add_argument('--keep-corpus', metavar='DIR', help="generate the corpus into DIR and keep it")
+    parser.add_argument('--results', metavar='FILE', help="append the results to FILE as a JSON line")
+    args = parser.parse_args()
+
+    if args.keep_corpus:
+        corpus = Path(args.keep_corpus)
+        if corpus.exists():
+            shutil.rmtree(corpus)
+        corpus.mkdir(parents=True)
+    else:
+        corpus = Path(tempfile.mkdtemp(prefix='jsfx_bench_'))
+
+    try:
+        params = {key: getattr(args, key) for key in
+                  ('modules', 'functions', 'body_lines', 'call_density', 'multiline_local', 'nesting', 'seed', 'jobs')}
+        corpus_stats = generate_corpus(corpus, **{k: v for k, v in params.items() if k != 'jobs'})
+        print(f"Corpus: {corpus_stats['files']} files, {corpus_stats['lines']} lines, "
+              f"{corpus_stats['declarations']} functions, {corpus_stats['calls']} calls ({corpus})")
+
+        runs = [time_phases(corpus, jobs=args.jobs) for _ in range(args.repeat)]
+        cold = {phase: min(run[phase] for run in runs) for phase in runs[0]}
+        results = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': _git_revision(),
+            'analyzer_version': ANALYZER_VERSION,
+            'python': sys.version.split()[0],
+            'params': params,
+            'corpus': corpus_stats,
+            'cold': cold,
+            'cold_total_median': statistics.median(run['total'] for run in runs),
+        }
+
+        if args.warm_cache:
+            time_phases(corpus, use_cache=True, jobs=args.jobs)  # populate the cache
+            warm_runs = [time_phases(corpus, use_cache=True, jobs=args.jobs) for _ in range(args.repeat)]
+            results['warm'] = {phase: min(run[phase] for run in warm_runs) for phase in warm_runs[0]}
+
+        print(f"\n{'Phase':<34}{'Cold (ms)':>12}{'Warm (ms)':>12}")
+        print("-" * 58)
+        for phase, seconds in cold.items():
+            warm = results.get('warm', {}).get(phase)
+            warm_text = f"{warm * 1000:>12.2f}" if warm is not None else f"{'-':>12}"
+            print(f"{phase:<34}{seconds * 1000:>12.2f}{warm_text}")
+
+        if args.results:
+            with open(args.results, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(results) + '\n')
+            print(f"\nResults appended to: {args.results}")
+    finally:
+        if not args.keep_corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
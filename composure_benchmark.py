@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Composure CPU Benchmark
+
+Runs Composure's @block/@sample path through eel2_interpreter.py across a
+matrix of slider presets and sample rates, and reports the cost per sample
+of each feature relative to a baseline with every optional feature off.
+
+Usage: python3 composure_benchmark.py [options]
+
+Example:
+    python3 composure_benchmark.py                                # Every feature at 44.1, 48, 96 and 192 kHz
+    python3 composure_benchmark.py --rates 48000 --seconds 1      # One rate, longer signal
+    python3 composure_benchmark.py --features tube transient_detection
+    python3 composure_benchmark.py --full --rates 44100           # Every combination of the matrix axes
+    python3 composure_benchmark.py --results cpu_results.jsonl    # Append results for tracking
+
+Matrix axes:
+- lookahead (lookahead_ms), rms_window and true_rms (rms_size_ms, the True RMS menu toggle)
+- feedback_detection (detection_mode), tape and tube (harmonic_type)
+- brickwall_limiter, transient_detection and program_release (prog_release_type)
+- sample rates from 44.1 to 192 kHz (--rates)
+
+The baseline turns every optional feature off, loads a compressive curve
+and sets lp_freq to 0, since update_filter_coefficients() reads slider11
+(lp_freq) as the detector's high-pass frequency. The input is stereo noise
+bursts that drive the detector well into the curve. Absolute figures are
+interpreter nanoseconds; the relative cost of each feature is what carries
+over to REAPER. The "GR blocks" column is the share of blocks that applied
+gain reduction; a feature that changes it is changing what the rest of the
+chain does, not just adding its own cost.
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from eel2_interpreter import EEL2Error, JSFXEffect, load_effect
+
+
+DEFAULT_RATES = [44100, 48000, 96000, 192000]
+BENCH_BLOCK_SIZE = 512
+
+# Every optional feature off; the compressor itself stays in the signal path
+BASELINE = {'lookahead_ms': 0, 'rms_size_ms': 0, 'detection_mode': 1, 'harmonic_type': 0,
+            'brickwall_limiter': 0, 'transient_detection': 0, 'prog_release_type': 0, 'lp_freq': 0, 'hp_freq': 0}
+
+# Feature name -> (slider settings, other variables) applied on top of the baseline
+FEATURES: Dict[str, Tuple[Dict[str, float], Dict[str, float]]] = {
+    'lookahead': ({'lookahead_ms': 5}, {}),
+    'rms_window': ({'rms_size_ms': 10}, {}),
+    'true_rms': ({'rms_size_ms': 10}, {'menu_true_rms_enabled': 1}),
+    'feedback_detection': ({'detection_mode': 0}, {}),
+    'tape': ({'harmonic_type': 1}, {}),
+    'tube': ({'harmonic_type': 2}, {}),
+    'brickwall_limiter': ({'brickwall_limiter': 1}, {}),
+    'transient_detection': ({'transient_detection': 50}, {}),
+    'program_release': ({'prog_release_type': 4}, {}),
+}
+
+# Values each axis takes in --full runs
+FULL_MATRIX = {
+    'lookahead_ms': (0, 5),
+    'rms_size_ms': (0, 10),
+    'detection_mode': (1, 0),
+    'harmonic_type': (0, 1, 2),
+    'brickwall_limiter': (0, 1),
+}
+
+# Input dB -> output dB; 1:1 up to -40 dB, then about 2.5:1
+BENCH_CURVE = [(-80.0, -80.0), (-40.0, -40.0), (-20.0, -28.0), (0.0, -12.0)]
+
+
+def generate_signal(srate: int, seconds: float, seed: int = 1) -> List[List[float]]:
+    """Stereo noise bursts: a hit every 100 ms decaying from 0 dBFS, over a -40 dBFS floor"""
+    rng = random.Random(seed)
+    period = int(srate * 0.1)
+    decay = math.exp(-1 / (0.03 * srate))
+    frames = []
+    level = 0.0
+    for n in range(int(srate * seconds)):
+        if n % period == 0:
+            level = 1.0
+        level *= decay
+        amplitude = max(level, 0.01)
+        frames.append([amplitude * rng.uniform(-1, 1), amplitude * rng.uniform(-1, 1)])
+    return frames
+
+
+def load_curve(effect: JSFXEffect, points: List[Tuple[float, float]]):
+    """Replace the effect's compression curve and rebuild the caches @sample reads"""
+    base = int(effect.variable('graph_points'))
+    effect.set_variable('num_points', len(points))
+    for index, (input_db, output_db) in enumerate(points):
+        effect.memory[base + index * 2] = input_db
+        effect.memory[base + index * 2 + 1] = output_db
+    for function in ('invalidate_curve_segments_db', 'invalidate_compression_lut', 'invalidate_compression_threshold',
+                     'build_compression_lut'):
+        effect.call(function)
+
+
+def time_case(effect: JSFXEffect, frames: List[List[float]], sliders: Dict[str, float],
+              variables: Dict[str, float], repeat: int) -> Dict[str, float]:
+    """Time one preset from a fresh instance; returns ns per sample (fastest run) and GR activity
+
+    An untimed first run resolves every call on the preset's code path, so
+    the timed runs do not pay the interpreter's one-off setup.
+    """
+    best = math.inf
+    gr_blocks = 0
+    blocks = 0
+    for run in range(repeat + 1):
+        effect.reset()
+        for name, value in sliders.items():
+            effect.set_slider(name, value)
+        for name, value in variables.items():
+            effect.set_variable(name, value)
+        load_curve(effect, BENCH_CURVE)
+        gr_blocks = blocks = 0
+        elapsed = 0.0
+        gc.disable()
+        try:
+            for start in range(0, len(frames), effect.block_size):
+                chunk = frames[start:start + effect.block_size]
+                began = time.perf_counter()
+                effect.process(chunk)
+                elapsed += time.perf_counter() - began
+                blocks += 1
+                gr_blocks += effect.variable('gr_db_block_max') < -0.01
+        finally:
+            gc.enable()
+        if run:
+            best = min(best, elapsed)
+    return {'ns_per_sample': best / len(frames) * 1e9, 'gr_blocks': gr_blocks / max(blocks, 1)}
+
+
+def _git_revision() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Composure's per-sample cost across slider presets.")
+    parser.add_argument('--path', default='.', help="path to the JSFX directory (default: current directory)")
+    parser.add_argument('--root', default='Composure.jsfx', help="effect to benchmark (default: Composure.jsfx)")
+    parser.add_argument('--rates', type=int, nargs='+', default=DEFAULT_RATES,
+                        help="sample rates to run (default: 44100 48000 96000 192000)")
+    parser.add_argument('--seconds', type=float, default=0.25, help="length of the test signal (default: 0.25)")
+    parser.add_argument('--features', nargs='+', choices=sorted(FEATURES), default=list(FEATURES),
+                        help="features to measure against the baseline (default: all)")
+    parser.add_argument('--full', action='store_true',
+                        help="time every combination of the lookahead, RMS, detection, harmonic and limiter axes")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per preset; the fastest is kept (default: 3)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for the test signal (default: 1)")
+    parser.add_argument('--results', metavar='FILE', help="append the results to FILE as a JSON line")
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'root': args.root,
+        'seconds': args.seconds,
+        'rates': {},
+    }
+    relative: Dict[str, List[float]] = {}
+
+    for rate in args.rates:
+        try:
+            effect = load_effect(args.path, args.root, srate=rate, block_size=BENCH_BLOCK_SIZE)
+        except EEL2Error as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        frames = generate_signal(rate, args.seconds, args.seed)
+        baseline = time_case(effect, frames, BASELINE, {}, args.repeat)
+        rows = {'baseline': baseline}
+
+        if args.full:
+            axes = list(FULL_MATRIX)
+            for values in itertools.product(*(FULL_MATRIX[axis] for axis in axes)):
+                sliders = dict(BASELINE, **dict(zip(axes, values)))
+                label = ' '.join(f"{axis}={value}" for axis, value in zip(axes, values))
+                rows[label] = time_case(effect, frames, sliders, {}, args.repeat)
+        else:
+            for feature in args.features:
+                sliders, variables = FEATURES[feature]
+                rows[feature] = time_case(effect, frames, dict(BASELINE, **sliders), variables, args.repeat)
+
+        base_ns = baseline['ns_per_sample']
+        print(f"\n{args.root} at {rate} Hz ({len(frames)} samples, best of {args.repeat})")
+        width = max(len(label) for label in rows) + 2
+        print(f"{'Preset':<{width}}{'ns/sample':>12}{'Relative':>11}{'GR blocks':>11}")
+        print("-" * (width + 34))
+        for label, row in rows.items():
+            row['relative'] = row['ns_per_sample'] / base_ns - 1 if base_ns else 0.0
+            if label != 'baseline':
+                relative.setdefault(label, []).append(row['relative'])
+            relative_text = f"{row['relative']:>+10.1%}" if label != 'baseline' else f"{'-':>10}"
+            print(f"{label:<{width}}{row['ns_per_sample']:>12.0f} {relative_text}{row['gr_blocks']:>10.0%}")
+        results['rates'][str(rate)] = rows
+
+    if len(args.rates) > 1 and relative:
+        print(f"\nMean relative cost across {len(args.rates)} sample rates")
+        width = max(len(label) for label in relative) + 2
+        print("-" * (width + 11))
+        for label, values in sorted(relative.items(), key=lambda item: -sum(item[1])):
+            print(f"{label:<{width}}{sum(values) / len(values):>+10.1%}")
+
+    if args.results:
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(results) + '\n')
+        print(f"\nResults appended to: {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,616 @@
+#!/usr/bin/env python3
+"""
+Composure Reference Models
+
+NumPy versions of Composure's gain computer, envelope and harmonic stages,
+for golden-output tests and fast batch rendering. Each model mirrors the
+EEL2 it is named after, including its quirks, so it can be diffed against
+the effect itself (see --check) instead of against an idealised compressor.
+
+Usage: python3 composure_reference.py [options]
+
+Example:
+    python3 composure_reference.py --check                  # Diff every model against eel2_interpreter.py
+    python3 composure_reference.py --check --cases 50       # More random curves and settings
+    python3 composure_reference.py --check --srate 96000    # At another sample rate
+
+Models:
+- interpolate_compression_curve(): 05_compression_core, piecewise linear/Bezier
+- curve_segments(), sample_curve_at_db(), build_compression_lut() and
+  lookup_compression_lut(): the segment cache and 400-entry LUT that @sample reads
+- calculate_gain_reduction_from_db(): 06_gain_reduction, with transient detection
+- select_program_release_coef(): 07_envelope's five release strategies
+- process_envelope(): the recursive envelope; a tight loop, compiled with Numba when installed
+- harmonic_stage() and the tape/tube/optical models of 08_harmonic_models
+
+Stateless stages take and return whole blocks. Stateful ones take the
+previous state and return the new state alongside the block, so a long
+signal can be rendered block by block.
+
+Quirks reproduced as found in the JSFX:
+- rel_fast and rel_slow are never assigned, so release types 1-3 read them as 0
+- prev_detector_db is never updated, so the rate-of-change delta is -level
+- compressor_type is not read by any DSP code, so all seven modes render identically
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from typing import List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the envelope falls back to a plain loop
+    njit = None
+
+
+# Constants mirrored from the JSFX (01_Utils, 03_Compression)
+EPS = 1e-30
+LOG10_20 = 20 / math.log(10)
+LOG_10_20 = math.log(10) / 20
+MIN_DETECTOR_LEVEL = 0.000001
+GRAPH_MIN_DB = -80.0
+GRAPH_MAX_DB = 0.0
+MAX_POINTS = 12
+BEZIER_STEPS = 20
+MAX_CURVE_SEGMENTS = 500
+COMP_LUT_MIN_DB = -80.0
+COMP_LUT_MAX_DB = 20.0
+COMP_LUT_GRANULARITY = 0.25
+COMP_LUT_SIZE = 400
+BASE_FAST_S, BASE_MED_S, BASE_SLOW_S = 0.05, 0.3, 1.0
+REL_FAST = REL_SLOW = 0.0  # never assigned in the JSFX; see the module docstring
+COMPRESSOR_TYPES = ('Clean Digital', 'Varimu', 'Bridged Diode', 'VCA', 'PWM/Fairchild', 'FET', 'Optical')
+
+
+class CompressionCurve(NamedTuple):
+    points: np.ndarray         # (num_points, 2) input/output dB, sorted by input
+    curve_amounts: np.ndarray  # (MAX_POINTS,) Bezier amount 0-100 per point
+
+
+class CompressorSettings(NamedTuple):
+    """Slider values the modelled stages read (defaults match Composure.jsfx)"""
+    srate: float = 44100.0
+    attack_ms: float = 10.0
+    attack_curve: float = 0.0
+    release_ms: float = 100.0
+    release_curve: float = -2.0
+    time_multiplier: float = 1.0
+    strength: float = 1.0
+    max_gr_db: float = -100.0
+    global_offset_db: float = 0.0
+    prog_release_type: float = 0.0
+    gr_blend_threshold_db: float = 6.0
+    input_level_threshold_db: float = -20.0
+    input_level_threshold_2_db: float = -40.0
+    transient_detection: float = 0.0
+    transient_threshold_db: float = -6.0
+    harmonic_type: float = 0.0
+    harmonic_drive: float = 50.0
+    harmonic_mix: float = 0.0
+    harmonic_even_boost: float = 0.0
+    harmonic_odd_boost: float = 0.0
+    compressor_type: float = 0.0
+
+
+def default_curve() -> CompressionCurve:
+    """Return the 1:1 curve init_graph_points() starts with"""
+    points = np.array([[GRAPH_MIN_DB] * 2, [-60.0] * 2, [-40.0] * 2, [-20.0] * 2, [-10.0] * 2, [GRAPH_MAX_DB] * 2])
+    return CompressionCurve(points, np.zeros(MAX_POINTS))
+
+
+def linear_to_db(linear: np.ndarray) -> np.ndarray:
+    linear = np.asarray(linear, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(linear > 0, np.log(np.where(linear > 0, linear, 1.0)) * LOG10_20, -150.0)
+
+
+def db_to_linear(db: np.ndarray) -> np.ndarray:
+    return np.exp(np.asarray(db, dtype=float) * LOG_10_20)
+
+
+#==============================================================================
+# Compression curve
+#==============================================================================
+
+def _curve_amount(curve: CompressionCurve, point_index: int) -> float:
+    return float(curve.curve_amounts[point_index]) if 0 <= point_index < MAX_POINTS else 0.0
+
+
+def _bezier_control_points(points: np.ndarray, point_index: int, curve_amount: float):
+    """calculate_bezier_control_points(): the invisible endpoints and the shared control point"""
+    prev_x, prev_y = points[point_index - 1]
+    curr_x, curr_y = points[point_index]
+    next_x, next_y = points[point_index + 1]
+    factor = curve_amount / 100.0
+    p0 = (curr_x + (prev_x - curr_x) * factor, curr_y + (prev_y - curr_y) * factor)
+    p3 = (curr_x + (next_x - curr_x) * factor, curr_y + (next_y - curr_y) * factor)
+    return p0, (curr_x, curr_y), p3
+
+
+def interpolate_compression_curve(input_db: np.ndarray, curve: CompressionCurve) -> np.ndarray:
+    """Output dB for each input dB, evaluated on the control points as 05_compression_core does"""
+    x = np.asarray(input_db, dtype=float)
+    points = curve.points
+    n = len(points)
+    xs, ys = points[:, 0], points[:, 1]
+    # The EEL2 scan stops at the first segment whose end is not below the input
+    segment = np.minimum(np.searchsorted(xs[1:], x, side='left'), n - 2)
+    x1, y1, x2, y2 = xs[segment], ys[segment], xs[segment + 1], ys[segment + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = y1 + np.clip((x - x1) / (x2 - x1), 0, 1) * (y2 - y1)
+
+        for point_index in range(1, n - 1):
+            amount = _curve_amount(curve, point_index)
+            selected = segment + 1 == point_index
+            if amount <= 0 or not selected.any():
+                continue
+            (p0x, p0y), (cx, cy), (p3x, p3y) = _bezier_control_points(points, point_index, amount)
+            t = np.clip((x[selected] - p0x) / max(p3x - p0x, EPS), 0, 1)
+            u = 1 - t
+            result[selected] = u * u * u * p0y + 3 * u * u * t * cy + 3 * u * t * t * cy + t * t * t * p3y
+
+    result = np.where(x >= xs[n - 1], ys[n - 1], result)
+    return np.where(x <= xs[0], ys[0], result)
+
+
+def curve_segments(curve: CompressionCurve) -> np.ndarray:
+    """generate_curve_segments_db(): the (count, 4) line segments [x1, y1, x2, y2] the LUT is sampled from"""
+    points = curve.points
+    n = len(points)
+    segments: List[Tuple[float, float, float, float]] = []
+    if n < 2:
+        return np.zeros((0, 4))
+    prev_x, prev_y = points[0]
+    junction = None
+    for i in range(n - 1):
+        amount = _curve_amount(curve, i + 1) if i + 1 < n - 1 else 0.0
+        if amount > 0:
+            (p0x, p0y), (cx, cy), (p3x, p3y) = _bezier_control_points(points, i + 1, amount)
+            if junction is not None:
+                (p0x, p0y), junction = junction, None
+            next_amount = _curve_amount(curve, i + 2) if i + 2 < n - 1 else 0.0
+            if next_amount > 0:
+                (next_p0x, next_p0y), _, _ = _bezier_control_points(points, i + 2, next_amount)
+                if p3x > next_p0x:  # neighbouring curves overlap: meet halfway
+                    p3x, p3y = (p3x + next_p0x) / 2, (p3y + next_p0y) / 2
+                    junction = (p3x, p3y)
+            t = 0.0
+            t_step = 1.0 / BEZIER_STEPS
+            while t < 1 and len(segments) < MAX_CURVE_SEGMENTS - 1:
+                u = 1 - t
+                current_x = u * u * u * p0x + 3 * u * u * t * cx + 3 * u * t * t * cx + t * t * t * p3x
+                current_y = u * u * u * p0y + 3 * u * u * t * cy + 3 * u * t * t * cy + t * t * t * p3y
+                segments.append((prev_x, prev_y, current_x, current_y))
+                prev_x, prev_y = current_x, current_y
+                t += t_step
+        else:
+            end_x, end_y = points[i + 1]
+            segments.append((prev_x, prev_y, end_x, end_y))
+            prev_x, prev_y = end_x, end_y
+    return np.array(segments, dtype=float).reshape(-1, 4)
+
+
+def sample_curve_at_db(input_db: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """sample_curve_at_db(): interpolate on the first segment that contains each input"""
+    x = np.asarray(input_db, dtype=float)
+    if len(segments) == 0:
+        return x.copy()
+    x1, y1, x2, y2 = (segments[:, column] for column in range(4))
+    column = x[..., None]
+    inside = (((column >= x1 - 0.0001) & (column <= x2 + 0.0001)) |
+              ((column >= x2 - 0.0001) & (column <= x1 + 0.0001)))
+    found = inside.any(axis=-1)
+    first = inside.argmax(axis=-1)
+    width = (x2 - x1)[first]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip((x - x1[first]) / width, 0, 1)
+    result = np.where(np.abs(width) > 0.0001, y1[first] + t * (y2 - y1)[first], y1[first])
+    result = np.where(found, result, x)
+    result = np.where(x >= segments[-1, 2], segments[-1, 3], result)
+    return np.where(x <= segments[0, 0], segments[0, 1], result)
+
+
+def build_compression_lut(curve: CompressionCurve) -> np.ndarray:
+    """build_compression_lut(): the curve sampled every COMP_LUT_GRANULARITY dB from COMP_LUT_MIN_DB"""
+    inputs = COMP_LUT_MIN_DB + np.arange(COMP_LUT_SIZE) * COMP_LUT_GRANULARITY
+    return sample_curve_at_db(inputs, curve_segments(curve))
+
+
+def lookup_compression_lut(input_db: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """lookup_compression_lut(): clamp, then interpolate between neighbouring entries"""
+    x = np.asarray(input_db, dtype=float)
+    index_float = (x - COMP_LUT_MIN_DB) / COMP_LUT_GRANULARITY
+    floor = np.floor(index_float)
+    fraction = index_float - floor
+    index = np.clip(floor, 0, COMP_LUT_SIZE - 2).astype(int)
+    result = lut[index] + fraction * (lut[index + 1] - lut[index])
+    result = np.where(x > COMP_LUT_MAX_DB, lut[COMP_LUT_SIZE - 1], result)
+    return np.where(x < COMP_LUT_MIN_DB, lut[0], result)
+
+
+def compression_threshold(curve: CompressionCurve) -> float:
+    """calculate_compression_threshold(): the input dB below which the curve is 1:1"""
+    points = curve.points
+    for i in range(1, len(points) - 1):
+        if abs(points[i, 0] - points[i, 1]) > 0.01:
+            return float(points[i - 1, 0]) if i > 1 else float(points[0, 0])
+    return GRAPH_MAX_DB + 10
+
+
+#==============================================================================
+# Gain computer
+#==============================================================================
+
+def calculate_gain_reduction_from_db(input_level_db: np.ndarray, lut: np.ndarray, threshold_db: float,
+                                     settings: CompressorSettings,
+                                     prev_level_db: float = GRAPH_MIN_DB) -> Tuple[np.ndarray, float]:
+    """Target GR (dB) per sample, and the transient detector's last level for the next block
+
+    Samples below `threshold_db` return 0 and leave the transient detector
+    alone, as in 06_gain_reduction; the detector's previous level is
+    therefore the last level that reached the curve.
+    """
+    level = np.asarray(input_level_db, dtype=float)
+    active = level >= threshold_db
+    offset_input = level + settings.global_offset_db
+    gr = (lookup_compression_lut(offset_input, lut) - offset_input) * settings.strength
+    gr = np.maximum(settings.max_gr_db, gr)
+
+    positions = np.where(active, np.arange(len(level)), -1)
+    last_active = np.maximum.accumulate(positions) if len(level) else positions
+    previous = np.concatenate(([-1], last_active[:-1])) if len(level) else positions
+    prev = np.where(previous >= 0, level[np.maximum(previous, 0)], prev_level_db)
+    if settings.transient_detection > 0:
+        rising = (level - prev > 0) & (level > settings.transient_threshold_db)
+        reduction = np.minimum((level - settings.transient_threshold_db) * 0.6,
+                               settings.transient_detection / 100.0 * 12.0)
+        gr = gr + np.where(rising, reduction, 0.0)
+
+    next_prev = float(level[last_active[-1]]) if len(level) and last_active[-1] >= 0 else prev_level_db
+    return np.where(active, gr, 0.0), next_prev
+
+
+#==============================================================================
+# Envelope
+#==============================================================================
+
+def convert_attack_time_to_ms(attack_value: float, time_unit: float) -> float:
+    if time_unit == 1:
+        return attack_value * 0.001
+    if time_unit == 2:
+        return attack_value * 1000
+    return attack_value
+
+
+def envelope_coefficients(settings: CompressorSettings) -> Tuple[float, float]:
+    """(attack_coeff, release_coeff) as @block computes them, curve shaping included"""
+    attack_ms = convert_attack_time_to_ms(settings.attack_ms, settings.time_multiplier)
+    with np.errstate(divide='ignore'):
+        attack = math.exp(-1000 / (attack_ms * settings.srate)) if settings.attack_ms > 0 and attack_ms else 0.0
+        release = math.exp(-1000 / (settings.release_ms * settings.srate)) if settings.release_ms > 0 else 0.0
+
+    def shape(coefficient: float, curve: float) -> float:
+        if curve > 0:
+            return coefficient ** ((1.0 + curve * 0.3) * (1.0 + curve * 0.15))
+        if curve < 0:
+            return coefficient ** (1.0 - abs(curve) * 0.3)
+        return coefficient
+    return shape(attack, settings.attack_curve), shape(release, settings.release_curve)
+
+
+def release_coefficients(release_ms: float, srate: float) -> Tuple[float, float, float]:
+    """The fast/medium/slow coefficients select_program_release_coef() caches"""
+    multiplier = 0.5 + (release_ms / 2000.0) * 1.5
+    return tuple(math.exp(-1 / (base * multiplier * srate)) for base in (BASE_FAST_S, BASE_MED_S, BASE_SLOW_S))
+
+
+def _normalized_blend(blend_fast: np.ndarray, blend_slow: np.ndarray, coef_fast: float, coef_slow: float) -> np.ndarray:
+    return (blend_fast * coef_fast + blend_slow * coef_slow) / (blend_fast + blend_slow + EPS)
+
+
+def select_program_release_coef(target_gr_abs: np.ndarray, detector_level_db: np.ndarray,
+                                settings: CompressorSettings, prev_detector_db: float = 0.0) -> np.ndarray:
+    """Release coefficient per sample for prog_release_type 0-4"""
+    gr = np.asarray(target_gr_abs, dtype=float)
+    level = np.broadcast_to(np.asarray(detector_level_db, dtype=float), gr.shape)
+    fast, medium, slow = release_coefficients(settings.release_ms, settings.srate)
+    kind = settings.prog_release_type
+
+    if kind == 1:
+        above = level - settings.input_level_threshold_db
+        return _normalized_blend(np.clip(1 - above / 20, 0, 1), np.clip(above / 20, 0, 1), REL_FAST, REL_SLOW)
+    if kind == 2:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = gr / settings.gr_blend_threshold_db
+        return _normalized_blend(np.clip(1 - ratio, 0, 1), np.clip(ratio, 0, 1), REL_FAST, REL_SLOW)
+    if kind == 3:
+        return np.where(prev_detector_db - level > 3, REL_FAST, REL_SLOW)
+    if kind == 4:
+        lower = min(settings.input_level_threshold_db, settings.input_level_threshold_2_db)
+        upper = max(settings.input_level_threshold_db, settings.input_level_threshold_2_db)
+        blend_low = (level - lower) / (upper - lower + EPS)
+        blend_high = np.clip((level - upper) / 20, 0, 1)
+        return np.where(level < lower, fast,
+                        np.where(level < upper, fast * (1 - blend_low) + medium * blend_low,
+                                 medium * (1 - blend_high) + slow * blend_high))
+    return np.full(gr.shape, medium)
+
+
+def _envelope_loop(target: np.ndarray, release: np.ndarray, attack: float, state: float) -> Tuple[np.ndarray, float]:
+    """process_envelope_following() for one block; `release` is the per-sample release coefficient"""
+    output = np.empty(len(target))
+    for k in range(len(target)):
+        value = target[k]
+        if abs(value) < 0.01 and abs(state) < 0.01:
+            state = 0.0
+        else:
+            coefficient = attack if abs(value) > abs(state) else release[k]
+            state = coefficient * state + (1 - coefficient) * value
+        output[k] = state
+    return output, state
+
+
+if njit is not None:
+    _envelope_loop = njit(cache=False)(_envelope_loop)
+
+
+def process_envelope(target_gr_db: np.ndarray, detector_level_db: np.ndarray, settings: CompressorSettings,
+                     state: float = 0.0) -> Tuple[np.ndarray, float]:
+    """Smoothed GR (dB) per sample and the envelope state for the next block
+
+    The release coefficient of every sample is computed vectorised up
+    front; only the attack/release choice and the one-pole recursion run in
+    the loop.
+    """
+    target = np.ascontiguousarray(target_gr_db, dtype=float)
+    attack, release_coeff = envelope_coefficients(settings)
+    if settings.prog_release_type > 0:
+        release = select_program_release_coef(np.abs(target), detector_level_db, settings)
+    else:
+        release = np.full(len(target), release_coeff)
+    return _envelope_loop(target, np.ascontiguousarray(release, dtype=float), float(attack), float(state))
+
+
+#==============================================================================
+# Harmonics
+#==============================================================================
+
+def apply_enhanced_tape_processing(x: np.ndarray, amount: float, combined_factor: np.ndarray,
+                                   even_boost: float, odd_boost: float) -> np.ndarray:
+    scaled = amount * combined_factor
+    asymmetry = np.where(x > 0, 1.0, 0.9)
+    even = 1 + even_boost * 0.01
+    odd = 1 + odd_boost * 0.01
+    x2 = x * x
+    x3 = x2 * x
+    x5 = x3 * x2
+    x7 = x5 * x2
+    result = x + x2 * scaled * 0.0005 * even * asymmetry
+    if odd_boost > 0:
+        result = result + (x3 * scaled * 0.01 * odd * asymmetry + x5 * scaled * 0.005 * odd * asymmetry +
+                           x7 * scaled * 0.0025 * odd * asymmetry)
+    return result
+
+
+def apply_enhanced_tube_processing(x: np.ndarray, amount: float, combined_factor: np.ndarray,
+                                   even_boost: float, odd_boost: float) -> np.ndarray:
+    scaled = amount * combined_factor
+    asymmetry = np.where(x > 0, 1.0, 0.85)
+    odd = 1 + odd_boost * 0.01
+    even = 1 + even_boost * 0.01
+    x2 = x * x
+    x3 = x2 * x
+    x5 = x3 * x2
+    result = x + x2 * scaled * 0.01 * even * asymmetry
+    if odd_boost > 0:
+        result = result + x3 * scaled * 0.002 * odd * asymmetry + x5 * scaled * 0.001 * odd * asymmetry
+    return result
+
+
+def apply_optical_processing(x: np.ndarray, amount: float, combined_factor: np.ndarray,
+                             even_boost: float, odd_boost: float) -> np.ndarray:
+    scaled = amount * combined_factor
+    x2 = x * x
+    even = 1 + even_boost * 0.01
+    result = x + x2 * scaled * 0.02 * even + x2 * x2 * scaled * 0.005 * even
+    if odd_boost > 0:
+        result = result + x2 * x * scaled * 0.01 * (1 + odd_boost * 0.01)
+    return result
+
+
+def harmonic_stage(x: np.ndarray, target_gr_db: np.ndarray, envelope_db: np.ndarray,
+                   settings: CompressorSettings) -> np.ndarray:
+    """The audio chain's harmonic stage for one channel, gating included
+
+    Mirrors the shared pre-calculation in 09_audio_processing_chain and
+    apply_harmonic_processing(): tape for type 1, tube otherwise, applied
+    only where harmonic_type > 0 and |target GR| > 0.0001 dB. harmonic_mix
+    is used as a 0-100 factor, exactly as the chain passes it.
+    """
+    x = np.asarray(x, dtype=float)
+    gr_abs = np.abs(np.asarray(target_gr_db, dtype=float))
+    if settings.harmonic_type <= 0:
+        return x.copy()
+    envelope_amount = np.abs(np.asarray(envelope_db, dtype=float)) / 30.0
+    combined_factor = gr_abs * 0.3 * (1 + envelope_amount * 0.2)
+    intensity = 1.0 * gr_abs * 0.15 * (1 + envelope_amount * 0.2)  # harmonic_amount is hard-coded to 1
+    amount = 1.0 * (settings.harmonic_drive / 100.0) * 0.5
+    model = apply_enhanced_tape_processing if settings.harmonic_type == 1 else apply_enhanced_tube_processing
+    processed = model(x, amount, combined_factor, settings.harmonic_even_boost, settings.harmonic_odd_boost)
+    wet = x + intensity * (processed - x)
+    mixed = settings.harmonic_mix * wet + (1 - settings.harmonic_mix) * x
+    return np.where(gr_abs > 0.0001, mixed, x)
+
+
+#==============================================================================
+# Checking against the interpreter
+#==============================================================================
+
+def random_curve(rng: random.Random) -> CompressionCurve:
+    """A random compressive curve with fixed corners, like one drawn in the editor"""
+    count = rng.randint(4, MAX_POINTS)
+    inputs = sorted(rng.uniform(GRAPH_MIN_DB + 1, GRAPH_MAX_DB - 1) for _ in range(count - 2))
+    points = [[GRAPH_MIN_DB, GRAPH_MIN_DB]]
+    for x in inputs:
+        points.append([x, x - rng.uniform(0, 20) * rng.random()])
+    points.append([GRAPH_MAX_DB, GRAPH_MAX_DB - rng.uniform(0, 30)])
+    amounts = [0.0] * MAX_POINTS
+    for index in range(1, count - 1):
+        if rng.random() < 0.5:
+            amounts[index] = rng.uniform(0, 100)
+    return CompressionCurve(np.array(points), np.array(amounts))
+
+
+def random_settings(rng: random.Random, srate: float, release_type: int) -> CompressorSettings:
+    return CompressorSettings(
+        srate=srate, attack_ms=rng.uniform(0.05, 100), attack_curve=rng.uniform(-2, 2),
+        release_ms=rng.uniform(10, 1000), release_curve=rng.uniform(-2, 2), time_multiplier=rng.choice((0, 1, 2)),
+        strength=rng.uniform(0.25, 10), max_gr_db=rng.uniform(-100, -10), global_offset_db=rng.uniform(-30, 30),
+        prog_release_type=release_type, gr_blend_threshold_db=rng.uniform(1, 24),
+        input_level_threshold_db=rng.uniform(-80, 0), input_level_threshold_2_db=rng.uniform(-80, 0),
+        transient_detection=rng.choice((0, rng.uniform(0, 100))), transient_threshold_db=rng.uniform(-80, 0),
+        harmonic_type=rng.choice((0, 1, 2)), harmonic_drive=rng.uniform(0, 100), harmonic_mix=rng.uniform(0, 1),
+        harmonic_even_boost=rng.choice((0, rng.uniform(0, 200))), harmonic_odd_boost=rng.choice((0, rng.uniform(0, 200))),
+        compressor_type=rng.randrange(len(COMPRESSOR_TYPES)))
+
+
+def load_into_effect(effect, curve: CompressionCurve, settings: CompressorSettings):
+    """Write a curve and settings into an eel2_interpreter effect and rebuild its caches"""
+    for name, value in settings._asdict().items():
+        if name != 'srate':
+            effect.set_variable(name, value)
+    effect.code['@block']()  # attack_coeff, release_coeff
+    points_base = int(effect.variable('graph_points'))
+    amounts_base = int(effect.variable('curve_amounts'))
+    effect.set_variable('num_points', len(curve.points))
+    effect.memory[points_base:points_base + 2 * len(curve.points)] = [float(v) for v in curve.points.reshape(-1)]
+    effect.memory[amounts_base:amounts_base + MAX_POINTS] = [float(v) for v in curve.curve_amounts]
+    for function in ('invalidate_curve_segments_db', 'invalidate_compression_lut', 'invalidate_compression_threshold',
+                     'build_compression_lut'):
+        effect.call(function)
+
+
+def _difference(actual: np.ndarray, expected: Sequence[float]) -> float:
+    """Largest absolute difference; NaN matches NaN and nothing else"""
+    actual = np.asarray(actual, dtype=float)
+    expected = np.asarray(expected, dtype=float)
+    both_nan = np.isnan(actual) & np.isnan(expected)
+    with np.errstate(invalid='ignore'):
+        difference = np.where(both_nan, 0.0, np.abs(actual - expected))
+    difference = np.where(np.isnan(difference), np.inf, difference)
+    return float(difference.max()) if difference.size else 0.0
+
+
+def check_case(effect, curve: CompressionCurve, settings: CompressorSettings, rng: random.Random,
+               samples: int = 256) -> dict:
+    """Return {model: max abs difference} between the reference and the interpreted JSFX for one case"""
+    load_into_effect(effect, curve, settings)
+    errors = {}
+    grid = np.array([rng.uniform(-100, 30) for _ in range(samples)])
+    grid[:len(curve.points)] = curve.points[:, 0]
+
+    expected = [effect.call('interpolate_compression_curve', x) for x in grid]
+    errors['interpolate_compression_curve'] = _difference(interpolate_compression_curve(grid, curve), expected)
+
+    lut = build_compression_lut(curve)
+    lut_base = int(effect.variable('comp_lut'))
+    errors['build_compression_lut'] = _difference(lut, effect.memory[lut_base:lut_base + COMP_LUT_SIZE])
+    threshold = compression_threshold(curve)
+    errors['compression_threshold'] = abs(threshold - effect.variable('comp_curve_min_threshold_db'))
+
+    # A random walk so transients and the envelope both see rises and falls
+    level = np.cumsum([rng.uniform(-6, 6) for _ in range(samples)]) % 100 - 80
+    prev = effect.variable('transient_detector_prev_db')
+    target, next_prev = calculate_gain_reduction_from_db(level, lut, threshold, settings, prev)
+    expected = [effect.call('calculate_gain_reduction_from_db', x) for x in level]
+    errors['calculate_gain_reduction_from_db'] = max(_difference(target, expected),
+                                                     abs(next_prev - effect.variable('transient_detector_prev_db')))
+
+    gr_abs = np.abs(target)
+    release = select_program_release_coef(gr_abs, level, settings)
+    expected = [effect.call('select_program_release_coef', g, x) for g, x in zip(gr_abs, level)]
+    errors['select_program_release_coef'] = _difference(release, expected)
+
+    effect.set_variable('global_smoothed_gain_db', 0)
+    envelope, _ = process_envelope(target, level, settings)
+    expected = []
+    for t, x in zip(target, level):
+        # The chain's own skip test, then the envelope call
+        if abs(t) < 0.01 and abs(effect.variable('global_smoothed_gain_db')) < 0.01:
+            effect.set_variable('global_smoothed_gain_db', 0)
+        else:
+            effect.call('process_envelope_following', t, x)
+        expected.append(effect.variable('global_smoothed_gain_db'))
+    errors['process_envelope'] = _difference(envelope, expected)
+
+    audio = np.array([rng.uniform(-1, 1) for _ in range(samples)])
+    shaped = harmonic_stage(audio, target, envelope, settings)
+    expected = []
+    for x, t, e in zip(audio, target, envelope):
+        if settings.harmonic_type > 0 and abs(t) > 0.0001:
+            envelope_amount = abs(e) / 30.0
+            effect.set_variable('harmonic_combined_factor', abs(t) * 0.3 * (1 + envelope_amount * 0.2))
+            effect.set_variable('harmonic_amount', 1.0)
+            effect.set_variable('harmonic_intensity', abs(t) * 0.15 * (1 + envelope_amount * 0.2))
+            x = effect.call('apply_harmonic_processing', x, t, envelope_amount, 0, settings.harmonic_type,
+                            settings.harmonic_drive, settings.harmonic_mix, settings.harmonic_even_boost,
+                            settings.harmonic_odd_boost)
+        expected.append(x)
+    errors['harmonic_stage'] = _difference(shaped, expected)
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy reference models of Composure's compression stages.")
+    parser.add_argument('--check', action='store_true',
+                        help="diff every model against the JSFX run by eel2_interpreter.py")
+    parser.add_argument('--path', default='.', help="path to the JSFX directory (default: current directory)")
+    parser.add_argument('--root', default='Composure.jsfx', help="effect to check (default: Composure.jsfx)")
+    parser.add_argument('--cases', type=int, default=10,
+                        help="random curves and settings per release type (default: 10)")
+    parser.add_argument('--srate', type=float, default=44100.0, help="sample rate (default: 44100)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed (default: 1)")
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help="largest acceptable difference (default: 1e-9)")
+    args = parser.parse_args()
+
+    if not args.check:
+        parser.print_help()
+        return
+
+    from eel2_interpreter import EEL2Error, load_effect
+    try:
+        effect = load_effect(args.path, args.root, srate=args.srate)
+    except EEL2Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    worst = {}
+    start = time.perf_counter()
+    for release_type in range(5):
+        for _ in range(args.cases):
+            effect.reset()
+            errors = check_case(effect, random_curve(rng), random_settings(rng, args.srate, release_type), rng)
+            for model, error in errors.items():
+                worst[model] = max(worst.get(model, 0.0), float(error))
+    seconds = time.perf_counter() - start
+
+    print(f"{args.cases * 5} cases at {args.srate:g} Hz in {seconds:.1f}s "
+          f"(envelope: {'Numba' if njit is not None else 'Python loop'})")
+    print(f"\n{'Model':<36}{'Max difference':>16}")
+    print("-" * 52)
+    failed = False
+    for model, error in worst.items():
+        failed |= not error <= args.tolerance
+        print(f"{model:<36}{error:>16.3g}{'  FAIL' if not error <= args.tolerance else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
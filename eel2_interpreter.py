@@ -0,0 +1,1153 @@
+#!/usr/bin/env python3
+"""
+JSFX EEL2 Interpreter
+
+Runs a JSFX effect's @init, @slider, @block and @sample code over audio without
+REAPER, so the DSP chain can be benchmarked and regression-tested on a
+headless machine. Modules are loaded and imports resolved by
+function_analyzer2.py, so the interpreter runs exactly the code the analyzer
+checks.
+
+Usage: python3 eel2_interpreter.py input.wav [options]
+
+Example:
+    python3 eel2_interpreter.py drums.wav -o out.wav                    # Composure.jsfx, default sliders
+    python3 eel2_interpreter.py drums.wav --slider release_ms=250      # Override a slider (name or number)
+    python3 eel2_interpreter.py drums.wav --root VUmeter.jsfx --path .  # Another effect in the tree
+
+Supported EEL2 subset:
+- Functions with parameters, local(), instance() and this. namespaces
+- Variables (case-insensitive), sliders (named and sliderN), spl0..spl63,
+  srate, samplesblock, num_ch
+- Memory indexing (buf[i]), memset, memcpy and freembuf
+- loop(), while () () and while (), ?: conditionals and every EEL2 operator
+- The math built-ins (sin, cos, tan, atan2, sqr, sqrt, pow, exp, log, log10,
+  abs, min, max, sign, floor, ceil, invsqrt, rand, ...)
+- Strings and #variables as used by the slider file parser (strlen,
+  str_getchar, strcpy, strcpy_substr, strcmp, strncmp, strcat, sprintf)
+- file_open, file_string, file_avail and file_close on text files next to the
+  effect, and file_var/file_mem on handle 0 for @serialize state
+
+@gfx code is not run. Graphics, MIDI and other built-ins outside the subset
+raise EEL2Error when the code reaches them. NumPy arrays are accepted and
+returned when NumPy is installed; otherwise buffers are lists of frames.
+"""
+
+import argparse
+import io
+import math
+import random
+import re
+import struct
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from function_analyzer2 import (FUNCTION_MODIFIERS, JSFX_DEFAULT_MAXMEM, MAXMEM_PATTERN, TOKEN_DIRECTIVE,
+                                TOKEN_IDENT, TOKEN_NUMBER, TOKEN_OP, TOKEN_STRING, TOKEN_STRVAR, UNIMPORTED_ROOT,
+                                JSFXFunctionAnalyzer, Token, iter_section_spans, parse_slider_definitions)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; buffers can be plain lists of frames
+    np = None
+
+
+RUN_SECTIONS = ('@init', '@slider', '@block', '@sample', '@serialize')
+LOOP_LIMIT = 1048576        # EEL2 stops loop() and while() after this many iterations
+CLOSE_FACTOR = 0.00001      # EEL2's tolerance for ==, != and truth tests
+STRING_SLOTS = 1024         # numbered string slots 0..1023
+LITERAL_STRING_BASE = 10000  # handles of "string literals"
+NAMED_STRING_BASE = 90000    # handles of #strings
+CONSTANTS = {'$pi': math.pi, '$e': math.e, '$phi': (1 + math.sqrt(5)) / 2}
+DEFAULT_BLOCK_SIZE = 512
+
+Cell = List[float]           # one variable's storage; closures hold the cell, not the name
+Getter = Callable[[], float]
+
+
+class EEL2Error(Exception):
+    """Raised for code outside the supported EEL2 subset, or when a run fails"""
+
+
+class FunctionDefinition(NamedTuple):
+    name: str
+    params: List[Cell]
+    body: Getter
+    filename: str
+    line: int
+    namespaced: bool  # uses instance() variables or this.; calls must set the namespace
+
+
+class _Expression(NamedTuple):
+    get: Getter
+    target: Optional[tuple] = None  # how to assign to it: ('cell', cell), ('memory', base, index), ...
+
+
+class _Scope(NamedTuple):
+    name: str
+    cells: Dict[str, Cell]  # parameters and local() variables
+    instance: Set[str]
+    flags: Dict[str, bool]
+
+
+def _truthy(value: float) -> bool:
+    return abs(value) >= CLOSE_FACTOR
+
+
+def _to_int(value: float) -> int:
+    return int(value) if math.isfinite(value) else 0
+
+
+def _divide(a: float, b: float) -> float:
+    try:
+        return a / b
+    except ZeroDivisionError:
+        return math.nan if a == 0 or a != a else math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _modulo(a: float, b: float) -> float:
+    divisor = abs(_to_int(b))
+    return float(abs(_to_int(a)) % divisor) if divisor else 0.0
+
+
+def _power(a: float, b: float) -> float:
+    try:
+        result = a ** b
+    except OverflowError:
+        return math.inf
+    except ZeroDivisionError:
+        return math.inf
+    return result if isinstance(result, float) else math.nan  # a negative base with a fractional exponent
+
+
+def _log(function: Callable[[float], float]) -> Callable[[float], float]:
+    def safe(x: float) -> float:
+        if x > 0:
+            return function(x)
+        return -math.inf if x == 0 else math.nan
+    return safe
+
+
+def _guarded(function: Callable[..., float]) -> Callable[..., float]:
+    def safe(*args: float) -> float:
+        try:
+            return function(*args)
+        except OverflowError:
+            return math.inf
+        except ValueError:
+            return math.nan
+    return safe
+
+
+def _sign(x: float) -> float:
+    return 1.0 if x > 0 else -1.0 if x < 0 else 0.0
+
+
+MATH_BUILTINS: Dict[str, Callable[..., float]] = {
+    'sin': _guarded(math.sin), 'cos': _guarded(math.cos), 'tan': _guarded(math.tan),
+    'asin': _guarded(math.asin), 'acos': _guarded(math.acos), 'atan': math.atan, 'atan2': math.atan2,
+    'sinh': _guarded(math.sinh), 'cosh': _guarded(math.cosh), 'tanh': math.tanh,
+    'asinh': math.asinh, 'acosh': _guarded(math.acosh), 'atanh': _guarded(math.atanh),
+    'sqr': lambda x: x * x, 'sqrt': lambda x: math.sqrt(abs(x)),
+    'invsqrt': lambda x: 1 / math.sqrt(abs(x)) if x else math.inf,
+    'pow': _power, 'exp': _guarded(math.exp), 'log': _log(math.log), 'log10': _log(math.log10),
+    'abs': abs, 'min': min, 'max': max, 'sign': _sign,
+    'floor': _guarded(lambda x: float(math.floor(x))), 'ceil': _guarded(lambda x: float(math.ceil(x))),
+    'round': _guarded(lambda x: float(math.floor(x + 0.5))),
+}
+
+_BINARY_LEVELS = [('||',), ('&&',), ('==', '!=', '===', '!==', '<', '>', '<=', '>='), ('|', '&', '~'),
+                  ('+', '-'), ('*', '/'), ('<<', '>>'), ('%',), ('^',)]
+
+_COMBINE = {
+    '+=': lambda a, b: a + b, '-=': lambda a, b: a - b, '*=': lambda a, b: a * b, '/=': _divide,
+    '%=': _modulo, '^=': _power, '|=': lambda a, b: float(_to_int(a) | _to_int(b)),
+    '&=': lambda a, b: float(_to_int(a) & _to_int(b)), '~=': lambda a, b: float(_to_int(a) ^ _to_int(b)),
+}
+
+
+def _sequence(statements: List[Getter]) -> Getter:
+    """Run statements in order; the value is the last one's (0 for an empty block)"""
+    if not statements:
+        return lambda: 0.0
+    if len(statements) == 1:
+        return statements[0]
+    head = tuple(statements[:-1])
+    last = statements[-1]
+
+    def run():
+        for statement in head:
+            statement()
+        return last()
+    return run
+
+
+def _binary(operator: str, a: Getter, b: Getter) -> Getter:
+    if operator == '+':
+        return lambda: a() + b()
+    if operator == '-':
+        return lambda: a() - b()
+    if operator == '*':
+        return lambda: a() * b()
+    if operator == '/':
+        return lambda: _divide(a(), b())
+    if operator == '%':
+        return lambda: _modulo(a(), b())
+    if operator == '^':
+        return lambda: _power(a(), b())
+    if operator == '<':
+        return lambda: 1.0 if a() < b() else 0.0
+    if operator == '>':
+        return lambda: 1.0 if a() > b() else 0.0
+    if operator == '<=':
+        return lambda: 1.0 if a() <= b() else 0.0
+    if operator == '>=':
+        return lambda: 1.0 if a() >= b() else 0.0
+    if operator == '==':
+        return lambda: 1.0 if abs(a() - b()) < CLOSE_FACTOR else 0.0
+    if operator == '!=':
+        return lambda: 0.0 if abs(a() - b()) < CLOSE_FACTOR else 1.0
+    if operator == '===':
+        return lambda: 1.0 if a() == b() else 0.0
+    if operator == '!==':
+        return lambda: 0.0 if a() == b() else 1.0
+    if operator == '&&':
+        return lambda: 1.0 if _truthy(a()) and _truthy(b()) else 0.0
+    if operator == '||':
+        return lambda: 1.0 if _truthy(a()) or _truthy(b()) else 0.0
+    if operator == '|':
+        return lambda: float(_to_int(a()) | _to_int(b()))
+    if operator == '&':
+        return lambda: float(_to_int(a()) & _to_int(b()))
+    if operator == '~':
+        return lambda: float(_to_int(a()) ^ _to_int(b()))
+    if operator == '<<':
+        return lambda: float(_to_int(a()) << max(0, _to_int(b())))
+    if operator == '>>':
+        return lambda: float(_to_int(a()) >> max(0, _to_int(b())))
+    raise EEL2Error(f"unsupported operator {operator}")
+
+
+def _number(text: str) -> float:
+    if text.startswith("$'"):
+        return float(ord(text[2:-1].encode('utf-8').decode('unicode_escape')))
+    if text[:2].lower() in ('0x', '$x'):
+        return float(int(text[2:], 16))
+    return float(text)
+
+
+def _string_literal(text: str) -> str:
+    body = text[1:-1] if len(text) >= 2 and text[-1] == text[0] else text[1:]
+    return re.sub(r'\\(.)', lambda match: {'n': '\n', 't': '\t', 'r': '\r'}.get(match.group(1), match.group(1)), body)
+
+
+class _Parser:
+    """Compiles EEL2 tokens into nested Python closures
+
+    Grammar (loosest first): statements separated by ';', assignment, ?:,
+    ||, &&, comparisons, | & ~, + -, * /, << >>, %, ^, unary ! - +, and
+    postfix [index]. Variables are resolved to their cells at compile time.
+    """
+
+    def __init__(self, effect: 'JSFXEffect', tokens: List[Tuple[str, Token]]):
+        self.effect = effect
+        self.tokens = tokens
+        self.i = 0
+        self.scope: Optional[_Scope] = None
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        index = self.i + offset
+        return self.tokens[index][1].value if index < len(self.tokens) else None
+
+    def error(self, message: str) -> EEL2Error:
+        if self.i < len(self.tokens):
+            filename, token = self.tokens[self.i]
+            return EEL2Error(f"{filename}:{token.line}: {message} (at '{token.value}')")
+        return EEL2Error(f"{message} (at end of section)")
+
+    def expect(self, value: str):
+        if self.peek() != value:
+            raise self.error(f"expected '{value}'")
+        self.i += 1
+
+    def location(self) -> Tuple[str, int]:
+        filename, token = self.tokens[min(self.i, len(self.tokens) - 1)]
+        return filename, token.line
+
+    def parse_program(self) -> Getter:
+        code = self.parse_sequence(())
+        if self.i < len(self.tokens):
+            raise self.error("unexpected token")
+        return code
+
+    def parse_sequence(self, terminators: Tuple[str, ...]) -> Getter:
+        statements = []
+        while self.i < len(self.tokens) and self.peek() not in terminators:
+            if self.peek() == ';':
+                self.i += 1
+                continue
+            is_definition = self.peek() == 'function' and self.tokens[self.i][1].kind == TOKEN_IDENT
+            statement = self.parse_assignment()
+            if not is_definition:
+                statements.append(statement.get)
+            if self.peek() == ';':
+                self.i += 1
+            elif not is_definition and self.i < len(self.tokens) and self.peek() not in terminators:
+                raise self.error("expected ';'")
+        return _sequence(statements)
+
+    def parse_assignment(self) -> _Expression:
+        left = self.parse_ternary()
+        operator = self.peek()
+        if operator != '=' and operator not in _COMBINE:
+            return left
+        self.i += 1
+        right = self.parse_assignment()
+        return _Expression(self.assign(left, operator, right.get))
+
+    def parse_ternary(self) -> _Expression:
+        condition = self.parse_binary(0)
+        if self.peek() != '?':
+            return condition
+        self.i += 1
+        test = condition.get
+        then = self.parse_assignment().get
+        if self.peek() != ':':
+            return _Expression(lambda: then() if _truthy(test()) else 0.0)
+        self.i += 1
+        otherwise = self.parse_assignment().get
+        return _Expression(lambda: then() if _truthy(test()) else otherwise())
+
+    def parse_binary(self, level: int) -> _Expression:
+        if level == len(_BINARY_LEVELS):
+            return self.parse_unary()
+        operators = _BINARY_LEVELS[level]
+        left = self.parse_binary(level + 1)
+        while self.peek() in operators and self.tokens[self.i][1].kind == TOKEN_OP:
+            operator = self.peek()
+            self.i += 1
+            right = self.parse_binary(level + 1)
+            left = _Expression(_binary(operator, left.get, right.get))
+        return left
+
+    def parse_unary(self) -> _Expression:
+        operator = self.peek()
+        if operator in ('-', '+', '!') and self.tokens[self.i][1].kind == TOKEN_OP:
+            self.i += 1
+            operand = self.parse_unary().get
+            if operator == '-':
+                return _Expression(lambda: -operand())
+            if operator == '!':
+                return _Expression(lambda: 0.0 if _truthy(operand()) else 1.0)
+            return _Expression(operand)
+        return self.parse_postfix()
+
+    def parse_postfix(self) -> _Expression:
+        expression = self.parse_primary()
+        while self.peek() == '[':
+            self.i += 1
+            index = self.parse_sequence((']',))
+            self.expect(']')
+            expression = self.memory(expression.get, index)
+        return expression
+
+    def parse_primary(self) -> _Expression:
+        if self.i >= len(self.tokens):
+            raise self.error("expected an expression")
+        filename, token = self.tokens[self.i]
+        self.i += 1
+        if token.kind == TOKEN_NUMBER:
+            value = _number(token.value)
+            return _Expression(lambda: value)
+        if token.kind == TOKEN_STRING:
+            handle = self.effect.literal_string(_string_literal(token.value))
+            return _Expression(lambda: handle)
+        if token.kind == TOKEN_STRVAR:
+            handle = self.effect.named_string(token.value.lower())
+            return _Expression(lambda: handle, ('string', handle))
+        if token.kind == TOKEN_OP and token.value == '(':
+            code = self.parse_sequence((')',))
+            self.expect(')')
+            return _Expression(code)
+        if token.kind != TOKEN_IDENT:
+            self.i -= 1
+            raise self.error("expected an expression")
+
+        name = token.value.lower()
+        if name == 'function':
+            self.parse_function(filename)
+            return _Expression(lambda: 0.0)
+        if self.peek() == '(':
+            if name == 'while':
+                return self.parse_while()
+            if name == 'loop':
+                return self.parse_loop()
+            return self.call(name, self.parse_arguments(), filename, token.line)
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return _Expression(lambda: value)
+        if name.startswith('$'):
+            self.i -= 1
+            raise self.error("unknown constant")
+        return self.variable(name)
+
+    def parse_arguments(self) -> List[_Expression]:
+        self.expect('(')
+        arguments = []
+        if self.peek() == ')':
+            self.i += 1
+            return arguments
+        while True:
+            # A lone lvalue keeps its target so file_var() can assign to it
+            first = self.parse_assignment()
+            if self.peek() in (',', ')'):
+                arguments.append(first)
+            else:
+                self.expect(';')
+                rest = self.parse_sequence((',', ')'))
+                arguments.append(_Expression(_sequence([first.get, rest])))
+            if self.peek() == ',':
+                self.i += 1
+                continue
+            self.expect(')')
+            return arguments
+
+    def parse_while(self) -> _Expression:
+        self.expect('(')
+        condition = self.parse_sequence((')',))
+        self.expect(')')
+        if self.peek() == '(':
+            self.i += 1
+            body = self.parse_sequence((')',))
+            self.expect(')')
+
+            def run_while():
+                count = 0
+                while count < LOOP_LIMIT and _truthy(condition()):
+                    body()
+                    count += 1
+                return 0.0
+            return _Expression(run_while)
+
+        def run_do_while():
+            count = 1
+            while _truthy(condition()) and count < LOOP_LIMIT:
+                count += 1
+            return 0.0
+        return _Expression(run_do_while)
+
+    def parse_loop(self) -> _Expression:
+        self.expect('(')
+        count = self.parse_sequence((',',))
+        self.expect(',')
+        body = self.parse_sequence((')',))
+        self.expect(')')
+
+        def run_loop():
+            value = 0.0
+            for _ in range(max(0, min(LOOP_LIMIT, _to_int(count())))):
+                value = body()
+            return value
+        return _Expression(run_loop)
+
+    def parse_function(self, filename: str):
+        line = self.tokens[self.i][1].line if self.i < len(self.tokens) else 0
+        if self.i >= len(self.tokens) or self.tokens[self.i][1].kind != TOKEN_IDENT:
+            raise self.error("expected a function name")
+        if self.scope is not None:
+            raise self.error("functions cannot be defined inside functions")
+        name = self.tokens[self.i][1].value.lower()
+        self.i += 1
+        params = self.parse_names()
+        local_names, instance = set(), set()
+        while (self.i < len(self.tokens) and self.tokens[self.i][1].kind == TOKEN_IDENT and
+               self.peek().lower() in FUNCTION_MODIFIERS and self.peek(1) == '('):
+            modifier = self.peek().lower()
+            self.i += 1
+            names = self.parse_names()
+            if modifier in ('local', 'static'):
+                local_names.update(names)
+            elif modifier == 'instance':
+                instance.update(names)
+        cells = {variable: [0.0] for variable in params + sorted(local_names)}
+        self.effect.cells.extend(cells.values())
+        self.scope = _Scope(name, cells, instance, {'namespaced': bool(instance)})
+        try:
+            self.expect('(')
+            body = self.parse_sequence((')',))
+            self.expect(')')
+        finally:
+            scope, self.scope = self.scope, None
+        self.effect.functions[name] = FunctionDefinition(name, [cells[param] for param in params], body, filename,
+                                                         line, scope.flags['namespaced'])
+
+    def parse_names(self) -> List[str]:
+        self.expect('(')
+        names = []
+        while self.peek() != ')':
+            if self.i >= len(self.tokens):
+                raise self.error("unclosed parameter list")
+            if self.tokens[self.i][1].kind == TOKEN_IDENT:
+                names.append(self.peek().lower())
+            elif self.peek() != ',':
+                raise self.error("expected a name")
+            self.i += 1
+        self.i += 1
+        return names
+
+    def variable(self, name: str) -> _Expression:
+        effect = self.effect
+        scope = self.scope
+        if scope is not None:
+            if name in scope.cells:
+                cell = scope.cells[name]
+                return _Expression(lambda: cell[0], ('cell', cell))
+            member = name[5:] if name.startswith('this.') else name if name in scope.instance else None
+            if member is not None:
+                scope.flags['namespaced'] = True
+
+                def instance_cell() -> Cell:
+                    return effect.global_cell(f"{effect.namespace}.{member}" if effect.namespace else member)
+                return _Expression(lambda: instance_cell()[0], ('dynamic', instance_cell))
+        cell = effect.global_cell(name)
+        return _Expression(lambda: cell[0], ('cell', cell))
+
+    def memory(self, base: Getter, index: Getter) -> _Expression:
+        memory = self.effect.memory
+        size = len(memory)
+
+        def read():
+            address = base() + index() + CLOSE_FACTOR
+            return memory[int(address)] if 0.0 <= address < size else 0.0
+        return _Expression(read, ('memory', base, index))
+
+    def assign(self, left: _Expression, operator: str, value: Getter) -> Getter:
+        target = left.target
+        combine = _COMBINE.get(operator)
+        if target is None:
+            if left.get is not None and operator == '=':
+                call = left.get
+
+                def evaluate_only():  # e.g. `file_avail(handle) = 0`, which EEL2 accepts and ignores
+                    result = value()
+                    call()
+                    return result
+                return evaluate_only
+            raise self.error("cannot assign to this expression")
+        kind = target[0]
+        if kind == 'cell':
+            cell = target[1]
+            if combine is None:
+                def set_cell():
+                    cell[0] = result = value()
+                    return result
+                return set_cell
+
+            def update_cell():
+                cell[0] = result = combine(cell[0], value())
+                return result
+            return update_cell
+        if kind == 'dynamic':
+            get_cell = target[1]
+
+            def set_dynamic():
+                cell = get_cell()
+                cell[0] = result = value() if combine is None else combine(cell[0], value())
+                return result
+            return set_dynamic
+        if kind == 'memory':
+            _, base, index = target
+            memory = self.effect.memory
+            size = len(memory)
+
+            def set_memory():
+                address = base() + index() + CLOSE_FACTOR
+                inside = 0.0 <= address < size
+                result = value()
+                if combine is not None:
+                    result = combine(memory[int(address)] if inside else 0.0, result)
+                if inside:
+                    memory[int(address)] = result
+                return result
+            return set_memory
+        if kind == 'string':
+            handle = target[1]
+            effect = self.effect
+
+            def set_string():
+                text = effect.string(value())
+                effect.strings[handle] = effect.strings.get(handle, '') + text if operator == '+=' else text
+                return handle
+            return set_string
+        if kind == 'channel':
+            get_cell = target[1]
+
+            def set_channel():
+                cell = get_cell()
+                cell[0] = result = value() if combine is None else combine(cell[0], value())
+                return result
+            return set_channel
+        raise self.error("cannot assign to this expression")
+
+    def call(self, name: str, arguments: List[_Expression], filename: str, line: int) -> _Expression:
+        effect = self.effect
+        getters = [argument.get for argument in arguments]
+        if self.scope is not None and name.startswith('this.'):
+            self.scope.flags['namespaced'] = True
+
+        if name in ('spl', 'slider') and len(getters) == 1:
+            prefix = name
+            index = getters[0]
+
+            def channel_cell() -> Cell:
+                return effect.global_cell(f"{prefix}{_to_int(index())}")
+            return _Expression(lambda: channel_cell()[0], ('channel', channel_cell))
+
+        resolved: List[Optional[Getter]] = [None]
+
+        def invoke():
+            function = resolved[0]
+            if function is None:
+                function = resolved[0] = effect.resolve_call(name, arguments, filename, line)
+            return function()
+        return _Expression(invoke)
+
+
+class JSFXEffect:
+    """One instance of a JSFX effect, compiled from the analyzer's loaded modules
+
+    Each section's code is the concatenation of that section in every
+    module of the root's processing order, as JSFX builds it. reset() runs
+    @init and @slider; process() then runs @block once per block and
+    @sample once per frame.
+    """
+
+    def __init__(self, analyzer: JSFXFunctionAnalyzer, root: str, srate: float = 44100.0, channels: int = 2,
+                 block_size: int = DEFAULT_BLOCK_SIZE, seed: int = 0):
+        self.analyzer = analyzer
+        self.root = root
+        self.srate = float(srate)
+        self.channels = channels
+        self.block_size = block_size
+        self.seed = seed
+        self.directory = analyzer.base_path / Path(root).parent
+        self.globals: Dict[str, Cell] = {}
+        self.cells: List[Cell] = []
+        self.functions: Dict[str, FunctionDefinition] = {}
+        self.namespace = ''
+        self.strings: Dict[int, str] = {}
+        self.literals: Dict[int, str] = {}
+        self._named_strings: Dict[str, int] = {}
+        self._files: Dict[int, dict] = {}
+        self._state: Optional[List[float]] = None   # @serialize values being read, or None
+        self._written: Optional[List[float]] = None  # @serialize values being written, or None
+        self._slider_changed = False
+        self.random = random.Random(seed)
+
+        maxmem = JSFX_DEFAULT_MAXMEM
+        tokens = analyzer.get_tokens(root)
+        for token in tokens:
+            if token.kind == TOKEN_DIRECTIVE and token.value.startswith('options:'):
+                match = MAXMEM_PATTERN.search(token.value)
+                if match:
+                    maxmem = int(match.group(1))
+        self.memory: List[float] = [0.0] * maxmem
+
+        # A named slider and sliderN are the same variable
+        self.sliders = parse_slider_definitions(tokens)
+        for slider in self.sliders.values():
+            cell = self.global_cell(f"slider{slider.index}")
+            self.globals[slider.variable.lower()] = cell
+        self.spl = [self.global_cell(f"spl{channel}") for channel in range(64)]
+
+        sections: Dict[str, List[Tuple[str, Token]]] = {section: [] for section in RUN_SECTIONS}
+        for filename in analyzer.get_root_orders()[root]:
+            if filename not in analyzer.modules:
+                continue
+            module_tokens = analyzer.get_tokens(filename)
+            for section, start, end in iter_section_spans(module_tokens):
+                if section in sections:
+                    code = sections[section]
+                    code.extend((filename, token) for token in module_tokens[start:end])
+                    code.append((filename, Token(TOKEN_OP, ';', module_tokens[end - 1].line if end > start else 0, 0)))
+        self.code: Dict[str, Getter] = {section: _Parser(self, code).parse_program()
+                                        for section, code in sections.items()}
+        self.reset()
+
+    # --- variables and strings -------------------------------------------------
+
+    def global_cell(self, name: str) -> Cell:
+        cell = self.globals.get(name)
+        if cell is None:
+            cell = self.globals[name] = [0.0]
+            self.cells.append(cell)
+        return cell
+
+    def literal_string(self, text: str) -> float:
+        handle = LITERAL_STRING_BASE + len(self.literals)
+        self.literals[handle] = text
+        self.strings[handle] = text
+        return float(handle)
+
+    def named_string(self, name: str) -> float:
+        if name == '#':  # an anonymous temporary string
+            name = f"#{len(self._named_strings)}"
+        handle = self._named_strings.setdefault(name, NAMED_STRING_BASE + len(self._named_strings))
+        return float(handle)
+
+    def string(self, handle: float) -> str:
+        return self.strings.get(_to_int(handle), '')
+
+    def variable(self, name: str) -> float:
+        """Return a global variable's current value (0 if it was never used)"""
+        cell = self.globals.get(name.lower())
+        return cell[0] if cell is not None else 0.0
+
+    def set_variable(self, name: str, value: float):
+        self.global_cell(name.lower())[0] = float(value)
+
+    def call(self, name: str, *args: float) -> float:
+        """Call a user-defined function from Python and return its value"""
+        function = self.functions.get(name.lower())
+        if function is None:
+            raise EEL2Error(f"{self.root} defines no function {name}()")
+        getters = [lambda value=float(value): value for value in args]
+        return self.resolve_call(function.name, [_Expression(getter) for getter in getters], '<python>', 0)()
+
+    # --- calls -------------------------------------------------------------------
+
+    def resolve_call(self, name: str, arguments: List['_Expression'], filename: str, line: int) -> Getter:
+        """Return the closure for a call, resolved the first time it runs"""
+        getters = [argument.get for argument in arguments]
+        namespace = None
+        function = self.functions.get(name)
+        if function is None and '.' in name:
+            prefix, _, short = name.rpartition('.')
+            function = self.functions.get(short)
+            namespace = prefix
+        if function is not None:
+            if len(getters) != len(function.params):
+                raise EEL2Error(f"{filename}:{line}: {function.name}() takes {len(function.params)} "
+                                f"parameters but is called with {len(getters)}")
+            return self._user_call(function, getters, namespace)
+        builtin = MATH_BUILTINS.get(name)
+        if builtin is not None:
+            if len(getters) == 1:
+                a, = getters
+                return lambda: builtin(a())
+            if len(getters) == 2:
+                a, b = getters
+                return lambda: builtin(a(), b())
+            return lambda: builtin(*[getter() for getter in getters])
+        method = getattr(self, f"_builtin_{name}", None)
+        if method is not None:
+            if name in ('file_var',):
+                return lambda: method(arguments)
+            return lambda: method(*[getter() for getter in getters])
+
+        def unsupported():
+            raise EEL2Error(f"{filename}:{line}: {name}() is not supported by the interpreter")
+        return unsupported
+
+    def _user_call(self, function: FunctionDefinition, getters: List[Getter], namespace: Optional[str]) -> Getter:
+        params = function.params
+        body = function.body
+        pairs = tuple(zip(params, getters))
+        if not function.namespaced:
+            if not pairs:
+                return body
+            if len(pairs) == 1:
+                (cell, getter), = pairs
+
+                def call_one():
+                    cell[0] = getter()
+                    return body()
+                return call_one
+
+            def call():
+                values = [getter() for _, getter in pairs]
+                for cell, value in zip(params, values):
+                    cell[0] = value
+                return body()
+            return call
+
+        def call_namespaced():
+            values = [getter() for _, getter in pairs]
+            for cell, value in zip(params, values):
+                cell[0] = value
+            saved = self.namespace
+            if namespace is None:
+                self.namespace = ''
+            elif namespace == 'this' or namespace.startswith('this.'):
+                suffix = namespace[5:]
+                self.namespace = '.'.join(part for part in (saved, suffix) if part)
+            else:
+                self.namespace = namespace
+            try:
+                return body()
+            finally:
+                self.namespace = saved
+        return call_namespaced
+
+    # --- built-ins outside the math library -----------------------------------
+
+    def _builtin_rand(self, x: float = 1.0) -> float:
+        return self.random.random() * x
+
+    def _builtin_memset(self, dest: float, value: float, length: float) -> float:
+        start, count = _to_int(dest), _to_int(length)
+        if count > 0 and start >= 0:
+            end = min(len(self.memory), start + count)
+            self.memory[start:end] = [value] * max(0, end - start)
+        return dest
+
+    def _builtin_memcpy(self, dest: float, source: float, length: float) -> float:
+        target, start, count = _to_int(dest), _to_int(source), _to_int(length)
+        if count > 0 and target >= 0 and start >= 0:
+            count = min(count, len(self.memory) - target, len(self.memory) - start)
+            self.memory[target:target + count] = self.memory[start:start + count]
+        return dest
+
+    def _builtin_freembuf(self, top: float) -> float:
+        return top
+
+    def _builtin_time(self) -> float:
+        return time.time()
+
+    def _builtin_time_precise(self) -> float:
+        return time.perf_counter()
+
+    def _builtin_sliderchange(self, *args: float) -> float:
+        return 0.0
+
+    _builtin_slider_automate = _builtin_sliderchange
+    _builtin_slider_show = _builtin_sliderchange
+    _builtin_slider_next_chg = _builtin_sliderchange
+
+    def _builtin_strlen(self, handle: float) -> float:
+        return float(len(self.string(handle)))
+
+    def _builtin_str_getchar(self, handle: float, index: float, kind: float = 0.0) -> float:
+        text = self.string(handle)
+        position = _to_int(index)
+        if position < 0:
+            position += len(text)
+        return float(ord(text[position])) if 0 <= position < len(text) else 0.0
+
+    def _builtin_str_setchar(self, handle: float, index: float, value: float, kind: float = 0.0) -> float:
+        text = self.string(handle)
+        position = _to_int(index)
+        if position < 0:
+            position += len(text)
+        if 0 <= position <= len(text):
+            self.strings[_to_int(handle)] = text[:position] + chr(_to_int(value) & 0xFF) + text[position + 1:]
+        return handle
+
+    def _builtin_strcpy(self, dest: float, source: float) -> float:
+        self.strings[_to_int(dest)] = self.string(source)
+        return dest
+
+    def _builtin_strcat(self, dest: float, source: float) -> float:
+        self.strings[_to_int(dest)] = self.string(dest) + self.string(source)
+        return dest
+
+    def _builtin_strcpy_substr(self, dest: float, source: float, offset: float, length: float = -0.0) -> float:
+        text = self.string(source)
+        start = _to_int(offset)
+        if start < 0:
+            start = max(0, len(text) + start)
+        count = _to_int(length)
+        end = len(text) + count if count < 0 or length == 0 and math.copysign(1, length) < 0 else start + count
+        self.strings[_to_int(dest)] = text[start:max(start, end)]
+        return dest
+
+    @staticmethod
+    def _compare(a: str, b: str) -> float:
+        return float((a > b) - (a < b))
+
+    def _builtin_strcmp(self, a: float, b: float) -> float:
+        return self._compare(self.string(a), self.string(b))
+
+    def _builtin_stricmp(self, a: float, b: float) -> float:
+        return self._compare(self.string(a).lower(), self.string(b).lower())
+
+    def _builtin_strncmp(self, a: float, b: float, count: float) -> float:
+        limit = _to_int(count)
+        return self._compare(self.string(a)[:limit], self.string(b)[:limit])
+
+    def _builtin_strnicmp(self, a: float, b: float, count: float) -> float:
+        limit = _to_int(count)
+        return self._compare(self.string(a)[:limit].lower(), self.string(b)[:limit].lower())
+
+    def _builtin_sprintf(self, dest: float, fmt: float, *values: float) -> float:
+        remaining = list(values)
+
+        def convert(match):
+            spec = match.group(0)
+            if spec == '%%':
+                return '%'
+            value = remaining.pop(0) if remaining else 0.0
+            kind = spec[-1]
+            if kind == 's':
+                return spec % self.string(value)
+            if kind == 'c':
+                return chr(_to_int(value) & 0xFF)
+            if kind in 'diouxX':
+                return spec.replace('u', 'd') % _to_int(value)
+            return spec % value
+        self.strings[_to_int(dest)] = re.sub(r'%%|%[-+ #0]*\d*(?:\.\d+)?[diouxXeEfgGcs]', convert, self.string(fmt))
+        return dest
+
+    def _builtin_file_open(self, path: float) -> float:
+        name = self.string(path)
+        if not name:
+            return -1.0
+        try:
+            lines = (self.directory / name).read_text(encoding='utf-8', errors='replace').splitlines()
+        except OSError:
+            return -1.0
+        handle = max(self._files, default=0) + 1
+        self._files[handle] = {'lines': lines, 'position': 0}
+        return float(handle)
+
+    def _builtin_file_close(self, handle: float) -> float:
+        self._files.pop(_to_int(handle), None)
+        return 0.0
+
+    def _builtin_file_text(self, handle: float) -> float:
+        return 1.0 if _to_int(handle) in self._files else 0.0
+
+    def _builtin_file_rewind(self, handle: float) -> float:
+        if _to_int(handle) in self._files:
+            self._files[_to_int(handle)]['position'] = 0
+        return handle
+
+    def _builtin_file_avail(self, handle: float) -> float:
+        if _to_int(handle) == 0:
+            return float(len(self._state)) if self._state is not None else -1.0
+        file = self._files.get(_to_int(handle))
+        if file is None:
+            return -1.0
+        return 1.0 if file['position'] < len(file['lines']) else 0.0
+
+    def _builtin_file_string(self, handle: float, dest: float) -> float:
+        file = self._files.get(_to_int(handle))
+        if file is None or file['position'] >= len(file['lines']):
+            self.strings[_to_int(dest)] = ''
+            return 0.0
+        self.strings[_to_int(dest)] = file['lines'][file['position']]
+        file['position'] += 1
+        return float(len(self.strings[_to_int(dest)]))
+
+    def _builtin_file_var(self, arguments: List['_Expression']) -> float:
+        if len(arguments) != 2:
+            raise EEL2Error("file_var() takes 2 parameters")
+        handle, variable = arguments
+        if _to_int(handle.get()) != 0:
+            return 0.0
+        if self._state is not None:
+            value = self._state.pop(0) if self._state else 0.0
+            if variable.target is not None:
+                constant = lambda: value
+                _Parser(self, []).assign(variable, '=', constant)()
+        elif self._written is not None:
+            self._written.append(variable.get())
+        return 1.0
+
+    def _builtin_file_mem(self, handle: float, offset: float, length: float) -> float:
+        start, count = _to_int(offset), _to_int(length)
+        if _to_int(handle) != 0 or count <= 0 or start < 0:
+            return 0.0
+        count = min(count, len(self.memory) - start)
+        if self._state is not None:
+            values, self._state = self._state[:count], self._state[count:]
+            self.memory[start:start + len(values)] = values
+        elif self._written is not None:
+            self._written.extend(self.memory[start:start + count])
+        return float(count)
+
+    # --- running ---------------------------------------------------------------
+
+    def reset(self):
+        """Start a fresh instance: clear all state, load slider defaults, then run @init and @slider"""
+        for cell in self.cells:
+            cell[0] = 0.0
+        self.memory[:] = [0.0] * len(self.memory)
+        self.strings = dict(self.literals)
+        self._files.clear()
+        self.random = random.Random(self.seed)
+        self.namespace = ''
+        for name, value in (('srate', self.srate), ('num_ch', float(self.channels)),
+                            ('samplesblock', float(self.block_size)), ('tempo', 120.0), ('play_state', 1.0),
+                            ('ts_num', 4.0), ('ts_denom', 4.0)):
+            self.global_cell(name)[0] = value
+        for slider in self.sliders.values():
+            self.global_cell(f"slider{slider.index}")[0] = slider.default
+        self.code['@init']()
+        self.code['@slider']()
+        self._slider_changed = False
+
+    def set_slider(self, slider: Union[int, str], value: float):
+        """Set a slider by number or variable name; @slider runs before the next block"""
+        if isinstance(slider, str) and not slider.isdigit():
+            if slider not in self.sliders:
+                raise EEL2Error(f"{self.root} has no slider named {slider}")
+            index = self.sliders[slider].index
+        else:
+            index = int(slider)
+        self.global_cell(f"slider{index}")[0] = float(value)
+        self._slider_changed = True
+
+    def process(self, buffer):
+        """Run @block and @sample over a buffer and return the processed audio
+
+        `buffer` is a sequence of frames (each a sequence of channel values,
+        or a single value for mono) or a NumPy array shaped (frames,) or
+        (frames, channels). The result has the same shape and type.
+        """
+        is_array = np is not None and isinstance(buffer, np.ndarray)
+        mono = (buffer.ndim == 1) if is_array else bool(len(buffer)) and not isinstance(buffer[0], (list, tuple))
+        if is_array:
+            frames = buffer.reshape(len(buffer), -1).astype(float).tolist()
+        else:
+            frames = [[float(value)] for value in buffer] if mono else [[float(v) for v in frame] for frame in buffer]
+
+        spl = self.spl
+        sample = self.code['@sample']
+        block = self.code['@block']
+        samplesblock = self.global_cell('samplesblock')
+        output = []
+        append = output.append
+        for start in range(0, len(frames), self.block_size):
+            chunk = frames[start:start + self.block_size]
+            if self._slider_changed:
+                self._slider_changed = False
+                self.code['@slider']()
+            samplesblock[0] = float(len(chunk))
+            block()
+            for frame in chunk:
+                for cell, value in zip(spl, frame):
+                    cell[0] = value
+                sample()
+                append([spl[channel][0] for channel in range(len(frame))])
+
+        if is_array:
+            result = np.asarray(output, dtype=np.float64)
+            return result.reshape(len(result)) if mono else result
+        return [frame[0] for frame in output] if mono else output
+
+    def save_state(self) -> List[float]:
+        """Run @serialize in write mode and return the values it stores"""
+        self._written = []
+        try:
+            self.code['@serialize']()
+            return self._written
+        finally:
+            self._written = None
+
+    def load_state(self, values: Sequence[float]):
+        """Run @serialize in read mode over values returned by save_state()"""
+        self._state = [float(value) for value in values]
+        try:
+            self.code['@serialize']()
+        finally:
+            self._state = None
+        self._slider_changed = True
+
+
+def load_effect(path: str = '.', root: Optional[str] = None, **options) -> JSFXEffect:
+    """Load a JSFX tree with the analyzer and compile one of its .jsfx roots
+
+    `root` defaults to the first .jsfx root in the tree. Remaining keyword
+    arguments go to JSFXEffect (srate, channels, block_size, seed).
+    """
+    analyzer = JSFXFunctionAnalyzer(path, use_cache=False, verbose=False, output=io.StringIO())
+    analyzer.load_modules()
+    analyzer.parse_imports()
+    roots = [name for name in analyzer.get_root_orders() if name != UNIMPORTED_ROOT]
+    if root is None:
+        if not roots:
+            raise EEL2Error(f"no .jsfx effect found in {path}")
+        root = roots[0]
+    if root not in roots:
+        raise EEL2Error(f"{root} is not a .jsfx root in {path} (found: {', '.join(roots) or 'none'})")
+    return JSFXEffect(analyzer, root, **options)
+
+
+def read_wav(path: str) -> Tuple[List[List[float]], int]:
+    """Read an 8/16/24/32-bit PCM WAV file into frames of floats in [-1, 1) and its sample rate"""
+    with wave.open(str(path), 'rb') as wav:
+        channels, width, rate, count = wav.getnchannels(), wav.getsampwidth(), wav.getframerate(), wav.getnframes()
+        data = wav.readframes(count)
+    scale = float(1 << (8 * width - 1))
+    if width == 1:
+        values = [(byte - 128) / scale for byte in data]
+    elif width == 3:
+        values = [int.from_bytes(data[i:i + 3], 'little', signed=True) / scale for i in range(0, len(data), 3)]
+    else:
+        values = [value / scale for value in struct.unpack(f"<{len(data) // width}{'h' if width == 2 else 'i'}", data)]
+    return [values[i:i + channels] for i in range(0, len(values), channels)], rate
+
+
+def write_wav(path: str, frames: Sequence[Sequence[float]], rate: int, width: int = 3):
+    """Write frames of floats to a PCM WAV file, clipping to [-1, 1)"""
+    channels = len(frames[0]) if len(frames) else 1
+    scale = float(1 << (8 * width - 1))
+    limit = int(scale) - 1
+
+    def quantize(value: float) -> int:
+        return max(-limit - 1, min(limit, int(round(value * scale)))) if value == value else 0
+    samples = [quantize(value) for frame in frames for value in frame]
+    if width == 1:
+        data = bytes(sample + 128 for sample in samples)
+    elif width == 3:
+        data = b''.join(sample.to_bytes(3, 'little', signed=True) for sample in samples)
+    else:
+        data = struct.pack(f"<{len(samples)}{'h' if width == 2 else 'i'}", *samples)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSFX effect's DSP code over a WAV file without REAPER.")
+    parser.add_argument('input', help="PCM WAV file to process")
+    parser.add_argument('-o', '--output', help="write the processed audio to this WAV file")
+    parser.add_argument('--path', default='.', help="path to the JSFX directory (default: current directory)")
+    parser.add_argument('--root', help="effect to run (default: the first .jsfx in the tree)")
+    parser.add_argument('--slider', action='append', default=[], metavar='NAME=VALUE',
+                        help="set a slider by variable name or number before processing (repeatable)")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f"samples per @block call (default: {DEFAULT_BLOCK_SIZE})")
+    args = parser.parse_args()
+
+    frames, rate = read_wav(args.input)
+    try:
+        effect = load_effect(args.path, args.root, srate=rate, channels=len(frames[0]) if frames else 2,
+                             block_size=args.block_size)
+        for setting in args.slider:
+            name, separator, value = setting.partition('=')
+            if not separator:
+                parser.error(f"--slider expects NAME=VALUE, got {setting}")
+            effect.set_slider(name, float(value))
+        start = time.perf_counter()
+        output = effect.process(frames)
+        seconds = time.perf_counter() - start
+    except EEL2Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{effect.root}: {len(frames)} frames at {rate} Hz in {seconds:.2f}s "
+          f"({seconds / max(len(frames), 1) * 1e6:.1f} us/frame, {len(frames) / rate / seconds if seconds else 0:.3f}x realtime)")
+    if args.output:
+        write_wav(args.output, output, rate)
+        print(f"Output written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,10 @@ This script analyzes a JSFX modular codebase to:
 6. Check for function order issues
 7. Check for parameter count mismatches
 
-Usage: python3 function_analyzer2.py [path_to_jsfx_files]
+Usage: python3 function_analyzer2.py [path_to_jsfx_files] [--format text|jsonl|sarif] [-o FILE] [--verbose]
+                                     [--no-cache] [--cache-dir DIR] [--jobs N] [--watch]
+                                     [--sections] [--hoisting] [--lut] [--memory] [--gfx] [--caches] [--denormals] [--inlining] [--slider-table]
+                                     [--compare BEFORE [AFTER] [--max-increase [METRIC=]PCT]] [--bundle DIR [--strip-comments]] [--profile] [--profile-json FILE] [--profile-dump FILE]
 
 If no path is provided, the current directory will be analyzed by default.
 
@@ -19,42 +22,3109 @@ Example:
     python3 function_analyzer2.py                     # Analyzes current directory
     python3 function_analyzer2.py .                   # Analyzes current directory
     python3 function_analyzer2.py /path/to/jsfx/modules  # Analyzes specific path
+    python3 function_analyzer2.py . --watch           # Re-analyzes incrementally on every save
+    python3 function_analyzer2.py . --format sarif -o analysis.sarif  # Machine-readable findings for CI
+    python3 function_analyzer2.py . --sections        # Section call graph and @sample cost estimate
+    python3 function_analyzer2.py . --hoisting        # Per-sample work that could move to @slider/@block
+    python3 function_analyzer2.py . --lut             # Per-sample functions a lookup table could replace
+    python3 function_analyzer2.py . --memory          # Memory region map and out-of-region indexing
+    python3 function_analyzer2.py . --gfx             # Draw calls per @gfx frame and curve cache bypasses
+    python3 function_analyzer2.py . --caches          # Missing and redundant cache invalidations
+    python3 function_analyzer2.py . --denormals       # Recursive @sample state without denormal protection
+    python3 function_analyzer2.py . --inlining        # Code size per section with every call inlined
+    python3 function_analyzer2.py . --slider-table    # Regenerate 01_Utils/04_slider_table.jsfx-inc
+    python3 function_analyzer2.py . --compare HEAD~1 HEAD --max-increase 5  # Fail CI on a >5% regression
+    python3 function_analyzer2.py . --bundle dist --strip-comments  # Single-file .jsfx without dead code
+    python3 function_analyzer2.py . --profile-dump analysis.collapsed # Per-phase profile plus flamegraph input
 
 Features:
 - Respects JSFX modular architecture with phase-based imports
 - Handles dependency resolution with topological sorting
+- Analyzes every .jsfx entry point against one shared import graph
 - Detects circular dependencies
 - Filters out JSFX built-in functions and variables
 - Provides detailed reporting of undeclared function calls
 - Detects unused functions
 - Checks function declaration order within files
+- Builds one symbol table (definitions and every call site) shared by all checks
 - Validates parameter count mismatches
 - Supports both .jsfx-inc and .jsfx files
+- Tokenizes each module once; every pass reads the shared token stream
+- Caches per-module facts in .jsfx_analysis_cache/ keyed by content hash, so
+  unchanged modules are not re-parsed on the next run (disable with --no-cache)
+- Reads and parses modules in parallel with --jobs N
+- Streams findings as JSON Lines or SARIF (--format) for CI and dashboards
+- Builds a call graph per section (@init, @slider, @block, @sample, @gfx,
+  @serialize) and estimates the static per-sample cost of the @sample path
+- Flags per-sample expressions and calls whose inputs only change when a
+  slider moves (hoisting candidates), with the estimated saving
+- Finds pure single-input transcendental functions on the @sample path that a
+  lookup table could replace, with the input range bounded from slider ranges
+  and the table memory needed
+- Maps the memory regions allocated from freemem at 44.1 and 192 kHz, with
+  the per-instance footprint, and flags overlaps and out-of-region indexing
+- Counts the draw primitives (gfx_line, gfx_rect, gfx_drawstr, ...) @gfx
+  issues per frame, with loops weighted by their bounds, and shows which
+  looped draw paths bypass the UI curve cache
+- Derives the inputs of each dirty-flag cache (curve, dB segments, LUT and
+  threshold) from its builder, and flags code that writes them without
+  invalidating the cache, plus invalidations that only cause rebuilds
+- Finds recursive @sample state (filter and envelope feedback) and flags
+  the updates with no DC offset or flush to zero against denormals
+- Estimates the compiled size of each section and function with every
+  user function call inlined, and names the call sites that add the most
+- Parses the sliderN: lines and generates the slider table include
+  (--slider-table), so @init does not parse the plugin's own source
+- Compares two git revisions or directories in one run (--compare),
+  re-parsing only the modules that differ, and reports the change in calls,
+  cost and transcendentals per sample, draw primitives per @gfx frame,
+  memory footprint and inlined code size; --max-increase fails CI past a limit
+- Exports each .jsfx root as one file with its imports inlined and functions
+  no section can reach removed (--bundle), optionally without comments
+- Profiles each phase with --profile: wall time, peak memory, files, tokens,
+  declarations, call sites and regex evaluations, plus the slowest modules
 
 The analyzer follows the JSFX modular architecture rules:
-- Modules must be imported in strict dependency order
+- Modules must be imported in strict dependency order (checked per .jsfx root)
 - Phase 0: Configuration, Phase 1: Foundation, Phase 2: Utilities, etc.
 - No circular dependencies allowed
 - Function declarations must precede function calls in dependency order
 """
 
+import argparse
+import cProfile
+import hashlib
+import io
+import json
+import math
 import os
 import re
+import signal
+import subprocess
 import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Optional
+from typing import Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Set, TextIO, Tuple, Optional
 from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Token kinds produced by tokenize_jsfx()
+TOKEN_IDENT = 'ident'          # identifiers, including dotted namespaces and $pi-style constants
+TOKEN_NUMBER = 'number'        # decimal, hex and $'c' character constants
+TOKEN_STRING = 'string'        # "..." and '...' literals
+TOKEN_STRVAR = 'strvar'        # #string identifiers
+TOKEN_OP = 'op'                # operators and punctuation
+TOKEN_SECTION = 'section'      # @init, @slider, @block, @sample, @gfx, @serialize, ...
+TOKEN_DIRECTIVE = 'directive'  # header lines: desc:, sliderN:, import, in_pin:, options:, ...
+
+# Keywords that may follow a function's parameter list before its body
+FUNCTION_MODIFIERS = {'local', 'instance', 'global', 'globals', 'static'}
+
+# Pseudo-root grouping modules that no .jsfx file imports
+UNIMPORTED_ROOT = '(not imported)'
+
+# Bump whenever tokenizing or fact extraction changes (including the builtin list)
+# so that stale entries in the analysis cache are ignored
+ANALYZER_VERSION = '2.1'
+CACHE_DIR_NAME = '.jsfx_analysis_cache'
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+    line: int  # 1-based
+    col: int   # 0-based
+
+
+_TOKEN_PATTERN = re.compile(r'''
+    [ \t\r\f\v]*                      # whitespace is skipped as part of the following token
+    (?:
+        (?P<ident>\$?[A-Za-z_][A-Za-z0-9_.]*)
+      | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|\$[xX][0-9a-fA-F]+|\$'(?:\\.|[^'\\])')
+      | (?P<newline>(?://[^\n]*)?\n)  # a trailing // comment is dropped with its newline
+        # Section markers and header directives are only recognised at the start of a line
+        (?:[ \t]*(?:
+            (?P<section>@[A-Za-z_][A-Za-z0-9_]*)[^\n]*
+          | (?P<directive>(?:(?:desc|slider\d+|in_pin|out_pin|options|filename|tags|author|version):|import[ \t])[^\n]*)
+        ))?
+      | (?P<line_comment>//[^\n]*)
+      | (?P<block_comment>/\*.*?(?:\*/|\Z))
+      | (?P<string>"(?:\\.|[^"\\])*(?:"|\Z)|'(?:\\.|[^'\\\n])*')
+      | (?P<strvar>\#[A-Za-z0-9_.]*)
+      | (?P<op>===|!==|<<=|>>=|==|!=|<=|>=|&&|\|\||<<|>>|\+=|-=|\*=|/=|%=|\|=|&=|~=|\^=|.)
+    )
+''', re.VERBOSE | re.DOTALL)
+
+_PLAIN_TOKEN_KINDS = {TOKEN_IDENT, TOKEN_OP, TOKEN_NUMBER, TOKEN_STRVAR}
+
+
+def tokenize_jsfx(content: str, stats: Optional[Dict[str, int]] = None) -> List[Token]:
+    """Tokenize JSFX/EEL2 source into a compact token stream
+
+    Comments and whitespace are dropped. Section markers (@init, @gfx 500 360, ...)
+    and header directives (slider/desc/import lines) are only recognised at the start
+    of a line and are emitted as single tokens whose value is the marker or the
+    stripped line. If `stats` is given, the 'tokens' and 'regex_evaluations'
+    counters in it are increased.
+    """
+    tokens = []
+    append = tokens.append
+    plain_kinds = _PLAIN_TOKEN_KINDS
+    # A leading newline lets the first line's section marker or directive match like any other
+    content = '\n' + content
+    line = 0
+    line_start = 0
+    matches = 0
+    for matches, match in enumerate(_TOKEN_PATTERN.finditer(content), 1):
+        kind = match.lastgroup
+        if kind in plain_kinds:
+            append(Token(kind, match.group(kind), line, match.start(kind) - line_start))
+        elif kind == 'newline' or kind == 'section' or kind == 'directive':
+            line += 1
+            line_start = match.end('newline')
+            if kind == 'section':
+                append(Token(kind, match.group(kind), line, match.start(kind) - line_start))
+            elif kind == 'directive':
+                append(Token(kind, match.group(kind).rstrip(), line, match.start(kind) - line_start))
+        elif kind == 'string' or kind == 'block_comment':
+            text = match.group(kind)
+            start = match.start(kind)
+            if kind == 'string':
+                append(Token(TOKEN_STRING, text, line, start - line_start))
+            newlines = text.count('\n')
+            if newlines:
+                line += newlines
+                line_start = start + text.rfind('\n') + 1
+    if stats is not None:
+        stats['tokens'] += len(tokens)
+        stats['regex_evaluations'] += matches
+    return tokens
+
+
+_BRACKETS_AND_COMMA = {'(', ')', '[', ']', ','}
+
+
+def match_parentheses(tokens: List[Token]) -> Tuple[List[int], List[int]]:
+    """Match brackets in a single pass over a token stream
+
+    Returns (partner, argument_count), both indexed by token position. partner[i]
+    is the index of the bracket matching the '(' / ')' / '[' / ']' at i (-1 if
+    unmatched or not a bracket). argument_count[i] is the number of top-level
+    comma-separated arguments inside the '(' at i, so call sites can look up
+    their argument count in constant time.
+    """
+    n = len(tokens)
+    partner = [-1] * n
+    argument_count = [0] * n
+    commas = [0] * n
+    stack = []
+    for i, (kind, value, _, _) in enumerate(tokens):
+        if kind != TOKEN_OP or value not in _BRACKETS_AND_COMMA:
+            continue
+        if value == '(' or value == '[':
+            stack.append(i)
+        elif value == ')' or value == ']':
+            if stack and tokens[stack[-1]].value == ('(' if value == ')' else '['):
+                open_index = stack.pop()
+                partner[open_index] = i
+                partner[i] = open_index
+                if i > open_index + 1:
+                    argument_count[open_index] = commas[open_index] + 1
+        elif value == ',' and stack:
+            commas[stack[-1]] += 1
+    return partner, argument_count
+
+
+class Declaration(NamedTuple):
+    name: str
+    line: int
+    col: int
+    param_count: int
+
+
+class CallSite(NamedTuple):
+    name: str
+    line: int
+    col: int
+    arg_count: int
+
+
+class ModuleFacts(NamedTuple):
+    """Per-file facts that do not depend on any other module (and so can be cached)"""
+    imports: List[str]
+    declarations: List[Declaration]
+    calls: List[CallSite]
+
+
+IMPORT_PATTERN = re.compile(r'^import\s+([a-zA-Z0-9_\-/\.]+\.jsfx-inc)', re.IGNORECASE)
+
+
+def iter_function_definitions(tokens: List[Token], partner: List[int],
+                              argument_count: List[int]) -> Iterator[Tuple[int, str, int, int, int]]:
+    """Yield (token_index, function_name, param_count, body_open, body_close) for each function
+
+    A declaration is `function name(...)`, optionally followed by local(...),
+    instance(...), global(...) or static(...) lists, and then the body's '('.
+    body_open and body_close are the token indices of the body's parentheses
+    (body_close is -1 if the body is never closed).
+    """
+    n = len(tokens)
+    for i in range(n - 2):
+        token = tokens[i]
+        if token.kind != TOKEN_IDENT or token.value != 'function':
+            continue
+        name_token = tokens[i + 1]
+        if name_token.kind != TOKEN_IDENT or tokens[i + 2].value != '(':
+            continue
+        close = partner[i + 2]
+        if close == -1:
+            continue
+        
+        # Skip modifier lists until the body's opening parenthesis
+        j = close + 1
+        while (j + 1 < n and tokens[j].kind == TOKEN_IDENT and
+               tokens[j].value in FUNCTION_MODIFIERS and tokens[j + 1].value == '('):
+            j = partner[j + 1]
+            if j == -1:
+                break
+            j += 1
+        if j == -1 or j >= n or tokens[j].value != '(':
+            continue
+        yield i + 1, name_token.value, argument_count[i + 2], j, partner[j]
+
+
+def iter_declarations(tokens: List[Token], partner: List[int], argument_count: List[int]) -> Iterator[Tuple[int, str, int]]:
+    """Yield (token_index, function_name, param_count) for each function declaration"""
+    for index, name, param_count, _, _ in iter_function_definitions(tokens, partner, argument_count):
+        yield index, name, param_count
+
+
+def iter_call_sites(tokens: List[Token], builtin_functions: Set[str]) -> Iterator[Tuple[int, str]]:
+    """Yield (token_index, function_name) for each call to a user function"""
+    for i in range(len(tokens) - 1):
+        token = tokens[i]
+        if token.kind != TOKEN_IDENT or tokens[i + 1].value != '(':
+            continue
+        if tokens[i + 1].kind != TOKEN_OP:
+            continue
+        # Skip the name in a function declaration
+        if i > 0 and tokens[i - 1].kind == TOKEN_IDENT and tokens[i - 1].value == 'function':
+            continue
+        # namespace.method() calls resolve to the function named after the last dot
+        func_name = token.value.rsplit('.', 1)[-1]
+        
+        # Skip single-letter identifiers (likely false positives)
+        if len(func_name) <= 1:
+            continue
+        
+        # Skip builtins and local()/instance() style modifier lists
+        if func_name in builtin_functions or func_name in FUNCTION_MODIFIERS:
+            continue
+        
+        yield i, func_name
+
+
+def extract_module_facts(tokens: List[Token], builtin_functions: Set[str],
+                         stats: Optional[Dict[str, int]] = None) -> ModuleFacts:
+    """Extract imports, declarations and call sites from a module's token stream"""
+    partner, argument_count = match_parentheses(tokens)
+    
+    imports = []
+    for token in tokens:
+        if token.kind == TOKEN_DIRECTIVE:
+            if stats is not None:
+                stats['regex_evaluations'] += 1
+            match = IMPORT_PATTERN.match(token.value)
+            if match:
+                imports.append(match.group(1))
+    
+    declarations = []
+    for index, func_name, param_count in iter_declarations(tokens, partner, argument_count):
+        token = tokens[index]
+        declarations.append(Declaration(func_name, token.line, token.col, param_count))
+    
+    calls = []
+    for index, func_name in iter_call_sites(tokens, builtin_functions):
+        token = tokens[index]
+        # The call's '(' directly follows its name token
+        calls.append(CallSite(func_name, token.line, token.col, argument_count[index + 1]))
+    
+    return ModuleFacts(imports, declarations, calls)
+
+
+SLIDER_PATTERN = re.compile(r'''^slider(?P<index>\d+):\s*(?:(?P<variable>[A-Za-z_][A-Za-z0-9_.]*)\s*=)?\s*
+    (?P<default>[-+.\deE]+)\s*<\s*(?P<minimum>[-+.\deE]+)\s*,\s*(?P<maximum>[-+.\deE]+)
+    (?:\s*,\s*(?P<step>[-+.\deE]+))?\s*(?:\{(?P<options>[^}]*)\})?\s*>\s*(?P<label>.*)$''', re.VERBOSE)
+
+
+class SliderDefinition(NamedTuple):
+    index: int
+    variable: str           # the named variable, or sliderN
+    default: float
+    minimum: float
+    maximum: float
+    step: Optional[float]
+    options: List[str]      # dropdown entries from {a,b,c}
+    label: str              # without the leading '-' that hides the slider
+    hidden: bool
+    line: int
+
+
+def parse_slider_definitions(tokens: List[Token]) -> Dict[str, SliderDefinition]:
+    """Return {variable: SliderDefinition} for the `sliderN:var=default<min,max,step{options}>Label` lines
+
+    Slider lines in the file-path form (`slider1:/dir:file.wav:...`) are skipped.
+    """
+    sliders = {}
+    for token in tokens:
+        if token.kind != TOKEN_DIRECTIVE or not token.value.startswith('slider'):
+            continue
+        match = SLIDER_PATTERN.match(token.value)
+        if not match:
+            continue
+        try:
+            values = [float(match.group(group)) if match.group(group) else None
+                      for group in ('default', 'minimum', 'maximum', 'step')]
+        except ValueError:
+            continue
+        index = int(match.group('index'))
+        label = match.group('label').strip()
+        options = [option.strip() for option in match.group('options').split(',')] if match.group('options') else []
+        variable = match.group('variable') or f"slider{index}"
+        sliders[variable] = SliderDefinition(index, variable, values[0], values[1], values[2], values[3], options,
+                                             label.lstrip('-'), label.startswith('-'), token.line)
+    return sliders
+
+
+
+# Generated by --slider-table from the root's slider lines; replaces parsing the .jsfx at @init
+SLIDER_TABLE_MODULE = '01_Utils/04_slider_table.jsfx-inc'
+SLIDER_TABLE_MEMORY_BASE = 0  # allocate_memory() starts freemem at SLIDER_TABLE_MEMORY_SIZE
+SLIDER_NAMES_SLOT_BASE = 100
+DROPDOWN_OPTIONS_SLOT_BASE = 200
+MAX_STRING_SLOTS = 1024
+
+
+def _eel2_number(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _eel2_string(text: str) -> str:
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _option_value(option: str) -> float:
+    """Numeric value of a dropdown option as string_to_number() read it: the leading number, 0 for text"""
+    match = re.match(r'(-?)([\d.]*)', option)
+    whole, _, fraction = match.group(2).partition('.')
+    digits = whole + ('.' + fraction.replace('.', '') if fraction else '')
+    value = float(digits) if digits.strip('.') else 0.0
+    return -value if match.group(1) else value
+
+
+def slider_table_source(root: str, sliders: Dict[str, SliderDefinition]) -> str:
+    """Return the EEL2 source of SLIDER_TABLE_MODULE for one root's slider definitions
+
+    The module keeps the accessors and memory/string-slot conventions of
+    the runtime parser it replaces (get_slider_min, get_dropdown_option,
+    ...), but load_slider_table() stores constants instead of reading the
+    .jsfx. Dropdown options are packed per slider from an offset table, so
+    a list is never cut short, and get_freq_list_index() searches the
+    option values instead of a reverse table nothing filled in.
+    """
+    rows = sorted(sliders.values(), key=lambda slider: slider.index)
+    count = max((slider.index for slider in rows), default=0)
+    options = sum(len(slider.options) for slider in rows)
+    if SLIDER_NAMES_SLOT_BASE + count > DROPDOWN_OPTIONS_SLOT_BASE or DROPDOWN_OPTIONS_SLOT_BASE + options > MAX_STRING_SLOTS:
+        raise ValueError(f"{root}: {count} sliders with {options} dropdown options do not fit the string slots")
+    counts_base = SLIDER_TABLE_MEMORY_BASE
+    first_base = counts_base + count
+    params_base = first_base + count
+    values_base = params_base + count * 4
+    
+    lines = [
+        "// Slider Table Module",
+        f"// Slider names, ranges and dropdown options of {root}, precomputed so that",
+        "// @init does not open and parse the plugin's own source.",
+        f"// Generated by function_analyzer2.py --slider-table; edit the slider lines in {root} and regenerate.",
+        "",
+        "@init",
+        "",
+        "//==============================================================================",
+        "// SLIDER TABLE CONFIGURATION",
+        "//==============================================================================",
+        "",
+        "// String slots: names at SLIDER_NAMES_BASE + slider index, dropdown options",
+        "// at DROPDOWN_OPTIONS_BASE + the slider's first option + option index",
+        f"SLIDER_NAMES_BASE = {SLIDER_NAMES_SLOT_BASE};",
+        f"DROPDOWN_OPTIONS_BASE = {DROPDOWN_OPTIONS_SLOT_BASE};",
+        "",
+        "// Memory, per slider index: option count, first option, [default, min, max, inc];",
+        "// then the numeric value of every option. allocate_memory() starts freemem",
+        "// at SLIDER_TABLE_MEMORY_SIZE, so no buffer overlaps the table.",
+        f"dropdown_option_counts_base = {counts_base};",
+        f"dropdown_option_first_base = {first_base};",
+        f"slider_params_base = {params_base};",
+        f"dropdown_option_values_base = {values_base}; // {options} options",
+        f"SLIDER_TABLE_MEMORY_SIZE = {values_base + options};",
+        "",
+        "slider_names_count = 0;",
+        "slider_names_loaded = 0;",
+        "",
+        "//==============================================================================",
+        "// GENERATED TABLE",
+        "//==============================================================================",
+        "",
+        "// Plain stores: EEL2 inlines every call, so a store helper called per entry",
+        "// would compile its body once per slider and option",
+        "function load_slider_table() (",
+    ]
+    position = 0
+    for slider in rows:
+        index = slider.index - 1
+        values = (slider.default, slider.minimum, slider.maximum, slider.step or 0)
+        lines.append(f"  // slider{slider.index}: {slider.variable}")
+        lines.append('  ' + ' '.join(f"slider_params_base[{index * 4 + k}] = {_eel2_number(value)};"
+                                     for k, value in enumerate(values)))
+        lines.append(f"  strcpy(SLIDER_NAMES_BASE + {index}, {_eel2_string(slider.label)});")
+        if slider.options:
+            lines.append(f"  dropdown_option_counts_base[{index}] = {len(slider.options)}; "
+                         f"dropdown_option_first_base[{index}] = {position};")
+        for option in slider.options:
+            lines.append(f"  dropdown_option_values_base[{position}] = {_eel2_number(_option_value(option))}; "
+                         f"strcpy(DROPDOWN_OPTIONS_BASE + {position}, {_eel2_string(option)});")
+            position += 1
+    lines += [
+        f"  slider_names_count = {count};",
+        "  slider_names_loaded = 1;",
+        ");",
+        "",
+        "//==============================================================================",
+        "// ACCESSOR FUNCTIONS (for 01_Utils/08_ui_utils.jsfx-inc and 04_UI_Rendering)",
+        "//==============================================================================",
+        "",
+        "function get_slider_name(slider_num) (",
+        "  slider_names_loaded && slider_num > 0 && slider_num <= slider_names_count ? (",
+        "    SLIDER_NAMES_BASE + slider_num - 1; // Return string slot number",
+        "  ) : (",
+        "    #empty_str = \"\";",
+        "    #empty_str;",
+        "  );",
+        ");",
+        "",
+        "function get_dropdown_option_count(slider_num) (",
+        "  slider_num > 0 && slider_num <= slider_names_count ? (",
+        "    dropdown_option_counts_base[slider_num - 1]",
+        "  ) : 0;",
+        ");",
+        "",
+        "function get_dropdown_option(slider_num, option_index) (",
+        "  option_index >= 0 && option_index < get_dropdown_option_count(slider_num) ? (",
+        "    // Copy string from numeric slot to temporary string variable for return",
+        "    strcpy(#temp_dropdown_option, DROPDOWN_OPTIONS_BASE + dropdown_option_first_base[slider_num - 1] + option_index);",
+        "    #temp_dropdown_option;",
+        "  ) : (",
+        "    #empty_str = \"\";",
+        "    #empty_str;",
+        "  );",
+        ");",
+        "",
+        "// Numeric value of a dropdown option (0 for text options)",
+        "function get_dropdown_option_value(slider_num, option_index) (",
+        "  option_index >= 0 && option_index < get_dropdown_option_count(slider_num) ? (",
+        "    dropdown_option_values_base[dropdown_option_first_base[slider_num - 1] + option_index]",
+        "  ) : 0;",
+        ");",
+        "",
+        "// Index of the option whose value is freq_value (0 when none is)",
+        "function get_freq_list_index(slider_num, freq_value) local(first, freq_hz, i, index) (",
+        "  index = 0;",
+        "  slider_num > 0 && slider_num <= slider_names_count ? (",
+        "    first = dropdown_option_first_base[slider_num - 1];",
+        "    freq_hz = floor(freq_value);",
+        "    i = 0;",
+        "    loop(dropdown_option_counts_base[slider_num - 1],",
+        "      floor(dropdown_option_values_base[first + i]) == freq_hz ? index = i;",
+        "      i += 1;",
+        "    );",
+        "  );",
+        "  index;",
+        ");",
+        "",
+    ]
+    for number, (name, fallback) in enumerate((('get_slider_default', '0'), ('get_slider_min', '0'),
+                                               ('get_slider_max', '1'), ('get_slider_increment', '0.01'))):
+        lines += [
+            f"function {name}(slider_num) (",
+            "  slider_num > 0 && slider_num <= slider_names_count ? (",
+            f"    slider_params_base[(slider_num - 1) * 4 + {number}]",
+            f"  ) : {fallback}",
+            ");",
+            "",
+        ]
+    return '\n'.join(lines)
+
+
+# JSFX code sections; imported modules' sections run as part of the importing root's
+SECTION_NAMES = ('@init', '@slider', '@block', '@sample', '@gfx', '@serialize')
+
+# Static cost model: counters per code block and their rough relative cost in cycles
+COST_COUNTERS = ('transcendentals', 'divisions', 'loops', 'calls', 'operations')
+COST_WEIGHTS = {'transcendentals': 50.0, 'divisions': 10.0, 'loops': 2.0, 'calls': 1.0, 'operations': 1.0}
+TRANSCENDENTAL_FUNCTIONS = {'exp', 'log', 'log10', 'pow', 'tanh', 'sin', 'cos', 'tan', 'atan', 'atan2',
+                            'sinh', 'cosh', 'asin', 'acos', 'asinh', 'acosh', 'atanh'}
+DIVISION_OPERATORS = {'/', '/=', '%', '%='}  # sqrt() is counted with these
+ARITHMETIC_OPERATORS = {'+', '-', '*', '^', '&', '|', '~', '!', '<', '>', '<<', '>>', '==', '!=', '<=', '>=',
+                        '===', '!==', '&&', '||', '+=', '-=', '*=', '^=', '|=', '&=', '~=', '['}
+DEFAULT_LOOP_ITERATIONS = 8  # assumed trip count of while() and of loop(n) with a non-literal n
+
+# Cost estimate modes: every branch taken; every branch except dirty-flag rebuilds
+# (`flag ? rebuild()` where rebuild() clears flag); only code outside ?: branches
+COST_WORST_CASE = 'worst_case'
+COST_STEADY_STATE = 'steady_state'
+COST_UNCONDITIONAL = 'unconditional'
+
+
+class CodeBlock(NamedTuple):
+    """Static cost of one function body or of one section's top-level code in a module"""
+    filename: str
+    name: str                              # function name, or the section ('@sample') for top-level code
+    section: str                           # section the code appears in ('@init' for most functions)
+    line: int
+    counts: Dict[str, float]               # COST_COUNTERS for one execution, weighted by loop trip counts
+    conditional_counts: Dict[str, float]   # the part of `counts` inside a branch of a ?: conditional
+    # (user function, calls per execution, guard): guard is None outside ?: branches, else
+    # the flag variable tested by the innermost conditional ('' if not a plain variable)
+    calls: List[Tuple[str, float, Optional[str]]]
+    cleared_flags: Set[str]                # variables set to 0 (`flag = 0;`) in this code
+    builtin_calls: List[Tuple[str, float, Optional[str]]]  # (built-in, calls per execution, guard), like `calls`
+
+
+def iter_section_spans(tokens: List[Token]) -> Iterator[Tuple[str, int, int]]:
+    """Yield (section, start, end) token ranges for each section in a module
+
+    Code before the first section marker (the header of a .jsfx) is not
+    yielded.
+    """
+    section = None
+    start = 0
+    for i, token in enumerate(tokens):
+        if token.kind == TOKEN_SECTION:
+            if section is not None:
+                yield section, start, i
+            section = token.value
+            start = i + 1
+    if section is not None:
+        yield section, start, len(tokens)
+
+
+def _expression_end(tokens: List[Token], partner: List[int], i: int, end: int) -> int:
+    """Return the index of the last token of the ?: branch starting at token i"""
+    if tokens[i].value == '(' and partner[i] != -1:
+        return partner[i]
+    j = i
+    while j < end:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP:
+            if (value == '(' or value == '[') and partner[j] != -1:
+                j = partner[j] + 1
+                continue
+            if value in (';', ':', ')', ']', ','):
+                return j - 1
+        j += 1
+    return end - 1
+
+
+def measure_code(tokens: List[Token], partner: List[int], start: int, end: int, builtin_functions: Set[str],
+                 skip: Optional[Dict[int, int]] = None, trips: Optional[Callable[[int], Optional[float]]] = None):
+    """Count the cost model's operations in tokens[start:end]
+
+    Code inside loop(n, ...) runs n times when n is a literal and
+    DEFAULT_LOOP_ITERATIONS times otherwise (as does a while loop); `trips`,
+    given the token index of a loop or while keyword, can supply a better
+    trip count (None keeps the default). Both branches of a ?: conditional
+    are counted, so `counts` is an upper bound; what falls inside a branch is
+    also added to `conditional_counts`. `skip` maps the first token index of
+    a range to leave out (a nested function definition) to its last index.
+    Returns (counts, conditional_counts, calls, cleared_flags, builtin_calls)
+    as stored in CodeBlock.
+    """
+    counts = dict.fromkeys(COST_COUNTERS, 0.0)
+    conditional_counts = dict.fromkeys(COST_COUNTERS, 0.0)
+    calls = defaultdict(float)
+    builtin_calls = defaultdict(float)
+    cleared_flags = set()
+    loops = []  # (last token index of the loop, multiplier inside it)
+    branches = []  # (last token index, guard flag) of each enclosing ?: branch
+    multiplier = 1.0
+    i = start
+    while i < end:
+        if skip and i in skip:
+            i = skip[i] + 1
+            continue
+        while loops and i > loops[-1][0]:
+            loops.pop()
+            multiplier = loops[-1][1] if loops else 1.0
+        while branches and i > branches[-1][0]:
+            branches.pop()
+        kind, value, _, _ = tokens[i]
+        counter = None
+        if kind == TOKEN_IDENT and i + 1 < end and tokens[i + 1].value == '(' and tokens[i + 1].kind == TOKEN_OP:
+            name = value.rsplit('.', 1)[-1]
+            if name in TRANSCENDENTAL_FUNCTIONS:
+                counter = 'transcendentals'
+            elif name == 'sqrt':
+                counter = 'divisions'
+            elif name == 'loop' or name == 'while':
+                counter = 'loops'
+                close = partner[i + 1]
+                iterations = DEFAULT_LOOP_ITERATIONS
+                if (name == 'loop' and i + 3 < end and tokens[i + 2].kind == TOKEN_NUMBER
+                        and tokens[i + 3].value == ','):
+                    try:
+                        iterations = max(int(float(tokens[i + 2].value)), 0)
+                    except ValueError:
+                        pass
+                elif name == 'while' and close != -1 and close + 1 < end and tokens[close + 1].value == '(':
+                    close = partner[close + 1]  # while (condition) (body) form
+                bound = trips(i) if trips is not None else None
+                if bound is not None:
+                    iterations = bound
+                if close != -1:
+                    loops.append((close, multiplier * iterations))
+            elif name in builtin_functions:
+                counter = 'operations'
+                builtin_calls[name, branches[-1][1] if branches else None] += multiplier
+            elif len(name) > 1 and name not in FUNCTION_MODIFIERS:
+                counter = 'calls'
+                calls[name, branches[-1][1] if branches else None] += multiplier
+        elif kind == TOKEN_OP:
+            if value in DIVISION_OPERATORS:
+                counter = 'divisions'
+            elif value in ARITHMETIC_OPERATORS:
+                counter = 'operations'
+            elif value == '?' and i + 1 < end:
+                branch_end = _expression_end(tokens, partner, i + 1, end)
+                if branch_end + 2 < end and tokens[branch_end + 1].value == ':':
+                    branch_end = _expression_end(tokens, partner, branch_end + 2, end)
+                guard = ''
+                if (i > start and tokens[i - 1].kind == TOKEN_IDENT and
+                        (i - 1 == start or tokens[i - 2].value in (';', '(', ',', '?', ':'))):
+                    guard = tokens[i - 1].value
+                branches.append((branch_end, guard))
+            elif (value == '=' and i > start and tokens[i - 1].kind == TOKEN_IDENT and i + 2 < end and
+                  tokens[i + 1].value == '0' and tokens[i + 2].value in (';', ')')):
+                cleared_flags.add(tokens[i - 1].value)
+        if counter is not None:
+            counts[counter] += multiplier
+            if branches:
+                conditional_counts[counter] += multiplier
+        if counter == 'loops' and loops and loops[-1][0] > i:
+            multiplier = loops[-1][1]  # the new loop's trip count applies from the next token
+        i += 1
+    return (counts, conditional_counts, [(name, times, guard) for (name, guard), times in calls.items()], cleared_flags,
+            [(name, times, guard) for (name, guard), times in builtin_calls.items()])
+
+
+def extract_code_blocks(filename: str, tokens: List[Token], partner: List[int], argument_count: List[int],
+                        builtin_functions: Set[str], trips: Optional[Callable[[str, int], Optional[float]]] = None
+                        ) -> Tuple[Dict[str, CodeBlock], Dict[str, CodeBlock]]:
+    """Measure every function body and every section's top-level code in a module
+
+    `trips` is called with the function name (or section) and the token index
+    of each loop, as in measure_code. Returns ({function_name: CodeBlock},
+    {section: CodeBlock}).
+    """
+    definitions = list(iter_function_definitions(tokens, partner, argument_count))
+    # 'function' keyword index -> end of the body, so top-level code skips definitions
+    skip = {index - 1: (close if close != -1 else len(tokens) - 1)
+            for index, _, _, _, close in definitions}
+    
+    functions = {}
+    sections = {}
+    for section, start, end in iter_section_spans(tokens):
+        counts, conditional_counts, calls, cleared, builtin_calls = measure_code(
+            tokens, partner, start, end, builtin_functions, skip,
+            (lambda i, section=section: trips(section, i)) if trips is not None else None)
+        line = tokens[start - 1].line
+        if section in sections:  # a section repeated within one module
+            previous = sections[section]
+            for counter in COST_COUNTERS:
+                counts[counter] += previous.counts[counter]
+                conditional_counts[counter] += previous.conditional_counts[counter]
+            calls = previous.calls + calls
+            cleared |= previous.cleared_flags
+            builtin_calls = previous.builtin_calls + builtin_calls
+            line = previous.line
+        sections[section] = CodeBlock(filename, section, section, line, counts, conditional_counts, calls, cleared,
+                                      builtin_calls)
+        for index, name, _, body_open, body_close in definitions:
+            if start <= index < end:
+                body_end = body_close if body_close != -1 else end
+                functions[name] = CodeBlock(filename, name, section, tokens[index].line,
+                                            *measure_code(tokens, partner, body_open, body_end, builtin_functions,
+                                                          trips=(lambda i, name=name: trips(name, i))
+                                                          if trips is not None else None))
+    return functions, sections
+
+
+def code_cost(counts: Dict[str, float]) -> float:
+    """Weighted cost of a set of COST_COUNTERS counts (rough cycles)"""
+    return sum(COST_WEIGHTS[counter] * counts.get(counter, 0.0) for counter in COST_COUNTERS)
+
+
+# Data flow facts: what each function body or section reads, writes and calls
+ASSIGNMENT_OPERATORS = {'=', '+=', '-=', '*=', '/=', '%=', '|=', '&=', '^=', '~='}
+# Built-in variables that change from one sample to the next (all others are fixed during @sample)
+SAMPLE_VARYING_VARIABLES = {f'spl{i}' for i in range(64)} | {'play_position', 'beat_position', 'time_precise'}
+# Built-in variables the host can change between blocks without running @slider
+HOST_VARIABLES = {'srate', 'samplesblock', 'num_ch', 'num_ch_in', 'num_ch_out', 'tempo', 'play_state',
+                  'ts_num', 'ts_denom'}
+# Built-in functions with side effects or hidden state; memory reads (`buf[i]`) count as state too
+STATEFUL_BUILTINS = {'rand', 'time_precise', 'midirecv', 'midirecv_buf', 'midirecv_str', 'midisend',
+                     'midisend_buf', 'midisend_str', 'midisyx', 'file_var', 'file_mem', 'file_read',
+                     'file_avail', 'file_string', 'file_open', 'file_close', 'memcpy', 'memset',
+                     'mem_insert_shuffle', 'mem_delete_shuffle', 'mem_multiply_sum', 'fft', 'ifft',
+                     'fft_real', 'ifft_real', 'fft_permute', 'fft_ipermute', 'mdct', 'imdct',
+                     'convolve_c', 'freembuf', 'slider_next_chg', 'sliderchange', 'slider_automate'}
+# Built-in functions that assign a variable passed to them: {name: argument index}
+BUILTIN_VARIABLE_WRITES = {'file_var': 1}
+
+
+class ValueFacts(NamedTuple):
+    """What an expression depends on"""
+    reads: FrozenSet[str]   # variables read
+    calls: FrozenSet[str]   # user functions called
+    stateful: bool          # reads memory or calls a STATEFUL_BUILTINS function
+
+
+class Assignment(NamedTuple):
+    target: str
+    operator: str
+    line: int
+    col: int
+    text: str               # the assigned expression, as written
+    value: ValueFacts       # the assigned expression
+    guard: ValueFacts       # conditions of the enclosing ?: branches and loops
+    change_guarded: bool    # inside a `a != b ? (... a = ...)` recompute-on-change block
+    weight: float           # executions per run of the enclosing code (loop trip counts)
+    cost: float             # code_cost() of the assigned expression
+    span: Tuple[int, int]   # token indices of the assigned expression
+    conditions: Tuple[Tuple[int, int, bool], ...]  # enclosing ?: and while conditions: (first, last, holds)
+
+
+class CallFact(NamedTuple):
+    name: str
+    line: int
+    col: int
+    text: str
+    args: List[ValueFacts]
+    guard: ValueFacts
+    change_guarded: bool
+    weight: float
+    span: Tuple[int, int]   # token indices of the name and the closing parenthesis
+    conditions: Tuple[Tuple[int, int, bool], ...]
+
+
+class MemoryAccess(NamedTuple):
+    """One `base[index]` read or write"""
+    base: str
+    line: int
+    col: int
+    text: str
+    span: Tuple[int, int]   # token indices of the index expression
+    conditions: Tuple[Tuple[int, int, bool], ...]
+
+
+class FlowBlock(NamedTuple):
+    """Data flow facts for one function body or one section's top-level code in a module"""
+    filename: str
+    name: str               # function name, or the section for top-level code
+    section: str
+    line: int
+    params: List[str]
+    locals: Set[str]
+    instance: Set[str]      # instance(...) variables (per-instance state)
+    assignments: List[Assignment]
+    calls: List[CallFact]
+    reads: FrozenSet[str]   # every variable read, conditions included
+    writes: Set[str]        # every variable assigned
+    callees: Set[str]       # every user function called
+    stateful: bool          # reads or writes memory, or calls a STATEFUL_BUILTINS function
+    memory: List[MemoryAccess]
+    builtin_writes: Set[str]  # variables assigned by built-in functions (file_var(handle, x))
+    result: ValueFacts      # a function's last statement (its return value); empty for sections
+    result_span: Tuple[int, int]
+
+
+_EMPTY_FACTS = ValueFacts(frozenset(), frozenset(), False)
+
+
+def _merge_facts(facts: List[ValueFacts]) -> ValueFacts:
+    if not facts:
+        return _EMPTY_FACTS
+    if len(facts) == 1:
+        return facts[0]
+    return ValueFacts(frozenset().union(*(f.reads for f in facts)), frozenset().union(*(f.calls for f in facts)),
+                      any(f.stateful for f in facts))
+
+
+def value_facts(tokens: List[Token], first: int, last: int, builtin_functions: Set[str]) -> ValueFacts:
+    """Return what tokens[first..last] (inclusive) reads and calls"""
+    reads = set()
+    calls = set()
+    stateful = False
+    for j in range(first, last + 1):
+        kind, value, _, _ = tokens[j]
+        if kind != TOKEN_IDENT:
+            continue
+        following = tokens[j + 1] if j + 1 < len(tokens) else None
+        if following is not None and following.kind == TOKEN_OP and following.value == '(':
+            name = value.rsplit('.', 1)[-1]
+            if name in STATEFUL_BUILTINS:
+                stateful = True
+            elif name not in builtin_functions and name not in FUNCTION_MODIFIERS:
+                calls.add(name)
+        elif following is not None and following.kind == TOKEN_OP and following.value == '[':
+            stateful = True
+        else:
+            reads.add(value)
+    return ValueFacts(frozenset(reads), frozenset(calls), stateful)
+
+
+def _value_end(tokens: List[Token], partner: List[int], i: int, end: int) -> int:
+    """Return the index of the last token of the assigned expression starting at token i"""
+    pending = 0  # '?' seen whose ':' is still to come
+    j = i
+    while j < end:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP:
+            if (value == '(' or value == '[') and partner[j] != -1:
+                j = partner[j] + 1
+                continue
+            if value == '?':
+                pending += 1
+            elif value == ':':
+                if pending == 0:
+                    return j - 1
+                pending -= 1
+            elif value in (';', ')', ']', ','):
+                return j - 1
+        j += 1
+    return end - 1
+
+
+def _condition_start(tokens: List[Token], partner: List[int], j: int, start: int) -> int:
+    """Return the index of the first token of the ?: condition ending at token j"""
+    while j >= start:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP:
+            if (value == ')' or value == ']') and partner[j] != -1:
+                j = partner[j] - 1
+                continue
+            if value in (';', ',', '(', '[', '?', ':') or value in ASSIGNMENT_OPERATORS:
+                return j + 1
+        j -= 1
+    return start
+
+
+def _split_arguments(tokens: List[Token], partner: List[int], open_index: int) -> List[Tuple[int, int]]:
+    """Return the (first, last) token range of each top-level argument inside the '(' at open_index"""
+    close = partner[open_index]
+    if close == -1 or close == open_index + 1:
+        return []
+    ranges = []
+    first = open_index + 1
+    j = first
+    while j < close:
+        value = tokens[j].value
+        if (value == '(' or value == '[') and partner[j] != -1 and tokens[j].kind == TOKEN_OP:
+            j = partner[j] + 1
+            continue
+        if value == ',' and tokens[j].kind == TOKEN_OP:
+            ranges.append((first, j - 1))
+            first = j + 1
+        j += 1
+    ranges.append((first, close - 1))
+    return ranges
+
+
+def _last_statement(tokens: List[Token], partner: List[int], start: int, end: int) -> Tuple[int, int]:
+    """Return the (first, last) token range of the last non-empty top-level statement in tokens[start:end]"""
+    statement = (start, end - 1)
+    first = start
+    j = start
+    while j < end:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP and (value == '(' or value == '[') and partner[j] != -1:
+            j = partner[j] + 1
+            continue
+        if kind == TOKEN_OP and value == ';':
+            if j > first:
+                statement = (first, j - 1)
+            first = j + 1
+        j += 1
+    if end > first:
+        statement = (first, end - 1)
+    return statement
+
+
+def source_text(lines: List[str], tokens: List[Token], first: int, last: int) -> str:
+    """Return the source between two tokens (inclusive), on one line"""
+    start, stop = tokens[first], tokens[last]
+    if start.line == stop.line:
+        text = lines[start.line - 1][start.col:stop.col + len(stop.value)]
+    else:
+        text = ' '.join([lines[start.line - 1][start.col:]] + lines[start.line:stop.line - 1] +
+                        [lines[stop.line - 1][:stop.col + len(stop.value)]])
+    return ' '.join(text.split())
+
+
+def _function_scope(tokens: List[Token], partner: List[int], name_index: int) -> Tuple[List[str], Set[str], Set[str]]:
+    """Return (params, locals, instance variables) of the function declared at name_index"""
+    close = partner[name_index + 1]
+    params = [tokens[j].value for j in range(name_index + 2, close) if tokens[j].kind == TOKEN_IDENT]
+    scopes = defaultdict(set)
+    j = close + 1
+    while (j + 1 < len(tokens) and tokens[j].kind == TOKEN_IDENT and
+           tokens[j].value in FUNCTION_MODIFIERS and tokens[j + 1].value == '('):
+        modifier_close = partner[j + 1]
+        if modifier_close == -1:
+            break
+        scopes[tokens[j].value].update(tokens[k].value for k in range(j + 2, modifier_close)
+                                       if tokens[k].kind == TOKEN_IDENT)
+        j = modifier_close + 1
+    return params, scopes['local'], scopes['instance']
+
+
+def measure_flow(tokens: List[Token], partner: List[int], start: int, end: int, builtin_functions: Set[str],
+                 lines: List[str], skip: Optional[Dict[int, int]] = None):
+    """Collect the assignments, user function calls and memory accesses in tokens[start:end]
+
+    Returns (assignments, calls, reads, writes, callees, stateful, memory,
+    builtin_writes) as stored in FlowBlock. `skip` works as in measure_code.
+    """
+    assignments = []
+    calls = []
+    memory = []
+    writes = set()
+    builtin_writes = set()
+    stateful = False
+    # (last token index, condition facts, recompute-on-change block, condition span, holds, first token index)
+    guards = []
+    # (last token index, multiplier inside the loop, condition facts, while condition span or None, body start)
+    loops = []
+    multiplier = 1.0
+    
+    def conditions(i: int) -> Tuple[Tuple[int, int, bool], ...]:
+        active = [(span[0], span[1], holds) for _, _, _, span, holds, begin in guards if begin <= i]
+        active += [(span[0], span[1], True) for _, _, _, span, begin in loops if span is not None and begin <= i]
+        return tuple(active)
+    
+    i = start
+    while i < end:
+        if skip and i in skip:
+            i = skip[i] + 1
+            continue
+        while loops and i > loops[-1][0]:
+            loops.pop()
+            multiplier = loops[-1][1] if loops else 1.0
+        while guards and i > guards[-1][0]:
+            guards.pop()
+        kind, value, line, col = tokens[i]
+        following = tokens[i + 1] if i + 1 < end else None
+        if kind == TOKEN_IDENT and following is not None and following.kind == TOKEN_OP:
+            name = value.rsplit('.', 1)[-1]
+            if following.value == '(' and partner[i + 1] != -1:
+                close = partner[i + 1]
+                if name == 'loop' or name == 'while':
+                    iterations = DEFAULT_LOOP_ITERATIONS
+                    arguments = _split_arguments(tokens, partner, i + 1)
+                    condition = arguments[0] if arguments else (i + 1, i + 1)
+                    span = None
+                    if name == 'loop' and tokens[condition[0]].kind == TOKEN_NUMBER and condition[0] == condition[1]:
+                        try:
+                            iterations = max(int(float(tokens[condition[0]].value)), 0)
+                        except ValueError:
+                            pass
+                    elif name == 'while':
+                        condition = (i + 2, close - 1)
+                        if close + 1 < end and tokens[close + 1].value == '(' and partner[close + 1] != -1:
+                            span = condition  # while (condition) (body): the body only runs while it holds
+                            close = partner[close + 1]
+                    loops.append((close, multiplier * iterations,
+                                  value_facts(tokens, condition[0], condition[1], builtin_functions), span,
+                                  condition[1] + 2))
+                    multiplier *= iterations
+                elif name in STATEFUL_BUILTINS:
+                    stateful = True
+                    if name in BUILTIN_VARIABLE_WRITES:
+                        arguments = _split_arguments(tokens, partner, i + 1)
+                        position = BUILTIN_VARIABLE_WRITES[name]
+                        if position < len(arguments) and arguments[position][0] == arguments[position][1]:
+                            written = tokens[arguments[position][0]]
+                            if written.kind == TOKEN_IDENT:
+                                builtin_writes.add(written.value)
+                elif name not in builtin_functions and name not in FUNCTION_MODIFIERS:
+                    args = [value_facts(tokens, first, last, builtin_functions)
+                            for first, last in _split_arguments(tokens, partner, i + 1)]
+                    guard = _merge_facts([entry[1] for entry in guards] + [entry[2] for entry in loops])
+                    calls.append(CallFact(name, line, col, source_text(lines, tokens, i, close), args, guard,
+                                          any(entry[2] for entry in guards), multiplier, (i, close), conditions(i)))
+            elif following.value == '[':
+                stateful = True  # memory read or write
+                if partner[i + 1] != -1:
+                    memory.append(MemoryAccess(value, line, col, source_text(lines, tokens, i, partner[i + 1]),
+                                               (i + 2, partner[i + 1] - 1), conditions(i)))
+            elif following.value in ASSIGNMENT_OPERATORS:
+                last = _value_end(tokens, partner, i + 2, end)
+                if last >= i + 2:
+                    counts = measure_code(tokens, partner, i + 2, last + 1, builtin_functions)[0]
+                    guard = _merge_facts([entry[1] for entry in guards] + [entry[2] for entry in loops])
+                    assignments.append(Assignment(
+                        value, following.value, line, col, source_text(lines, tokens, i + 2, last),
+                        value_facts(tokens, i + 2, last, builtin_functions), guard,
+                        any(entry[2] for entry in guards), multiplier, code_cost(counts), (i + 2, last),
+                        conditions(i)))
+                writes.add(value)
+        elif kind == TOKEN_OP and value == '?' and i + 1 < end:
+            first = _condition_start(tokens, partner, i - 1, start)
+            condition = value_facts(tokens, first, i - 1, builtin_functions)
+            then_end = branch_end = _expression_end(tokens, partner, i + 1, end)
+            if branch_end + 2 < end and tokens[branch_end + 1].value == ':':
+                branch_end = _expression_end(tokens, partner, branch_end + 2, end)
+            # `a != a_prev ? (a_prev = a; ...)` recomputes only when its inputs change
+            change = (any(tokens[j].value == '!=' for j in range(first, i)) and
+                      any(tokens[j].kind == TOKEN_IDENT and tokens[j].value in condition.reads and
+                          tokens[j + 1].value == '=' for j in range(i + 1, branch_end)))
+            if branch_end != then_end:
+                guards.append((branch_end, condition, change, (first, i - 1), False, then_end + 2))
+            guards.append((then_end, condition, change, (first, i - 1), True, i + 1))
+        i += 1
+    
+    body = value_facts(tokens, start, end - 1, builtin_functions) if end > start else _EMPTY_FACTS
+    if skip:
+        # Top-level code: leave the skipped function definitions out of the summary
+        parts = []
+        first = start
+        for skip_start in sorted(k for k in skip if start <= k < end):
+            if skip_start > first:
+                parts.append(value_facts(tokens, first, skip_start - 1, builtin_functions))
+            first = skip[skip_start] + 1
+        if first < end:
+            parts.append(value_facts(tokens, first, end - 1, builtin_functions))
+        body = _merge_facts(parts)
+    return (assignments, calls, body.reads, writes, set(body.calls), stateful or body.stateful, memory,
+            builtin_writes)
+
+
+def extract_flow_blocks(filename: str, content: str, tokens: List[Token], partner: List[int],
+                        argument_count: List[int], builtin_functions: Set[str]) -> Tuple[Dict[str, FlowBlock], Dict[str, FlowBlock]]:
+    """Collect data flow facts for every function body and section in a module
+
+    Returns ({function_name: FlowBlock}, {section: FlowBlock}), like
+    extract_code_blocks.
+    """
+    lines = content.split('\n')
+    definitions = list(iter_function_definitions(tokens, partner, argument_count))
+    skip = {index - 1: (close if close != -1 else len(tokens) - 1)
+            for index, _, _, _, close in definitions}
+    
+    functions = {}
+    sections = {}
+    for section, start, end in iter_section_spans(tokens):
+        flow = measure_flow(tokens, partner, start, end, builtin_functions, lines, skip)
+        previous = sections.get(section)
+        if previous is not None:  # a section repeated within one module
+            flow = (previous.assignments + flow[0], previous.calls + flow[1], previous.reads | flow[2],
+                    previous.writes | flow[3], previous.callees | flow[4], previous.stateful or flow[5],
+                    previous.memory + flow[6], previous.builtin_writes | flow[7])
+        sections[section] = FlowBlock(filename, section, section, tokens[start - 1].line, [], set(), set(), *flow,
+                                      _EMPTY_FACTS, (start, start - 1))
+        for index, name, _, body_open, body_close in definitions:
+            if start <= index < end:
+                params, local_names, instance_names = _function_scope(tokens, partner, index)
+                body_end = body_close if body_close != -1 else end
+                first, last = _last_statement(tokens, partner, body_open + 1, body_end)
+                functions[name] = FlowBlock(filename, name, section, tokens[index].line, params, local_names,
+                                            instance_names, *measure_flow(tokens, partner, body_open + 1, body_end,
+                                                                          builtin_functions, lines),
+                                            value_facts(tokens, first, last, builtin_functions), (first, last))
+    return functions, sections
+
+
+def content_digest(content: str) -> str:
+    """Hash module content together with the analyzer version (analysis cache key)"""
+    return hashlib.sha256(f"{ANALYZER_VERSION}\0{content}".encode('utf-8')).hexdigest()
+
+
+# Finding rule ids, as used by the jsonl and sarif output formats
+RULE_UNDECLARED = 'undeclared-call'
+RULE_ORDER = 'function-order'
+RULE_PARAMETERS = 'parameter-mismatch'
+RULE_UNUSED = 'unused-function'
+RULE_HOIST = 'hoist-candidate'
+RULE_LUT = 'lut-candidate'
+RULE_MEMORY = 'memory-layout'
+RULE_CACHE = 'cache-invalidation'
+RULE_DENORMAL = 'denormal-risk'
+RULE_UNREADABLE = 'unreadable-module'
+
+RULE_DESCRIPTIONS = {
+    RULE_UNDECLARED: "Function called before any declaration in processing order",
+    RULE_ORDER: "Function called above its declaration in the same file",
+    RULE_PARAMETERS: "Call argument count differs from the declaration's parameter count",
+    RULE_UNUSED: "Function declared but never called",
+    RULE_HOIST: "Per-sample work whose inputs only change when a slider moves",
+    RULE_LUT: "Pure single-input function on the @sample path that a lookup table could replace",
+    RULE_MEMORY: "Memory region overlap, indexing outside an allocated region, or a footprint over maxmem",
+    RULE_CACHE: "Cache input written without invalidating the cache, or an invalidation that only causes a rebuild",
+    RULE_DENORMAL: "Recursive @sample state with no DC offset or flush to zero, which decays into denormals",
+    RULE_UNREADABLE: "Module file is not valid UTF-8 (for example, caught half-written by an editor)",
+}
+
+
+class Finding(NamedTuple):
+    rule: str
+    filename: str
+    line: int
+    col: int
+    function: str
+    message: str
+
+
+class CallReference(NamedTuple):
+    filename: str
+    line: int
+    col: int
+    arg_count: int
+
+
+class FunctionSymbol(NamedTuple):
+    name: str
+    filename: str
+    line: int
+    col: int
+    param_count: int
+
+
+class SymbolIndex:
+    """Cross-file symbol table built once per run from the per-module facts
+
+    Maps every user function to its definition(s) and to every call site, and
+    records each module's position in every root's processing order so
+    "declared before this module" questions are answered without re-walking
+    the modules.
+    """
+
+    def __init__(self, module_facts: Dict[str, ModuleFacts], root_orders: Dict[str, List[str]]):
+        self.root_positions: Dict[str, Dict[str, int]] = {
+            root: {filename: i for i, filename in enumerate(order)} for root, order in root_orders.items()
+        }
+        self.module_roots: Dict[str, List[str]] = defaultdict(list)  # filename -> roots that include it
+        self.definitions: Dict[str, List[FunctionSymbol]] = defaultdict(list)  # name -> definitions
+        self.callers: Dict[str, List[CallReference]] = defaultdict(list)  # name -> every call site
+        self.calls_by_module: Dict[str, List[CallSite]] = {}
+        
+        for root, order in root_orders.items():
+            for filename in order:
+                self.module_roots[filename].append(root)
+        
+        # Shared modules are indexed once, however many roots import them
+        for filename in _merge_orders(root_orders.values()):
+            facts = module_facts.get(filename)
+            if facts is None:
+                continue
+            for declaration in facts.declarations:
+                self.definitions[declaration.name].append(FunctionSymbol(
+                    declaration.name, filename, declaration.line, declaration.col, declaration.param_count))
+            for call in facts.calls:
+                self.callers[call.name].append(CallReference(filename, call.line, call.col, call.arg_count))
+            self.calls_by_module[filename] = facts.calls
+
+    def find_definition(self, name: str) -> Optional[FunctionSymbol]:
+        """Return the first definition of a function in processing order ("go to definition")"""
+        definitions = self.definitions.get(name)
+        return definitions[0] if definitions else None
+
+    def find_callers(self, name: str) -> List[CallReference]:
+        """Return every call site of a function ("find all callers")"""
+        return self.callers.get(name, [])
+
+    def definition_visible_from(self, name: str, filename: str, root: Optional[str] = None) -> Optional[FunctionSymbol]:
+        """Return the definition in effect for a call in `filename`
+
+        That is the latest definition from a module at or before `filename` in
+        the root's processing order (the first root including `filename` if
+        none is given), or None if the function is not declared by then.
+        """
+        if root is None:
+            roots = self.module_roots.get(filename)
+            if not roots:
+                return None
+            root = roots[0]
+        positions = self.root_positions[root]
+        position = positions.get(filename, len(positions))
+        visible = None
+        visible_position = -1
+        for symbol in self.definitions.get(name, ()):
+            symbol_position = positions.get(symbol.filename)
+            if symbol_position is not None and visible_position <= symbol_position <= position:
+                visible = symbol
+                visible_position = symbol_position
+        return visible
+
+
+class SectionCallGraph:
+    """Call graph of one .jsfx root, with each function tagged by the sections that reach it
+
+    Entry points are the top-level code of each section in every module the
+    root imports (JSFX concatenates imported modules' sections into the
+    root's). Functions are resolved by name to their last definition in the
+    root's processing order.
+    """
+
+    def __init__(self, root: str, functions: Dict[str, CodeBlock], entries: Dict[str, List[CodeBlock]]):
+        self.root = root
+        self.functions = functions
+        self.entries = entries  # section -> top-level code blocks, in processing order
+        self.reachable: Dict[str, Set[str]] = {section: self._reach(blocks) for section, blocks in entries.items()}
+        self.function_sections: Dict[str, Set[str]] = defaultdict(set)  # name -> sections that can call it
+        for section, names in self.reachable.items():
+            for name in names:
+                self.function_sections[name].add(section)
+        self._inclusive: Dict[str, Dict[str, float]] = {}
+        self._cycles: Dict[str, FrozenSet[str]] = self._find_cycles()  # name -> the call cycle it belongs to
+
+    def _find_cycles(self) -> Dict[str, FrozenSet[str]]:
+        """Return {function: members} for every function in a cycle of two or more functions (Tarjan's SCC)"""
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        cycles = {}
+        for start in self.functions:
+            if start in index:
+                continue
+            # Iterative depth-first search: (function, iterator over its callees)
+            work = [(start, iter(self.functions[start].calls))]
+            index[start] = lowlink[start] = len(index)
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                name, callees = work[-1]
+                for callee, _, _ in callees:
+                    if callee not in self.functions:
+                        continue
+                    if callee not in index:
+                        index[callee] = lowlink[callee] = len(index)
+                        stack.append(callee)
+                        on_stack.add(callee)
+                        work.append((callee, iter(self.functions[callee].calls)))
+                        break
+                    if callee in on_stack:
+                        lowlink[name] = min(lowlink[name], index[callee])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[name])
+                    if lowlink[name] == index[name]:
+                        members = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            members.append(member)
+                            if member == name:
+                                break
+                        if len(members) > 1:
+                            cycle = frozenset(members)
+                            cycles.update(dict.fromkeys(members, cycle))
+        return cycles
+
+    def _reach(self, blocks: List[CodeBlock]) -> Set[str]:
+        seen = set()
+        stack = [name for block in blocks for name, _, _ in block.calls if name in self.functions]
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(callee for callee, _, _ in self.functions[name].calls
+                         if callee in self.functions and callee not in seen)
+        return seen
+
+    def _follows(self, callee: str, guard: Optional[str], mode: str) -> bool:
+        """Whether a call guarded by `guard` counts towards a cost estimate in `mode`"""
+        if guard is None or mode == COST_WORST_CASE:
+            return True
+        if mode == COST_UNCONDITIONAL:
+            return False
+        return not guard or guard not in self.functions[callee].cleared_flags
+
+    def _block_counts(self, block: CodeBlock, mode: str, active: Set[str]) -> Dict[str, float]:
+        counts = dict(block.counts)
+        if mode == COST_UNCONDITIONAL:
+            for counter in COST_COUNTERS:
+                counts[counter] -= block.conditional_counts[counter]
+        for callee, times, guard in block.calls:
+            if callee in self.functions and callee not in active and self._follows(callee, guard, mode):
+                for counter, value in self.inclusive_counts(callee, mode, active).items():
+                    counts[counter] += value * times
+        return counts
+
+    def inclusive_counts(self, name: str, mode: str = COST_WORST_CASE,
+                         _active: Optional[Set[str]] = None) -> Dict[str, float]:
+        """Counts for one call of a function, including everything it calls (see COST_WORST_CASE etc.)
+
+        Recursion is not followed, so inside a call cycle the counts depend on
+        which members of the cycle are already on the call path; they are only
+        memoized when none is.
+        """
+        key = (name, mode)
+        active = _active if _active is not None else set()
+        cycle = self._cycles.get(name)
+        path_free = cycle is None or active.isdisjoint(cycle)
+        cached = self._inclusive.get(key) if path_free else None
+        if cached is not None:
+            return cached
+        active.add(name)  # recursion is not followed
+        counts = self._block_counts(self.functions[name], mode, active)
+        active.discard(name)
+        if path_free:
+            self._inclusive[key] = counts
+        return counts
+
+    def section_counts(self, section: str, mode: str = COST_WORST_CASE) -> Dict[str, float]:
+        """Counts for one run of a section (for @sample: per sample), including callees"""
+        counts = dict.fromkeys(COST_COUNTERS, 0.0)
+        for block in self.entries.get(section, []):
+            for counter, value in self._block_counts(block, mode, set()).items():
+                counts[counter] += value
+        return counts
+
+    def executions(self, section: str, mode: str = COST_WORST_CASE) -> Dict[str, float]:
+        """Return {function: calls per run of the section} for every function the section reaches"""
+        def callees(block: CodeBlock):
+            return [(callee, times) for callee, times, guard in block.calls
+                    if callee in self.functions and self._follows(callee, guard, mode)]
+        
+        # Depth-first post-order gives callees after callers once reversed
+        order = []
+        visited = set()
+        
+        def visit(name: str):
+            visited.add(name)
+            for callee, _ in callees(self.functions[name]):
+                if callee not in visited:
+                    visit(callee)
+            order.append(name)
+        
+        executions = defaultdict(float)
+        for block in self.entries.get(section, []):
+            for name, times in callees(block):
+                executions[name] += times
+                if name not in visited:
+                    visit(name)
+        
+        position = {name: i for i, name in enumerate(reversed(order))}
+        for name in reversed(order):
+            for callee, times in callees(self.functions[name]):
+                if position[callee] > position[name]:  # back edges are recursion
+                    executions[callee] += executions[name] * times
+        return dict(executions)
+
+
+
+class CodeSize(NamedTuple):
+    """Token count of one function body or of one section's top-level code, and the calls EEL2 inlines into it"""
+    filename: str
+    name: str                              # function name, or the section for top-level code
+    section: str
+    line: int
+    tokens: int                            # tokens of the code itself, call sites included, callee bodies not
+    calls: List[Tuple[str, int, int]]      # (user function, line, col) of each call site
+
+
+def extract_code_sizes(filename: str, tokens: List[Token], partner: List[int], argument_count: List[int],
+                       builtin_functions: Set[str]) -> Tuple[Dict[str, CodeSize], Dict[str, CodeSize]]:
+    """Count the tokens of every function body and every section's top-level code in a module
+
+    A function body is counted from its '(' to its ')'; top-level code
+    leaves out the function definitions in it. Returns ({function_name:
+    CodeSize}, {section: CodeSize}).
+    """
+    definitions = list(iter_function_definitions(tokens, partner, argument_count))
+    sites = list(iter_call_sites(tokens, builtin_functions))
+    
+    def calls(first: int, last: int) -> List[Tuple[str, int, int]]:
+        return [(name, tokens[i].line, tokens[i].col) for i, name in sites if first <= i <= last]
+    
+    functions = {}
+    sections = {}
+    for section, start, end in iter_section_spans(tokens):
+        inner = [(index - 1, close if close != -1 else end - 1) for index, _, _, _, close in definitions
+                 if start <= index < end]
+        size = end - start - sum(last - first + 1 for first, last in inner)
+        section_calls = [(name, tokens[i].line, tokens[i].col) for i, name in sites
+                         if start <= i < end and not any(first <= i <= last for first, last in inner)]
+        line = tokens[start - 1].line
+        if section in sections:  # a section repeated within one module
+            previous = sections[section]
+            size += previous.tokens
+            section_calls = previous.calls + section_calls
+            line = previous.line
+        sections[section] = CodeSize(filename, section, section, line, size, section_calls)
+        for index, name, _, body_open, body_close in definitions:
+            if start <= index < end:
+                last = body_close if body_close != -1 else end - 1
+                functions[name] = CodeSize(filename, name, section, tokens[index].line, last - body_open + 1,
+                                           calls(body_open, last))
+    return functions, sections
+
+
+class InlineExpansion:
+    """Compiled size of one root's sections with every user function call inlined, as EEL2 compiles them
+
+    EEL2 copies a function's body into each call site, so a function's
+    expanded size is its own tokens plus the expanded size of everything it
+    calls, and a helper reached through a chain of callers is compiled once
+    per path. Functions resolve to their last definition in the root's
+    processing order; recursion is not followed.
+    """
+
+    def __init__(self, root: str, functions: Dict[str, CodeSize], entries: Dict[str, List[CodeSize]]):
+        self.root = root
+        self.functions = functions
+        self.entries = entries  # section -> top-level code, in processing order
+        self._expanded: Dict[str, int] = {}
+
+    def expanded(self, name: str, _active: Optional[Set[str]] = None) -> int:
+        """Tokens of one inlined copy of a function, including everything it calls"""
+        cached = self._expanded.get(name)
+        if cached is not None:
+            return cached
+        active = _active if _active is not None else set()
+        active.add(name)
+        block = self.functions[name]
+        size = block.tokens + sum(self.expanded(callee, active) for callee, _, _ in block.calls
+                                  if callee in self.functions and callee not in active)
+        active.discard(name)
+        self._expanded[name] = size
+        return size
+
+    def section_size(self, section: str) -> Tuple[int, int]:
+        """Return (own tokens, expanded tokens) of one section's code across all modules"""
+        blocks = self.entries.get(section, [])
+        own = sum(block.tokens for block in blocks)
+        return own, own + sum(self.expanded(callee) for block in blocks for callee, _, _ in block.calls
+                              if callee in self.functions)
+
+    def copies(self, section: str) -> Dict[str, int]:
+        """Return {function: inlined copies of it in the section's compiled code}"""
+        order = []
+        visited = set()
+        
+        def visit(name: str):
+            visited.add(name)
+            for callee, _, _ in self.functions[name].calls:
+                if callee in self.functions and callee not in visited:
+                    visit(callee)
+            order.append(name)
+        
+        copies = defaultdict(int)
+        for block in self.entries.get(section, []):
+            for name, _, _ in block.calls:
+                if name in self.functions:
+                    copies[name] += 1
+                    if name not in visited:
+                        visit(name)
+        
+        position = {name: i for i, name in enumerate(reversed(order))}
+        for name in reversed(order):
+            for callee, _, _ in self.functions[name].calls:
+                if callee in position and position[callee] > position[name]:  # back edges are recursion
+                    copies[callee] += copies[name]
+        return dict(copies)
+
+    def call_sites(self, section: str) -> List[Dict]:
+        """Every call site the section compiles, with the tokens its inlined copies add, largest first
+
+        A site in a function is compiled once per copy of that function,
+        and `path` is the chain of calls from the section that produces the
+        most of those copies. `callee_copies` counts the callee's copies
+        from every site; above 1, the site duplicates code.
+        """
+        copies = self.copies(section)
+        parent: Dict[str, Tuple[int, str]] = {}  # function -> (copies, caller) of its heaviest caller
+        for block in self.entries.get(section, []):
+            for callee, _, _ in block.calls:
+                parent.setdefault(callee, (1, section))
+        for name, count in copies.items():
+            for callee, _, _ in self.functions[name].calls:
+                if callee in copies and callee != name and count > parent.get(callee, (0, ''))[0]:
+                    parent[callee] = (count, name)
+        
+        def path(name: str) -> List[str]:
+            chain = [name]
+            while name in parent and parent[name][1] != section and parent[name][1] not in chain:
+                name = parent[name][1]
+                chain.append(name)
+            return [section] + chain[::-1]
+        
+        sites = []
+        blocks = [(block, 1, [section]) for block in self.entries.get(section, [])]
+        blocks += [(self.functions[name], count, path(name)) for name, count in copies.items()]
+        for block, count, chain in blocks:
+            for callee, line, col in block.calls:
+                if callee not in self.functions or callee in chain[1:]:
+                    continue
+                size = self.expanded(callee)
+                sites.append({'file': block.filename, 'line': line, 'col': col, 'caller': block.name,
+                              'callee': callee, 'copies': count, 'size': size, 'tokens': count * size,
+                              'callee_copies': copies[callee], 'path': chain + [callee]})
+        sites.sort(key=lambda site: (-site['tokens'], site['file'], site['line'], site['col']))
+        return sites
+
+
+class InvarianceAnalysis:
+    """Data flow over one root's @sample path: which values only change when a slider moves
+
+    A value is invariant during @sample if it only reads invariant variables
+    and calls state-free functions. Globals are invariant unless code on the
+    @sample path assigns them something varying (or accumulates into them:
+    x += ..., x = f(x)); parameters are invariant unless some call on the path
+    passes a varying argument. Built-in sample data (spl0, ...) and memory
+    reads always vary. Assignments inside a branch or loop whose condition
+    varies are varying too. Iterates to a fixed point.
+    """
+
+    def __init__(self, graph: SectionCallGraph, functions: Dict[str, FlowBlock], entries: Dict[str, List[FlowBlock]]):
+        self.graph = graph
+        self.functions = functions
+        self.entries = entries
+        self.sample_blocks: List[FlowBlock] = list(entries.get('@sample', [])) + [
+            functions[name] for name in sorted(graph.reachable.get('@sample', ())) if name in functions]
+        self.varying_globals: Set[str] = set(SAMPLE_VARYING_VARIABLES)
+        self.varying_scoped: Dict[str, Set[str]] = defaultdict(set)  # function -> varying params and locals
+        self.stateful: Set[str] = {name for name, block in functions.items() if block.stateful or block.instance}
+        
+        changed = True
+        while changed:
+            changed = False
+            for block in self.sample_blocks:
+                for assignment in block.assignments:
+                    # x += ... and x = f(x) carry state from one sample to the next
+                    if (assignment.operator != '=' or assignment.target in assignment.value.reads
+                            or not self.is_invariant(block, assignment.value)
+                            or not self.is_invariant(block, assignment.guard)):
+                        changed |= self._mark_varying(block, assignment.target)
+                for call in block.calls:
+                    callee = functions.get(call.name)
+                    if callee is None:
+                        continue
+                    for param, arg in zip(callee.params, call.args):
+                        if param not in self.varying_scoped[callee.name] and not self.is_invariant(block, arg):
+                            self.varying_scoped[callee.name].add(param)
+                            changed = True
+            for name, block in functions.items():
+                if name not in self.stateful and not self._state_free(block):
+                    self.stateful.add(name)
+                    changed = True
+
+    def _scoped(self, block: FlowBlock, name: str) -> bool:
+        return block.name in self.functions and (name in block.locals or name in block.params)
+
+    def _mark_varying(self, block: FlowBlock, name: str) -> bool:
+        if self._scoped(block, name):
+            varying = self.varying_scoped[block.name]
+        else:
+            varying = self.varying_globals
+        if name in varying:
+            return False
+        varying.add(name)
+        return True
+
+    def is_varying(self, block: FlowBlock, name: str) -> bool:
+        """Whether a variable read in `block` can change from one sample to the next"""
+        if self._scoped(block, name):
+            return name in self.varying_scoped[block.name]
+        if name.startswith('$'):
+            return False
+        if '.' in name or name in block.instance:
+            return True  # namespaced or per-instance state
+        return name in self.varying_globals
+
+    def is_invariant(self, block: FlowBlock, facts: ValueFacts) -> bool:
+        """Whether an expression in `block` only depends on slider state"""
+        if facts.stateful:
+            return False
+        if any(name not in self.functions or name in self.stateful for name in facts.calls):
+            return False
+        return not any(self.is_varying(block, name) for name in facts.reads)
+
+    def _state_free(self, block: FlowBlock) -> bool:
+        """Whether a function's result depends on its arguments and invariant globals alone"""
+        for name in block.reads:
+            if not (name in block.params or name in block.locals) and self.is_varying(block, name):
+                return False
+        for name in block.writes:
+            if not (name in block.params or name in block.locals) and name in self.varying_globals:
+                return False
+        return all(name in self.functions and name not in self.stateful for name in block.callees)
+
+    def result_inputs(self, name: str, _active: Optional[Set[str]] = None) -> Optional[Tuple[Set[str], Set[str]]]:
+        """Return (params, globals) a function's return value depends on, or None if it depends on state
+
+        Follows the assignments and calls feeding the last statement backwards,
+        so bookkeeping writes such as debug counters do not count. A global
+        assigned unconditionally with `=` inside the function is treated as a
+        temporary. Memory, instance variables, stateful built-ins and
+        recursion make the result depend on state.
+        """
+        block = self.functions[name]
+        active = _active if _active is not None else set()
+        active.add(name)
+        temporaries = {assignment.target for assignment in block.assignments
+                       if assignment.operator == '=' and not assignment.guard.reads and not assignment.guard.calls}
+        pending = [block.result]
+        seen = set()
+        called = set()
+        external = set()
+        while pending:
+            facts = pending.pop()
+            if facts.stateful:
+                return None
+            for callee in facts.calls - called:
+                called.add(callee)
+                if callee not in self.functions or callee in active:
+                    return None
+                inputs = self.result_inputs(callee, active)
+                if inputs is None:
+                    return None
+                external |= inputs[1]
+                for call in block.calls:
+                    if call.name == callee:
+                        pending.extend(call.args)
+                        pending.append(call.guard)
+            for variable in facts.reads - seen:
+                seen.add(variable)
+                if variable in block.instance or '.' in variable:
+                    return None
+                if not (variable in block.params or variable in block.locals or variable in temporaries):
+                    external.add(variable)
+                for assignment in block.assignments:
+                    if assignment.target == variable:
+                        pending.append(assignment.value)
+                        pending.append(assignment.guard)
+        active.discard(name)
+        return {variable for variable in seen if variable in block.params}, external
+
+    def section_writes(self, section: str) -> Set[str]:
+        """Globals assigned by a section's code and the functions it reaches"""
+        writes = set()
+        for block in self.entries.get(section, []):
+            writes |= block.writes
+        for name in self.graph.reachable.get(section, ()):
+            block = self.functions.get(name)
+            if block is not None:
+                writes |= {w for w in block.writes if w not in block.locals and w not in block.params}
+        return writes
+
+
+Interval = Tuple[float, float]
+
+# Host sample rates assumed for srate, lowest to highest
+SAMPLE_RATE_RANGE: Interval = (44100.0, 192000.0)
+_CONSTANT_RANGES = {'$pi': (math.pi, math.pi), '$e': (math.e, math.e), '$phi': (1.618033988749895, 1.618033988749895)}
+# Slider metadata accessors (SLIDER_TABLE_MODULE): {function: SliderDefinition field}
+SLIDER_ACCESSORS = {'get_slider_min': 'minimum', 'get_slider_max': 'maximum', 'get_slider_default': 'default'}
+# Lookup table model, after build_compression_lut()/lookup_compression_lut()
+LUT_TABLE_ENTRIES = 1024     # table resolution assumed when sizing a candidate (one extra entry for interpolation)
+LUT_LOOKUP_COST = 15.0       # range check, index scaling, floor, two memory reads and a linear interpolation
+MEMORY_SLOT_BYTES = 8        # every JSFX memory slot is a double
+_COMPARISON_OPERATORS = {'<', '>', '<=', '>=', '==', '!=', '===', '!=='}
+_NEGATED_COMPARISONS = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '==', '===': '!==', '!==': '==='}
+_FLIPPED_COMPARISONS = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!=', '===': '===', '!==': '!=='}
+_INTERVAL_FUNCTIONS = {'min', 'max', 'abs', 'sqr', 'sqrt', 'log', 'log10', 'exp', 'floor', 'ceil', 'tanh', 'atan',
+                       'invsqrt', 'sin', 'cos', 'sign'}
+
+
+_UNBOUNDED: Interval = (-math.inf, math.inf)
+
+
+def _hull(a: Interval, b: Interval) -> Interval:
+    return min(a[0], b[0]), max(a[1], b[1])
+
+
+def _bounded(low: float, high: float) -> Interval:
+    """Order two bounds; NaN (inf - inf, 0 * inf) widens to unbounded"""
+    if math.isnan(low) or math.isnan(high):
+        return _UNBOUNDED
+    return min(low, high), max(low, high)
+
+
+def _monotonic(function: Callable[[float], float], value: Interval) -> Interval:
+    def apply(x: float) -> float:
+        if math.isinf(x) and function in (math.floor, math.ceil):
+            return x
+        try:
+            return function(x)
+        except OverflowError:
+            return math.inf
+    return _bounded(apply(value[0]), apply(value[1]))
+
+
+def _interval_function(name: str, args: List[Interval]) -> Interval:
+    """Bound a built-in function call; unknown functions are unbounded"""
+    if name in ('min', 'max') and len(args) == 2:
+        pick = min if name == 'min' else max
+        return pick(args[0][0], args[1][0]), pick(args[0][1], args[1][1])
+    if len(args) != 1:
+        return _UNBOUNDED
+    low, high = args[0]
+    if name == 'abs':
+        if low >= 0:
+            return low, high
+        return (0.0 if high >= 0 else -high), max(-low, high)
+    if name == 'sqr':
+        magnitude = _interval_function('abs', args)
+        return magnitude[0] * magnitude[0], magnitude[1] * magnitude[1]
+    if name in ('sqrt', 'log', 'log10', 'invsqrt') and low <= 0:
+        return (0.0, math.inf) if name == 'sqrt' else _UNBOUNDED
+    monotonic = {'sqrt': math.sqrt, 'log': math.log, 'log10': math.log10, 'exp': math.exp, 'floor': math.floor,
+                 'ceil': math.ceil, 'tanh': math.tanh, 'atan': math.atan, 'invsqrt': lambda x: 1 / math.sqrt(x)}
+    if name in monotonic:
+        return _monotonic(monotonic[name], (low, high))
+    if name in ('sin', 'cos'):
+        return -1.0, 1.0
+    if name == 'sign':
+        return (-1.0 if low < 0 else 0.0), (1.0 if high > 0 else 0.0)
+    return _UNBOUNDED
+
+
+def _arithmetic(operator: str, a: Interval, b: Interval) -> Interval:
+    if operator == '+':
+        return _bounded(a[0] + b[0], a[1] + b[1])
+    if operator == '-':
+        return _bounded(a[0] - b[1], a[1] - b[0])
+    if operator == '*':
+        corners = [x * y for x in a for y in b]
+        if any(math.isnan(corner) for corner in corners):
+            return _UNBOUNDED
+        return min(corners), max(corners)
+    if operator == '/':
+        if b[0] <= 0 <= b[1]:
+            return _UNBOUNDED
+        return _arithmetic('*', a, (1 / b[1], 1 / b[0]))
+    if operator == '%':
+        bound = max(abs(b[0]), abs(b[1]))
+        if not math.isfinite(bound):
+            return 0.0, math.inf
+        return 0.0, max(0.0, math.floor(bound) - 1)  # EEL2's % works on the operands' whole magnitudes
+    if operator == '^' and a[0] > 0:
+        try:
+            corners = [x ** y for x in a for y in b]
+        except OverflowError:
+            return _UNBOUNDED
+        if any(math.isnan(corner) for corner in corners):
+            return _UNBOUNDED
+        return min(corners), max(corners)
+    return _UNBOUNDED
+
+
+class _IntervalParser:
+    """Recursive-descent parser that bounds an EEL2 expression by interval arithmetic"""
+
+    def __init__(self, tokens: List[Token], first: int, last: int, lookup: Callable[[str], Interval],
+                 call: Optional[Callable[[str, List[Interval]], Interval]] = None):
+        self.tokens = tokens
+        self.position = first
+        self.last = last
+        self.lookup = lookup
+        self.call = call
+
+    def peek(self) -> Optional[str]:
+        if self.position > self.last:
+            return None
+        token = self.tokens[self.position]
+        return token.value if token.kind == TOKEN_OP else None
+
+    def advance(self) -> Token:
+        if self.position > self.last:
+            raise ValueError("unexpected end of expression")
+        self.position += 1
+        return self.tokens[self.position - 1]
+
+    def expect(self, value: str):
+        if self.peek() != value:
+            raise ValueError(f"expected {value}")
+        self.position += 1
+
+    def statements(self, closing: Optional[str]) -> Interval:
+        value = self.assignment()
+        while self.peek() == ';':
+            self.position += 1
+            if self.peek() != closing and self.position <= self.last:
+                value = self.assignment()
+        return value
+
+    def assignment(self) -> Interval:
+        value = self.ternary()
+        if self.peek() in ASSIGNMENT_OPERATORS:
+            self.position += 1
+            value = self.assignment()
+        return value
+
+    def ternary(self) -> Interval:
+        condition = self.logical()
+        if self.peek() != '?':
+            return condition
+        self.position += 1
+        taken = self.assignment()
+        if self.peek() == ':':
+            self.position += 1
+            return _hull(taken, self.assignment())
+        return _hull(taken, (0.0, 0.0))
+
+    def logical(self) -> Interval:
+        value = self.comparison()
+        while self.peek() in ('&&', '||'):
+            self.position += 1
+            self.comparison()
+            value = (0.0, 1.0)
+        return value
+
+    def comparison(self) -> Interval:
+        value = self.additive()
+        while self.peek() in _COMPARISON_OPERATORS:
+            self.position += 1
+            self.additive()
+            value = (0.0, 1.0)
+        return value
+
+    def additive(self) -> Interval:
+        value = self.term()
+        while self.peek() in ('+', '-'):
+            operator = self.advance().value
+            value = _arithmetic(operator, value, self.term())
+        return value
+
+    def term(self) -> Interval:
+        value = self.power()
+        while self.peek() in ('*', '/', '%', '|', '&', '~', '<<', '>>'):
+            operator = self.advance().value
+            value = _arithmetic(operator, value, self.power())
+        return value
+
+    def power(self) -> Interval:
+        value = self.unary()
+        while self.peek() == '^':
+            self.position += 1
+            value = _arithmetic('^', value, self.unary())
+        return value
+
+    def unary(self) -> Interval:
+        operator = self.peek()
+        if operator in ('-', '+', '!'):
+            self.position += 1
+            value = self.unary()
+            if operator == '-':
+                return _arithmetic('-', (0.0, 0.0), value)
+            return (0.0, 1.0) if operator == '!' else value
+        return self.atom()
+
+    def atom(self) -> Interval:
+        token = self.advance()
+        if token.kind == TOKEN_NUMBER:
+            return self.number(token.value)
+        if token.kind == TOKEN_OP and token.value == '(':
+            value = self.statements(')')
+            self.expect(')')
+            return value
+        if token.kind != TOKEN_IDENT:
+            raise ValueError(f"unexpected {token.value}")
+        if self.peek() == '(':
+            self.position += 1
+            args = []
+            while self.peek() != ')':
+                args.append(self.assignment())
+                if self.peek() == ',':
+                    self.position += 1
+                elif self.peek() != ')':
+                    raise ValueError("expected , or )")
+            self.position += 1
+            if self.call is not None and token.value not in _INTERVAL_FUNCTIONS:
+                return self.call(token.value, args)
+            return _interval_function(token.value, args)
+        if self.peek() == '[':
+            self.position += 1
+            self.statements(']')
+            self.expect(']')
+            return _UNBOUNDED
+        if token.value in _CONSTANT_RANGES:
+            return _CONSTANT_RANGES[token.value]
+        return self.lookup(token.value)
+
+    @staticmethod
+    def number(text: str) -> Interval:
+        if text[:2] in ('0x', '0X'):
+            value = float(int(text[2:], 16))
+        elif text[:2] in ('$x', '$X'):
+            value = float(int(text[2:], 16))
+        elif text.startswith("$'"):
+            value = float(ord(text[2:-1][-1]))
+        else:
+            value = float(text)
+        return value, value
+
+
+def expression_interval(tokens: List[Token], first: int, last: int, lookup: Callable[[str], Interval],
+                        call: Optional[Callable[[str, List[Interval]], Interval]] = None) -> Interval:
+    """Return (low, high) bounds of tokens[first..last]; either bound may be infinite
+
+    `lookup` bounds a variable by name and `call` a user function call from
+    its argument bounds. Both branches of ?: are included. Expressions the
+    parser does not understand are unbounded.
+    """
+    parser = _IntervalParser(tokens, first, last, lookup, call)
+    try:
+        value = parser.statements(None)
+    except (ValueError, IndexError):
+        return _UNBOUNDED
+    return value if parser.position > last else _UNBOUNDED
+
+
+def _split_top_level(tokens: List[Token], partner: List[int], first: int, last: int, separator: str) -> List[Tuple[int, int]]:
+    """Split tokens[first..last] at every top-level `separator` operator"""
+    parts = []
+    j = first
+    part_start = first
+    while j <= last:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP and (value == '(' or value == '[') and partner[j] != -1:
+            j = partner[j] + 1
+            continue
+        if kind == TOKEN_OP and value == separator:
+            parts.append((part_start, j - 1))
+            part_start = j + 1
+        j += 1
+    parts.append((part_start, last))
+    return parts
+
+
+def condition_constraints(tokens: List[Token], partner: List[int], first: int, last: int,
+                          holds: bool) -> List[Tuple[str, str, Tuple[int, int]]]:
+    """Return (variable, comparison, bound expression span) facts implied by a condition
+
+    Only `variable <op> expression` comparisons joined by && (or, for a
+    condition known false, by ||) are understood; e.g. the body of
+    `while (i < n && x)` gets ('i', '<', span of n).
+    """
+    constraints = []
+    for part_first, part_last in _split_top_level(tokens, partner, first, last, '&&' if holds else '||'):
+        while (part_first < part_last and tokens[part_first].value == '(' and
+               partner[part_first] == part_last and tokens[part_first].kind == TOKEN_OP):
+            part_first, part_last = part_first + 1, part_last - 1
+        operators = []
+        j = part_first
+        while j <= part_last:
+            if tokens[j].kind == TOKEN_OP:
+                if tokens[j].value in ('(', '[') and partner[j] != -1:
+                    j = partner[j] + 1
+                    continue
+                operators.append(j)
+            j += 1
+        comparisons = [j for j in operators if tokens[j].value in _COMPARISON_OPERATORS]
+        if len(comparisons) != 1 or any(tokens[j].value in ('?', ':', '&&', '||', ';') or
+                                        tokens[j].value in ASSIGNMENT_OPERATORS for j in operators):
+            continue
+        j = comparisons[0]
+        operator = tokens[j].value if holds else _NEGATED_COMPARISONS[tokens[j].value]
+        if j - 1 == part_first and tokens[part_first].kind == TOKEN_IDENT and j + 1 <= part_last:
+            constraints.append((tokens[part_first].value, operator, (j + 1, part_last)))
+        elif j + 1 == part_last and tokens[part_last].kind == TOKEN_IDENT and j - 1 >= part_first:
+            constraints.append((tokens[part_last].value, _FLIPPED_COMPARISONS[operator], (part_first, j - 1)))
+    return constraints
+
+
+def _constrain(value: Interval, operator: str, bound: Interval) -> Interval:
+    """Narrow `value` by `value <operator> bound`; strict comparisons against whole numbers assume whole values"""
+    low, high = value
+    if operator in ('<', '<='):
+        limit = bound[1]
+        if operator == '<' and math.isfinite(limit) and limit == int(limit):
+            limit -= 1
+        high = min(high, limit)
+    elif operator in ('>', '>='):
+        limit = bound[0]
+        if operator == '>' and math.isfinite(limit) and limit == int(limit):
+            limit += 1
+        low = max(low, limit)
+    elif operator in ('==', '==='):
+        low, high = max(low, bound[0]), min(high, bound[1])
+    elif operator in ('!=', '!==') and bound[0] == bound[1] and math.isfinite(bound[0]):
+        if low == bound[0]:
+            low += 1
+        elif high == bound[0]:
+            high -= 1
+    return (low, high) if low <= high else (low, low)
+
+
+class ValueRanges:
+    """Bounds for the variables of one root, derived from slider ranges and the code that assigns them
+
+    A slider variable ranges over its slider's min..max (dropdowns over their
+    options). Any other variable ranges over the union of everything assigned
+    to it anywhere in the root (a parameter: every argument passed to it).
+    `x += c` and `x *= c` are bounded by the conditions around them (the
+    `x < n` of `while (x < n) (... x += 1)`). User function calls are bounded
+    by evaluating the function's last statement with its arguments' bounds.
+    Variables loaded by built-ins (file_var), memory, sample data and cycles
+    are unbounded. Bounds are (low, high) and either may be infinite.
+    """
+
+    MAX_DEPTH = 24
+
+    def __init__(self, analysis: InvarianceAnalysis, sliders: Dict[str, SliderDefinition],
+                 token_tables: Callable[[str], Tuple[List[Token], List[int]]],
+                 constants: Optional[Dict[str, Interval]] = None):
+        self.analysis = analysis
+        self.sliders = sliders
+        self.sliders_by_index = {slider.index: slider for slider in sliders.values()}
+        self.token_tables = token_tables
+        self.constants = {'srate': SAMPLE_RATE_RANGE, **(constants or {})}
+        self.blocks = list(analysis.functions.values()) + [block for blocks in analysis.entries.values()
+                                                           for block in blocks]
+        self.builtin_writes = set().union(*(block.builtin_writes for block in self.blocks)) if self.blocks else set()
+        self._ranges: Dict[Tuple[str, str], Tuple[Interval, FrozenSet[str]]] = {}
+        self._active: Set[Tuple[str, str]] = set()
+        self._assignments: Dict[str, List[Tuple[FlowBlock, Assignment]]] = defaultdict(list)
+        for block in self.blocks:
+            for assignment in block.assignments:
+                self._assignments[assignment.target].append((block, assignment))
+        self._constraints: Dict[Tuple[str, int, int, bool], List[Tuple[str, str, Tuple[int, int]]]] = {}
+
+    def slider_range(self, slider: SliderDefinition) -> Interval:
+        if slider.options and slider.step:
+            return slider.minimum, min(slider.maximum, slider.minimum + slider.step * (len(slider.options) - 1))
+        return min(slider.minimum, slider.maximum), max(slider.minimum, slider.maximum)
+
+    def constraints(self, block: FlowBlock, conditions) -> List[Tuple[str, str, Tuple[int, int]]]:
+        """Return the (variable, comparison, bound span) facts implied by a site's enclosing conditions"""
+        found = []
+        for first, last, holds in conditions:
+            key = (block.filename, first, last, holds)
+            if key not in self._constraints:
+                tokens, partner = self.token_tables(block.filename)
+                self._constraints[key] = condition_constraints(tokens, partner, first, last, holds)
+            found.extend(self._constraints[key])
+        return found
+
+    def expression(self, block: FlowBlock, first: int, last: int, conditions=(),
+                   lookup: Optional[Callable[[str], Interval]] = None,
+                   flow_sensitive: bool = False) -> Tuple[Interval, FrozenSet[str]]:
+        """Return (bounds, sliders they come from) for tokens[first..last] of a block's module
+
+        `conditions` (as recorded on Assignment, CallFact and MemoryAccess)
+        narrow the variables they compare; `lookup` overrides the bounds of
+        variables it knows (returning None for the others). With
+        `flow_sensitive`, a function local takes its value from the last
+        assignment that must have run before `first` (see local_at).
+        """
+        tokens, _ = self.token_tables(block.filename)
+        used = set()
+        narrowing = defaultdict(list)
+        for variable, operator, span in self.constraints(block, conditions):
+            narrowing[variable].append((operator, span))
+        
+        def variable_bounds(name: str) -> Interval:
+            value = lookup(name) if lookup is not None else None
+            if value is None:
+                if flow_sensitive:
+                    value, sliders = self.local_at(block, name, first, conditions)
+                else:
+                    value, sliders = self.variable(block, name)
+                used.update(sliders)
+            for operator, span in narrowing.get(name, ()):
+                bound, sliders = self.expression(block, *span, lookup=lookup, flow_sensitive=flow_sensitive)
+                used.update(sliders)
+                value = _constrain(value, operator, bound)
+            return value
+        
+        def call_bounds(name: str, args: List[Interval]) -> Interval:
+            value, sliders = self.call(name, args)
+            used.update(sliders)
+            return value
+        
+        return expression_interval(tokens, first, last, variable_bounds, call_bounds), frozenset(used)
+
+    def call(self, name: str, args: List[Interval]) -> Tuple[Interval, FrozenSet[str]]:
+        """Return (bounds, sliders) of a user function call's result given its argument bounds"""
+        if name in SLIDER_ACCESSORS and len(args) == 1 and args[0][0] == args[0][1]:
+            slider = self.sliders_by_index.get(int(args[0][0]))
+            if slider is not None:
+                value = getattr(slider, SLIDER_ACCESSORS[name])
+                return (value, value), frozenset([slider.variable])
+        block = self.analysis.functions.get(name)
+        key = (name, '()')
+        if block is None or key in self._active or len(self._active) >= self.MAX_DEPTH:
+            return _UNBOUNDED, frozenset()
+        if block.result_span[1] < block.result_span[0]:
+            return (0.0, 0.0), frozenset()
+        arguments = dict(zip(block.params, args))
+        self._active.add(key)
+        try:
+            return self.expression(block, *block.result_span, lookup=arguments.get)
+        finally:
+            self._active.discard(key)
+
+    def local_at(self, block: FlowBlock, name: str, position: int, conditions) -> Tuple[Interval, FrozenSet[str]]:
+        """Return the bounds of a variable read at token `position` of a block
+
+        The last `=` assignment in the block before `position` whose
+        conditions all hold there decides the value, so
+        `i = min(i, n - 1); buf[i]` is bounded by the clamp. If the block
+        assigns the variable again after that point (e.g. later in an
+        enclosing loop), or a global could be changed by a call in between,
+        this falls back to variable().
+        """
+        if name in block.params or name in self.sliders or name in self.builtin_writes:
+            return self.variable(block, name)
+        assignments = [assignment for owner, assignment in self._assignments.get(name, ()) if owner is block]
+        active = set(conditions)
+        reaching = [assignment for assignment in assignments if assignment.operator == '=' and
+                    assignment.span[1] < position and set(assignment.conditions) <= active]
+        if not reaching:
+            return self.variable(block, name)
+        last = max(reaching, key=lambda assignment: assignment.span[1])
+        if any(assignment.span[0] > last.span[1] for assignment in assignments):
+            return self.variable(block, name)
+        if not self.analysis._scoped(block, name) and any(last.span[1] < call.span[0] < position
+                                                          for call in block.calls):
+            return self.variable(block, name)
+        key = (block.name, f"{name}@{last.span[0]}")
+        if key not in self._ranges:
+            self._ranges[key] = self.expression(block, *last.span, last.conditions, flow_sensitive=True)
+        return self._ranges[key]
+
+    def variable(self, block: FlowBlock, name: str) -> Tuple[Interval, FrozenSet[str]]:
+        """Return (bounds, sliders they come from) for a variable read in `block`"""
+        scoped = block.name in self.analysis.functions and (name in block.params or name in block.locals)
+        key = (block.name if scoped else '', name)
+        if key in self._ranges:
+            return self._ranges[key]
+        if name in self.sliders and not scoped:
+            return self.slider_range(self.sliders[name]), frozenset([name])
+        if name in self.constants and not scoped:
+            return self.constants[name], frozenset()
+        if name in SAMPLE_VARYING_VARIABLES and not scoped:
+            return _UNBOUNDED, frozenset()  # audio input, whatever the code writes back
+        if key in self._active or len(self._active) >= self.MAX_DEPTH:
+            return _UNBOUNDED, frozenset()  # a cycle: cutting it only widens what depends on it
+        self._active.add(key)
+        try:
+            result = self._variable(block, name, scoped)
+        finally:
+            self._active.discard(key)
+        self._ranges[key] = result
+        return result
+
+    def _variable(self, block: FlowBlock, name: str, scoped: bool) -> Tuple[Interval, FrozenSet[str]]:
+        assignments = [(owner, assignment) for owner, assignment in self._assignments.get(name, ())
+                       if (owner is block if scoped else not self.analysis._scoped(owner, name))]
+        if (name in block.builtin_writes) if scoped else name in self.builtin_writes:
+            return _UNBOUNDED, frozenset()
+        value = None
+        used = set()
+        if scoped and name in block.params:
+            index = block.params.index(name)
+            for caller in self.blocks:
+                for call in caller.calls:
+                    if call.name != block.name:
+                        continue
+                    tokens, partner = self.token_tables(caller.filename)
+                    arguments = _split_arguments(tokens, partner, call.span[0] + 1)
+                    if index >= len(arguments):
+                        return _UNBOUNDED, frozenset()
+                    bounds, sliders = self.expression(caller, *arguments[index], call.conditions)
+                    value = bounds if value is None else _hull(value, bounds)
+                    used |= sliders
+                    if value == _UNBOUNDED:
+                        return _UNBOUNDED, frozenset()
+            return (value, frozenset(used)) if value is not None else (_UNBOUNDED, frozenset())
+        
+        compound = []
+        for owner, assignment in assignments:
+            if assignment.operator != '=':
+                compound.append((owner, assignment))
+                continue
+            bounds, sliders = self.expression(owner, *assignment.span, assignment.conditions)
+            value = bounds if value is None else _hull(value, bounds)
+            used |= sliders
+            if value == _UNBOUNDED:
+                return _UNBOUNDED, frozenset()
+        if value is None:
+            if not compound:
+                return _UNBOUNDED, frozenset()
+            value = (0.0, 0.0)  # variables start at zero
+        
+        # x += c only grows x, up to the bound that guards it (x < n ? x += 1)
+        low, high = value
+        for owner, assignment in compound:
+            step, sliders = self.expression(owner, *assignment.span, assignment.conditions)
+            used |= sliders
+            limits = [(operator, self.expression(owner, *span)[0])
+                      for variable, operator, span in self.constraints(owner, assignment.conditions)
+                      if variable == name]
+            upper = _UNBOUNDED[1]
+            lower = _UNBOUNDED[0]
+            for operator, bound in limits:
+                upper, lower = min(upper, _constrain(_UNBOUNDED, operator, bound)[1]), max(
+                    lower, _constrain(_UNBOUNDED, operator, bound)[0])
+            if assignment.operator == '+=' and step[0] >= 0:
+                high = max(high, upper + step[1])
+            elif assignment.operator == '-=' and step[0] >= 0:
+                low = min(low, lower - step[1])
+            elif assignment.operator == '*=' and step[0] >= 1 and low >= 0:
+                high = max(high, upper * step[1] if upper >= 0 else math.inf)
+            elif assignment.operator == '/=' and step[0] >= 1 and low >= 0:
+                low = 0.0 if low > 0 else low
+            else:
+                return _UNBOUNDED, frozenset()
+            if math.isinf(high) and math.isinf(low):
+                return _UNBOUNDED, frozenset()
+        return (low, high), frozenset(used)
+
+
+MEMORY_POINTER = 'freemem'            # the allocation cursor used by 01_Utils/05_memory.jsfx-inc
+JSFX_DEFAULT_MAXMEM = 8 * 1024 * 1024  # memory slots per instance unless options:maxmem= says otherwise
+MAXMEM_PATTERN = re.compile(r'\bmaxmem\s*=\s*(\d+)')
+
+
+class MemoryRegion(NamedTuple):
+    name: str               # base pointer variable
+    start: float
+    size: float             # memory slots (upper bound; inf if unbounded)
+    filename: str
+    line: int
+    function: str           # allocating function, or the section for top-level code
+    section: str            # section whose code first runs the allocation
+
+
+class MemoryLayout:
+    """Static map of the regions one root carves out of JSFX memory with `base = freemem; freemem += size`
+
+    Walks the root's code once in execution order (@init first, then the
+    other sections), following each user function the first time it is
+    called and tracking variable bounds as it goes; variables not yet assigned
+    on the walk fall back to ValueRanges. Conditions known to be false skip
+    their code; all others are assumed to run, so sizes are upper bounds.
+    `x *= 2` / `x += c` loops guarded by `x < n` are run to completion.
+    """
+
+    MAX_INLINE_DEPTH = 32
+    MAX_LOOP_STEPS = 4096
+
+    def __init__(self, analysis: InvarianceAnalysis, ranges: ValueRanges, pointer: str = MEMORY_POINTER):
+        self.analysis = analysis
+        self.ranges = ranges
+        self.pointer = pointer
+        self.env: Dict[Tuple[str, str], Interval] = {}
+        self.reallocations: List[Tuple[str, str, int]] = []  # (base, filename, line) of a repeated `base = freemem`
+        self._regions: Dict[str, list] = {}
+        self._current: Optional[str] = None
+        self._followed: Set[str] = set()
+        for section in SECTION_NAMES:
+            for block in analysis.entries.get(section, []):
+                self._walk(block, section, 0)
+        self.regions: List[MemoryRegion] = [MemoryRegion(name, *fields) for name, fields in self._regions.items()]
+        self.end = self.env.get(('', pointer), (0.0, 0.0))[1]
+
+    def _key(self, block: FlowBlock, name: str) -> Tuple[str, str]:
+        return (block.name, name) if self.analysis._scoped(block, name) else ('', name)
+
+    def _evaluate(self, block: FlowBlock, first: int, last: int, conditions=()) -> Interval:
+        return self.ranges.expression(block, first, last, conditions,
+                                      lookup=lambda name: self.env.get(self._key(block, name)))[0]
+
+    def _runs(self, block: FlowBlock, conditions) -> Optional[bool]:
+        """True if code under `conditions` runs on the walk, False if it cannot, None if it may"""
+        result = True
+        for first, last, holds in conditions:
+            low, high = self._evaluate(block, first, last)
+            zero = low == high == 0
+            nonzero = not (low <= 0 <= high)
+            if (zero if holds else nonzero):
+                return False
+            if not (nonzero if holds else zero):
+                result = None
+        return result
+
+    def _walk(self, block: FlowBlock, section: str, depth: int):
+        events = sorted([(assignment.span[1], 1, assignment) for assignment in block.assignments] +
+                        [(call.span[0], 0, call) for call in block.calls], key=lambda event: event[:2])
+        tokens, partner = self.ranges.token_tables(block.filename)
+        for _, is_assignment, event in events:
+            runs = self._runs(block, event.conditions)
+            if runs is False:
+                continue
+            if is_assignment:
+                self._assign(block, section, event, runs)
+                continue
+            callee = self.analysis.functions.get(event.name)
+            if callee is None or event.name in self._followed or depth >= self.MAX_INLINE_DEPTH:
+                continue
+            self._followed.add(event.name)
+            for param, (first, last) in zip(callee.params, _split_arguments(tokens, partner, event.span[0] + 1)):
+                self.env[(callee.name, param)] = self._evaluate(block, first, last, event.conditions)
+            self._walk(callee, section, depth + 1)
+
+    def _assign(self, block: FlowBlock, section: str, assignment: Assignment, runs: Optional[bool]):
+        key = self._key(block, assignment.target)
+        previous = self.env.get(key)
+        if key == ('', self.pointer):
+            value = self._evaluate(block, *assignment.span, assignment.conditions)
+            current = previous or (0.0, 0.0)
+            if assignment.operator == '+=':
+                value = _arithmetic('+', current, value)
+                if self._current is not None:
+                    self._regions[self._current][1] += value[1] - current[1]
+            elif assignment.operator != '=':
+                value = _UNBOUNDED
+            else:
+                self._current = None
+            self.env[key] = value if runs or previous is None else _hull(previous, value)
+            return
+        if assignment.operator == '=' and assignment.text == self.pointer and key[0] == '':
+            if assignment.target in self._regions:
+                self.reallocations.append((assignment.target, block.filename, assignment.line))
+                self._current = None
+            else:
+                start = self.env.get(('', self.pointer), (0.0, 0.0))[1]
+                self._regions[assignment.target] = [start, 0.0, block.filename, assignment.line, block.name, section]
+                self._current = assignment.target
+            self.env[key] = self.env.get(('', self.pointer), (0.0, 0.0))
+            return
+        
+        if assignment.weight != 1.0 and assignment.operator != '=':
+            self.env[key] = self._loop(block, assignment, previous)
+            return
+        value = self._evaluate(block, *assignment.span, assignment.conditions)
+        if assignment.operator != '=':
+            current = previous or self.ranges.variable(block, assignment.target)[0]
+            operator = assignment.operator[0]
+            value = _arithmetic(operator, current, value) if operator in '+-*/' else _UNBOUNDED
+        self.env[key] = value if runs or previous is None else _hull(previous, value)
+
+    def _loop(self, block: FlowBlock, assignment: Assignment, previous: Optional[Interval]) -> Interval:
+        """Bound `x += c` or `x *= c` inside a loop: run it out against its `x < n` guard if there is one"""
+        start = previous or self.ranges.variable(block, assignment.target)[0]
+        step = self._evaluate(block, *assignment.span, assignment.conditions)[1]
+        for variable, operator, span in self.ranges.constraints(block, assignment.conditions):
+            if variable != assignment.target or operator not in ('<', '<='):
+                continue
+            limit = self._evaluate(block, *span)[1]
+            grows = (step > 0) if assignment.operator == '+=' else (step > 1) if assignment.operator == '*=' else False
+            if not grows or not math.isfinite(limit) or not math.isfinite(start[1]):
+                break
+            value = start[1]
+            for _ in range(self.MAX_LOOP_STEPS):
+                if not (value < limit if operator == '<' else value <= limit):
+                    return start[0], max(value, start[1])
+                value = value + step if assignment.operator == '+=' else value * step
+            break
+        return self.ranges.variable(block, assignment.target)[0]
+
+
+# Drawing built-ins counted per @gfx frame; the other gfx_ calls (gfx_set, gfx_setfont, ...) set state or measure
+GFX_DRAW_PRIMITIVES = {'gfx_line', 'gfx_lineto', 'gfx_rect', 'gfx_rectto', 'gfx_roundrect', 'gfx_circle',
+                       'gfx_triangle', 'gfx_arc', 'gfx_drawstr', 'gfx_drawchar', 'gfx_drawnumber', 'gfx_printf',
+                       'gfx_setpixel', 'gfx_blit', 'gfx_blitext', 'gfx_deltablit', 'gfx_transformblit',
+                       'gfx_gradrect', 'gfx_muladdrect', 'gfx_blurto'}
+# UI curve cache (04_UI_Rendering/06_graph_cache.jsfx-inc): code that calls one of these draws the curve from it
+CURVE_CACHE_FUNCTIONS = ('calculate_curve_hash', 'generate_curve_cache', 'cache_curve_if_needed')
+
+
+class LoopBound(NamedTuple):
+    filename: str
+    line: int
+    function: str                  # enclosing function, or the section for top-level code
+    kind: str                      # 'loop' or 'while'
+    text: str                      # loop()'s count or the while condition, as written
+    iterations: Optional[float]    # upper bound of the trip count; None if it could not be bounded
+
+
+class LoopBounds:
+    """Upper bounds on the trip counts of one root's loops, from ValueRanges
+
+    loop(n, ...) runs at most the upper bound of n times. `while (i < n)
+    (...)` whose body steps `i += c` outside any branch runs at most
+    (n - i0) / c times, i0 being the value `i` was last given before the
+    loop; with several such comparisons joined by &&, the smallest bound
+    wins. Everything else (the while (body) form, counters only stepped in a
+    branch, unbounded limits) is unbounded and keeps the default trip count.
+    """
+
+    def __init__(self, analysis: InvarianceAnalysis, ranges: ValueRanges, lines: Callable[[str], List[str]]):
+        self.analysis = analysis
+        self.ranges = ranges
+        self.lines = lines
+        self.loops: Dict[Tuple[str, int], LoopBound] = {}  # (filename, keyword token index) -> bound
+
+    def _block(self, filename: str, name: str) -> Optional[FlowBlock]:
+        block = self.analysis.functions.get(name)
+        if block is not None and block.filename == filename:
+            return block
+        for block in self.analysis.entries.get(name, ()):
+            if block.filename == filename:
+                return block
+        return None
+
+    def trips(self, filename: str, name: str, index: int) -> Optional[float]:
+        """Return the trip count bound of the loop whose keyword is token `index` of a block, or None"""
+        key = (filename, index)
+        bound = self.loops.get(key)
+        if bound is None:
+            tokens, partner = self.ranges.token_tables(filename)
+            close = partner[index + 1]
+            block = self._block(filename, name)
+            kind = tokens[index].value
+            iterations = None
+            if kind == 'loop':
+                arguments = _split_arguments(tokens, partner, index + 1)
+                span = arguments[0] if arguments else (index + 1, index + 1)
+                if block is not None and arguments:
+                    high = self.ranges.expression(block, *span, flow_sensitive=True)[0][1]
+                    iterations = float(max(math.floor(high), 0)) if math.isfinite(high) else None
+            else:
+                span = (index + 2, close - 1)
+                if block is not None and close + 1 < len(tokens) and tokens[close + 1].value == '(':
+                    body = (close + 2, partner[close + 1] - 1)
+                    best = min((self._counted(block, variable, operator, limit, index, body) for variable, operator, limit
+                                in condition_constraints(tokens, partner, *span, True)), default=math.inf)
+                    iterations = best if math.isfinite(best) else None
+            text = source_text(self.lines(filename), tokens, *span) if span[1] >= span[0] else ''
+            bound = LoopBound(filename, tokens[index].line, name, kind, text, iterations)
+            self.loops[key] = bound
+        return bound.iterations
+
+    def _counted(self, block: FlowBlock, variable: str, operator: str, limit: Tuple[int, int], index: int,
+                 body: Tuple[int, int]) -> float:
+        """Trips of `while (variable <operator> limit) (body)` with the counter stepped in the body, else inf"""
+        if operator not in ('<', '<=', '>', '>='):
+            return math.inf
+        rising = operator in ('<', '<=')
+        steps = [assignment for assignment in block.assignments
+                 if assignment.target == variable and body[0] <= assignment.span[0] <= body[1]]
+        if not steps or any(assignment.operator != ('+=' if rising else '-=') for assignment in steps):
+            return math.inf
+        # Only a step outside the body's own branches and inner loops runs on every pass
+        certain = [assignment for assignment in steps
+                   if not any(first >= body[0] for first, _, _ in assignment.conditions)]
+        if not certain:
+            return math.inf
+        step = min(self.ranges.expression(block, *assignment.span, assignment.conditions, flow_sensitive=True)[0][0]
+                   for assignment in certain)
+        if not step > 0:
+            return math.inf
+        before = [assignment for assignment in block.assignments
+                  if assignment.target == variable and assignment.operator == '=' and assignment.span[1] < index]
+        if before:
+            last = max(before, key=lambda assignment: assignment.span[1])
+            start = self.ranges.expression(block, *last.span, last.conditions, flow_sensitive=True)[0]
+        else:
+            start = self.ranges.variable(block, variable)[0]
+        end = self.ranges.expression(block, *limit, flow_sensitive=True)[0]
+        distance = end[1] - start[0] if rising else start[1] - end[0]
+        if not math.isfinite(distance):
+            return math.inf
+        trips = math.floor(distance / step) + 1 if operator in ('<=', '>=') else math.ceil(distance / step)
+        return float(max(trips, 0))
+
+
+# Dirty-flag caches: each invalidator sets flags (`flag = 1`); a builder clears its flag (`flag = 0`) once rebuilt
+CACHE_INVALIDATORS = ('invalidate_curve_cache', 'invalidate_curve_segments_db', 'invalidate_compression_lut',
+                      'invalidate_compression_threshold')
+# Built-ins that load into their argument: {function: argument position}, for memory (file_var(h, buf[i]))
+BUILTIN_MEMORY_WRITES = {'file_var': 1, 'file_mem': 1}
+
+
+class DirtyFlagCache(NamedTuple):
+    flag: str
+    invalidators: List[str]  # CACHE_INVALIDATORS functions that set the flag
+    builders: List[str]      # functions that clear it
+    inputs: List[str]        # globals and memory bases the builders (and everything they call) read but never write
+    sliders: List[str]       # the inputs a slider move changes
+
+
+def _enclosing_argument(tokens: List[Token], partner: List[int], index: int) -> Optional[Tuple[str, int]]:
+    """Return (function, argument position) if token `index` starts an argument of a call, else None"""
+    position = 0
+    j = index - 1
+    while j >= 0:
+        kind, value, _, _ = tokens[j]
+        if kind == TOKEN_OP:
+            if (value == ')' or value == ']') and partner[j] != -1:
+                j = partner[j] - 1
+                continue
+            if value == ',':
+                position += 1
+            elif value == '(':
+                return (tokens[j - 1].value, position) if j > 0 and tokens[j - 1].kind == TOKEN_IDENT else None
+            elif value in (';', '[', '?', ':') or value in ASSIGNMENT_OPERATORS:
+                return None
+        j -= 1
+    return None
+
+
+class CacheInvalidation:
+    """Checks that code changing a dirty-flag cache's inputs invalidates it, and only then
+
+    A cache is a flag set by one of CACHE_INVALIDATORS. Its inputs are what
+    its builders read, callees included, minus what they write themselves
+    (outputs, temporaries and nested caches). A writer of an input (a
+    function or section assigning it, file_var() loading it, or @slider for
+    slider variables) is covered if its code sets the flag, or if every
+    caller's code does; @init writers are covered by any @init code setting
+    it. Invalidations are redundant when a flag is set twice in one block,
+    when nothing in the invalidating code (or its direct callers) writes an
+    input, when no builder ever clears the flag, or when they run on every
+    @slider, @block, @sample or @gfx run outside any condition.
+    """
+
+    def __init__(self, analysis: InvarianceAnalysis, sliders: Dict[str, SliderDefinition],
+                 token_tables: Callable[[str], Tuple[List[Token], List[int]]], builtin_functions: Set[str]):
+        self.analysis = analysis
+        self.sliders = sliders
+        self.token_tables = token_tables
+        self.builtin_functions = builtin_functions
+        self.blocks: List[FlowBlock] = list(analysis.functions.values()) + [
+            block for section in SECTION_NAMES for block in analysis.entries.get(section, [])]
+        self.callers: Dict[str, List[FlowBlock]] = defaultdict(list)
+        for block in self.blocks:
+            for name in block.callees:
+                if name in analysis.functions:
+                    self.callers[name].append(block)
+        self._closures: Dict[Tuple[str, str], List[FlowBlock]] = {}
+        self._memory: Dict[Tuple[str, str], Tuple[Set[str], Set[str]]] = {}
+        
+        flags = {}
+        for name in CACHE_INVALIDATORS:
+            block = analysis.functions.get(name)
+            if block is not None:
+                for flag in sorted(self.sets(block)):
+                    flags.setdefault(flag, []).append(name)
+        self.caches: List[DirtyFlagCache] = []
+        for flag, invalidators in flags.items():
+            builders = sorted(name for name, block in analysis.functions.items() if name not in CACHE_INVALIDATORS and
+                              any(assignment.target == flag and assignment.operator == '=' and assignment.text == '0'
+                                  for assignment in block.assignments))
+            reads, writes = set(), set()
+            for name in builders:
+                for block in self.closure(analysis.functions[name]):
+                    memory_reads, memory_writes = self.memory(block)
+                    reads |= {variable for variable in block.reads if not self.analysis._scoped(block, variable)}
+                    reads |= memory_reads
+                    writes |= self.global_writes(block) | memory_writes
+            inputs = sorted(variable for variable in reads - writes - set(flags)
+                            if variable not in builtin_functions and not variable.startswith('$'))
+            self.caches.append(DirtyFlagCache(flag, invalidators, builders, inputs,
+                                              [variable for variable in inputs if variable in sliders]))
+        self.pure = {name for name, block in analysis.functions.items()
+                     if all(not self.global_writes(member) - set(flags) and not self.memory(member)[1]
+                            for member in self.closure(block)) and
+                     any(self.sets(member) & set(flags) for member in self.closure(block))}
+        self.issues: List[Tuple[FlowBlock, int, int, str]] = []  # (block, line, col, message)
+        self.stale: Dict[Tuple[str, str], list] = {}  # writer -> [block, line, written inputs, uninvalidated caches]
+        for cache in self.caches:
+            self._check(cache)
+        for block, line, written, caches in self.stale.values():
+            verb = "changes" if block.name == '@slider' else "writes"
+            self.issues.append((block, line, 0, f"{block.name} {verb} {', '.join(sorted(written))} without invalidating "
+                                                f"{', '.join(cache.flag for cache in caches)} "
+                                                f"({', '.join(sorted({f'{name}()' for cache in caches for name in cache.invalidators}))}), "
+                                                f"so {', '.join(f'{name}()' for cache in caches for name in cache.builders)} "
+                                                f"keep serving the old result"))
+
+    def closure(self, block: FlowBlock) -> List[FlowBlock]:
+        """A block and every user function it can reach"""
+        key = (block.filename, block.name)
+        if key not in self._closures:
+            members = [block]
+            seen = {block.name}
+            stack = list(block.callees)
+            while stack:
+                name = stack.pop()
+                callee = self.analysis.functions.get(name)
+                if callee is None or name in seen:
+                    continue
+                seen.add(name)
+                members.append(callee)
+                stack.extend(callee.callees)
+            self._closures[key] = members
+        return self._closures[key]
+
+    @staticmethod
+    def sets(block: FlowBlock) -> Set[str]:
+        """Variables a block sets to 1 (`flag = 1`)"""
+        return {assignment.target for assignment in block.assignments
+                if assignment.operator == '=' and assignment.text == '1'}
+
+    def global_writes(self, block: FlowBlock) -> Set[str]:
+        return {variable for variable in block.writes | block.builtin_writes if not self.analysis._scoped(block, variable)}
+
+    def memory(self, block: FlowBlock) -> Tuple[Set[str], Set[str]]:
+        """Return (bases read, bases written) by a block's `base[index]` accesses"""
+        key = (block.filename, block.name)
+        if key not in self._memory:
+            tokens, partner = self.token_tables(block.filename)
+            reads, writes = set(), set()
+            for access in block.memory:
+                if self.analysis._scoped(block, access.base):
+                    continue
+                close = access.span[1] + 1
+                written = close + 1 < len(tokens) and tokens[close + 1].value in ASSIGNMENT_OPERATORS
+                argument = _enclosing_argument(tokens, partner, access.span[0] - 2)
+                if written or (argument is not None and BUILTIN_MEMORY_WRITES.get(argument[0]) == argument[1]):
+                    writes.add(access.base)
+                else:
+                    reads.add(access.base)
+            self._memory[key] = (reads, writes)
+        return self._memory[key]
+
+    def _sets_flag(self, block: FlowBlock, flag: str) -> bool:
+        return any(flag in self.sets(member) for member in self.closure(block))
+
+    def _covered(self, block: FlowBlock, flag: str, active: Set[str]) -> bool:
+        if block.section == '@init' and block.name == '@init':
+            return any(self._sets_flag(entry, flag) for entry in self.analysis.entries.get('@init', []))
+        if self._sets_flag(block, flag):
+            return True
+        if block.name not in self.analysis.functions or block.name in active or not self.callers[block.name]:
+            return False
+        active.add(block.name)
+        try:
+            return all(self._covered(caller, flag, active) for caller in self.callers[block.name])
+        finally:
+            active.discard(block.name)
+
+    def _check(self, cache: DirtyFlagCache):
+        inputs = set(cache.inputs)
+        builder_code = {member.name for name in cache.builders
+                        for member in self.closure(self.analysis.functions[name])}
+        if not cache.builders:
+            for name in cache.invalidators:
+                block = self.analysis.functions[name]
+                self.issues.append((block, block.line, 0, f"{name}() sets {cache.flag} but no function clears it "
+                                                          f"({cache.flag} = 0), so no cache rebuilds from it"))
+            return
+        
+        # Writers of the inputs that never invalidate (functions no section calls are left to the unused check)
+        reached = self.analysis.graph.function_sections
+        for block in self.blocks:
+            if block.name in builder_code or block.name in self.pure:
+                continue
+            if block.name in self.analysis.functions and not reached.get(block.name):
+                continue
+            written = (self.global_writes(block) | self.memory(block)[1]) & inputs
+            if block.name == '@slider':
+                written |= set(cache.sliders)
+            if not written or self._covered(block, cache.flag, set()):
+                continue
+            line = min((assignment.line for assignment in block.assignments if assignment.target in written),
+                       default=block.line)
+            entry = self.stale.setdefault((block.filename, block.name), [block, line, set(), []])
+            entry[2] |= written
+            entry[3].append(cache)
+        
+        # Redundant invalidations
+        per_run = set()
+        for section in ('@slider', '@block', '@sample', '@gfx'):
+            if section in self.analysis.graph.entries:
+                per_run |= {(section, name) for name in self.analysis.graph.executions(section, COST_UNCONDITIONAL)}
+                per_run |= {(section, section)}
+        for block in self.blocks:
+            if block.name in builder_code:
+                continue
+            sites = [(call.line, call.col, f"{call.name}()", call.conditions) for call in block.calls
+                     if call.name in self.pure and self._sets_flag(self.analysis.functions[call.name], cache.flag)]
+            sites += [(assignment.line, assignment.col, f"{cache.flag} = 1", assignment.conditions)
+                      for assignment in block.assignments
+                      if assignment.target == cache.flag and assignment.operator == '=' and assignment.text == '1']
+            if not sites:
+                continue
+            # Sites in opposite branches of one conditional never both run
+            repeated = [site for k, site in enumerate(sites) if any(
+                not any((first, last, not holds) in other[3] for first, last, holds in site[3])
+                for other in sites[:k])]
+            if repeated:
+                self.issues.append((block, repeated[0][0], repeated[0][1],
+                                    f"{block.name} invalidates {cache.flag} {len(repeated) + 1} times on one path "
+                                    f"({', '.join(site for _, _, site, _ in sites)}); once is enough"))
+            if block.name in self.pure:
+                continue
+            if block.section != '@init' and block.name != '@init':
+                writers = [block] + (self.callers[block.name] if block.name in self.analysis.functions else [])
+                if not any((self.global_writes(member) | self.memory(member)[1]) & inputs or
+                           (member.name == '@slider' and cache.sliders)
+                           for writer in writers for member in self.closure(writer)):
+                    self.issues.append((block, sites[0][0], sites[0][1],
+                                        f"{block.name} invalidates {cache.flag} via {sites[0][2]} without changing "
+                                        f"any of its inputs; {', '.join(cache.builders)}() rebuilds for nothing"))
+            for section in ('@slider', '@block', '@sample', '@gfx'):
+                if (section, block.name) in per_run and any(not conditions for _, _, _, conditions in sites):
+                    line, col, site, _ = next(site for site in sites if not site[3])
+                    self.issues.append((block, line, col,
+                                        f"{site} in {block.name} runs on every {section} run outside any condition, so "
+                                        f"{', '.join(cache.builders)}() rebuilds every time; invalidate only when "
+                                        f"{', '.join(cache.inputs[:4])}{', ...' if len(cache.inputs) > 4 else ''} "
+                                        f"{'changes' if len(cache.inputs) == 1 else 'change'}"))
+                    break
+
+
+
+# Constants at or below this size, added to recursive state, are taken as a denormal DC offset (1e-30, 1e-18, ...)
+DENORMAL_OFFSET_LIMIT = 1e-9
+
+
+class RecursiveState(NamedTuple):
+    """A global that one run of a block feeds back into itself through a multiply (`s = a*s + b*x`)"""
+    variable: str
+    filename: str
+    line: int
+    col: int
+    function: str
+    text: str                 # the assignment, as written
+    via: List[str]            # temporaries the state passes through before it is assigned back
+    protection: Optional[str]  # 'offset', 'flush' or None
+    detail: str               # where the protection is, or why there is none
+
+
+class DenormalRisk:
+    """Finds the recursive state @sample code decays towards zero, and whether anything keeps it out of denormals
+
+    Within each @sample-reachable block, assignments are followed in order:
+    a variable carries the state whose previous value reaches it through a
+    multiply or a division by a coefficient, directly or through
+    temporaries (a biquad's y1 through its output). A global (or instance
+    variable) that carries itself is recursive state. It is protected by an
+    offset when a constant no larger than DENORMAL_OFFSET_LIMIT is added
+    along the way (`+ 1e-30`, DENORMAL_THRESHOLD), or by a flush when
+    @sample or @block code sets it to 0 under a condition that tests it,
+    directly or through a variable computed from it, or assigns it from a
+    comparison with it (`s = abs(s) < t ? 0 : s`).
+    """
+
+    def __init__(self, analysis: InvarianceAnalysis, ranges: ValueRanges,
+                 token_tables: Callable[[str], Tuple[List[Token], List[int]]], lines: Callable[[str], List[str]],
+                 builtin_functions: Set[str]):
+        self.analysis = analysis
+        self.ranges = ranges
+        self.token_tables = token_tables
+        self.lines = lines
+        self.builtin_functions = builtin_functions
+        graph = analysis.graph
+        blocks = {section: [analysis.functions[name] for name in sorted(graph.reachable.get(section, ()))
+                            if name in analysis.functions] + analysis.entries.get(section, [])
+                  for section in ('@sample', '@block')}
+        flushes = self._flushes(blocks['@sample'] + blocks['@block'])
+        self.states: List[RecursiveState] = []
+        for block in blocks['@sample']:
+            for variable, assignment, via, offset in self._recursive(block):
+                tokens, _ = self.token_tables(block.filename)
+                text = f"{assignment.target} {assignment.operator} " + source_text(
+                    self.lines(block.filename), tokens, *assignment.span)
+                if offset:
+                    protection, detail = 'offset', offset
+                elif variable in flushes:
+                    protection, detail = 'flush', flushes[variable]
+                else:
+                    protection, detail = None, ''
+                self.states.append(RecursiveState(variable, block.filename, assignment.line, assignment.col,
+                                                  block.name, text, via, protection, detail))
+
+    def _multiplied(self, tokens: List[Token], partner: List[int], index: int, first: int, last: int) -> bool:
+        """Whether the operand at `index` is scaled: a factor of `*`, or the numerator of `/`"""
+        low = high = index
+        while True:
+            if (low > first and tokens[low - 1].value == '*') or (high < last and tokens[high + 1].value in ('*', '/')):
+                return True
+            depth = 0
+            k = low - 1
+            while k >= first and not (tokens[k].value == '(' and depth == 0):
+                depth += {')': 1, '(': -1}.get(tokens[k].value, 0)
+                k -= 1
+            # Arguments of a call (abs(s), exp(s)) are not a linear factor
+            if k < first or (k > first and tokens[k - 1].kind == TOKEN_IDENT) or not first <= partner[k] <= last:
+                return False
+            low, high = k, partner[k]
+
+    def _tiny(self, block: FlowBlock, tokens: List[Token], index: int, first: int, last: int) -> bool:
+        """Whether the token at `index` is a tiny constant added to or subtracted from the expression"""
+        additive = ((index > first and tokens[index - 1].value in ('+', '-')) or
+                    (index < last and tokens[index + 1].value in ('+', '-')))
+        if not additive:
+            return False
+        token = tokens[index]
+        if token.kind == TOKEN_NUMBER:
+            try:
+                value = float(token.value)
+            except ValueError:
+                return False
+            return 0 < value <= DENORMAL_OFFSET_LIMIT
+        low, high = self.ranges.variable(block, token.value)[0]
+        return low == high and 0 < abs(low) <= DENORMAL_OFFSET_LIMIT
+
+    def _recursive(self, block: FlowBlock) -> List[Tuple[str, Assignment, List[str], str]]:
+        """Return (variable, first assignment, temporaries, offset found) for each recursive state variable"""
+        tokens, partner = self.token_tables(block.filename)
+        reached: Dict[str, Set[str]] = {}   # variable -> state whose previous value it holds
+        carried: Dict[str, Set[str]] = {}   # the part of `reached` that passed through a multiply
+        offsets: Dict[str, str] = {}        # variable -> the tiny constant added on its way
+        found: Dict[str, Tuple[Assignment, List[str], str]] = {}
+        for assignment in sorted(block.assignments, key=lambda assignment: assignment.span):
+            first, last = assignment.span
+            plain, scaled = set(), set()
+            offset = ''
+            operands = [(i, tokens[i].value) for i in range(first, last + 1) if tokens[i].kind == TOKEN_IDENT and
+                        not (i + 1 < len(tokens) and tokens[i + 1].value == '(')]
+            if assignment.operator != '=':
+                operands.append((None, assignment.target))
+            for i, name in operands:
+                source = reached.get(name, {name})
+                plain |= source
+                scaled |= carried.get(name, set())
+                if i is None and assignment.operator in ('*=', '/='):
+                    scaled |= source
+                elif i is not None and self._multiplied(tokens, partner, i, first, last):
+                    scaled |= source
+                offset = offset or offsets.get(name, '')
+            for i in range(first, last + 1):
+                if not offset and tokens[i].kind in (TOKEN_NUMBER, TOKEN_IDENT) and self._tiny(block, tokens, i,
+                                                                                                 first, last):
+                    offset = f"{tokens[i].value} ({block.filename}:{tokens[i].line})"
+            target = assignment.target
+            if (target in scaled and not self.analysis._scoped(block, target) and
+                    target not in SAMPLE_VARYING_VARIABLES and target not in found):
+                via = sorted({name for _, name in operands if name != target and target in carried.get(name, ())})
+                found[target] = (assignment, via, offset)
+            elif target in found and not offset:
+                found[target] = found[target][:2] + ('',)  # one unprotected path is enough
+            reached[target], carried[target], offsets[target] = plain, scaled, offset
+        return [(name, *found[name]) for name in found]
+
+    def _flushes(self, blocks: List[FlowBlock]) -> Dict[str, str]:
+        """Return {variable: location} for every variable @sample or @block code flushes to 0 after testing it"""
+        flushes = {}
+        for block in blocks:
+            tokens, _ = self.token_tables(block.filename)
+            sources = defaultdict(set)
+            for assignment in block.assignments:
+                sources[assignment.target] |= assignment.value.reads
+            for assignment in block.assignments:
+                target = assignment.target
+                where = f"{block.name} ({block.filename}:{assignment.line})"
+                if assignment.operator == '=' and assignment.text.strip() in ('0', '0.0'):
+                    tested = {tokens[i].value for first, last, _ in assignment.conditions
+                              for i in range(first, last + 1) if tokens[i].kind == TOKEN_IDENT}
+                    if target in tested or any(target in sources[name] for name in tested):
+                        flushes.setdefault(target, where)
+                elif target in assignment.value.reads and any(
+                        tokens[i].value in ('<', '<=', '>', '>=') for i in range(assignment.span[0], assignment.span[1] + 1)):
+                    flushes.setdefault(target, where)
+        return flushes
+
+
+# Static performance metrics compared by --compare (see performance_metrics), in report order
+REGRESSION_METRICS = {
+    'sample_calls': 'user function calls per sample',
+    'sample_cost': 'estimated cost per sample',
+    'transcendentals': 'exp/log/pow/tanh per sample',
+    'gfx_primitives': 'draw primitives per @gfx frame',
+    'memory_slots': 'memory footprint (slots)',
+    'code_tokens': 'expanded code size (tokens)',
+}
+
+
+_COMMENT_OR_STRING = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\\n])*\'|(//[^\n]*)|(/\*.*?(?:\*/|\Z))', re.DOTALL)
+
+
+def strip_comments(code: str) -> str:
+    """Remove // and /* */ comments, trailing whitespace and blank lines from EEL2 code
+
+    String and $'c' literals are left untouched; a block comment becomes a
+    space so the tokens around it stay apart.
+    """
+    def replace(match):
+        if match.group(1) is not None:
+            return ''
+        if match.group(2) is not None:
+            newlines = match.group(2).count('\n')
+            return '\n' * newlines if newlines else ' '
+        return match.group(0)
+    
+    stripped = _COMMENT_OR_STRING.sub(replace, code)
+    return ''.join(line.rstrip() + '\n' for line in stripped.split('\n') if line.strip())
+
+
+def _line_offsets(content: str) -> List[int]:
+    """Return the character offset of the start of each line (index 0 is line 1)"""
+    offsets = [0]
+    for match in re.finditer('\n', content):
+        offsets.append(match.end())
+    return offsets
+
+
+def _widen_to_lines(content: str, start: int, end: int) -> Tuple[int, int]:
+    """Grow a cut to whole lines when only whitespace (or a trailing comment) shares its lines
+
+    Comment-only lines directly above the cut are taken with it, so a
+    function's heading comment goes with the function.
+    """
+    line_start = content.rfind('\n', 0, start) + 1
+    if content[line_start:start].strip():
+        return start, end
+    line_end = content.find('\n', end)
+    line_end = len(content) if line_end == -1 else line_end + 1
+    rest = content[end:line_end].strip()
+    if rest and not rest.startswith('//'):
+        return start, end
+    start = line_start
+    while start > 0:
+        previous = content.rfind('\n', 0, start - 1) + 1
+        if not content[previous:start].strip().startswith('//'):
+            break
+        start = previous
+    return start, line_end
+
+
+def _cut_ranges(content: str, start: int, end: int, cuts: List[Tuple[int, int]]) -> str:
+    """Return content[start:end] without the parts covered by `cuts` ((start, end) offsets)"""
+    pieces = []
+    position = start
+    for cut_start, cut_end in sorted(cuts):
+        if cut_end <= position or cut_start >= end:
+            continue
+        pieces.append(content[position:max(position, cut_start)])
+        position = max(position, min(cut_end, end))
+    pieces.append(content[position:end])
+    return ''.join(pieces)
+
+
+def _merge_orders(orders) -> List[str]:
+    """Concatenate processing orders, keeping the first occurrence of each module"""
+    merged = {}
+    for order in orders:
+        for filename in order:
+            merged.setdefault(filename, None)
+    return list(merged)
+
+
+def load_cached_facts(cache_dir: Path, digest: str) -> Optional[ModuleFacts]:
+    """Return the facts cached under a content digest, or None if absent or stale"""
+    try:
+        with open(Path(cache_dir) / f"{digest}.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != ANALYZER_VERSION:
+        return None
+    return ModuleFacts(
+        data['imports'],
+        [Declaration(*item) for item in data['declarations']],
+        [CallSite(*item) for item in data['calls']],
+    )
+
+
+def store_cached_facts(cache_dir: Path, digest: str, facts: ModuleFacts):
+    """Write facts to the analysis cache under a content digest"""
+    data = {
+        'version': ANALYZER_VERSION,
+        'imports': facts.imports,
+        'declarations': [list(item) for item in facts.declarations],
+        'calls': [list(item) for item in facts.calls],
+    }
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so concurrent runs never read a partial entry
+    path = cache_dir / f"{digest}.json"
+    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp_path, path)
+
+
+def _load_and_extract_module(work: Tuple[str, Optional[str], Set[str]]):
+    """Process-pool worker: read one file and return (content, digest, facts, cached, error, stats, seconds)
+
+    stats holds the worker's token and regex counters; seconds is the time spent
+    tokenizing and extracting facts (0 for a cache hit).
+    """
+    path, cache_dir, builtin_functions = work
+    stats = defaultdict(int)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        return None, None, None, False, str(e), {}, 0.0
+    
+    digest = content_digest(content)
+    if cache_dir is not None:
+        facts = load_cached_facts(cache_dir, digest)
+        if facts is not None:
+            return content, digest, facts, True, None, {}, 0.0
+    
+    start = time.perf_counter()
+    facts = extract_module_facts(tokenize_jsfx(content, stats), builtin_functions, stats)
+    seconds = time.perf_counter() - start
+    if cache_dir is not None:
+        try:
+            store_cached_facts(cache_dir, digest, facts)
+        except OSError:
+            pass
+    return content, digest, facts, False, None, dict(stats), seconds
 
 
 class JSFXFunctionAnalyzer:
-    def __init__(self, base_path: str):
+    def __init__(self, base_path: str, use_cache: bool = True, cache_dir: Optional[str] = None, verbose: bool = True,
+                 output: Optional[TextIO] = None, on_finding: Optional[Callable[['Finding'], None]] = None):
         self.base_path = Path(base_path)
+        self.verbose = verbose  # print per-module progress while parsing and analyzing
+        self.output = output if output is not None else sys.stdout  # progress, warnings and the text report
+        self.on_finding = on_finding  # called with each Finding as the checks produce it
+        self.use_cache = use_cache
+        self.cache_dir = Path(cache_dir) if cache_dir else self.base_path / CACHE_DIR_NAME
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.modules: Dict[str, str] = {}  # filename -> content
         self.imports: Dict[str, List[str]] = {}  # filename -> list of imported files
         self.function_declarations: Dict[str, Set[str]] = {}  # filename -> set of function names
         self.function_calls: Dict[str, Set[str]] = {}  # filename -> set of called functions
         self.function_parameters: Dict[str, Dict[str, int]] = {}  # filename -> {function_name: param_count}
         self.function_call_parameters: Dict[str, Dict[str, int]] = {}  # filename -> {function_name: param_count}
+        self.tokens: Dict[str, List[Token]] = {}  # filename -> token stream (see tokenize_jsfx)
+        self.paren_tables: Dict[str, Tuple[List[int], List[int]]] = {}  # filename -> match_parentheses() result
+        self.content_digests: Dict[str, str] = {}  # filename -> content_digest()
+        self.module_facts: Dict[str, ModuleFacts] = {}  # filename -> imports, declarations and call sites
+        self.read_errors: Dict[str, Finding] = {}  # filename -> why update_module() could not decode it
+        self._root_orders: Optional[Dict[str, List[str]]] = None  # memoized resolve_root_orders() result
+        self._processing_order: Optional[List[str]] = None  # memoized resolve_dependencies() result
+        self._symbol_index: Optional[SymbolIndex] = None  # memoized get_symbol_index() result
+        # filename -> extract_code_blocks() result, and root -> memoized get_section_call_graph()
+        self.code_blocks: Dict[str, Tuple[Dict[str, CodeBlock], Dict[str, CodeBlock]]] = {}
+        self.flow_blocks: Dict[str, Tuple[Dict[str, FlowBlock], Dict[str, FlowBlock]]] = {}  # extract_flow_blocks()
+        self.code_sizes: Dict[str, Tuple[Dict[str, CodeSize], Dict[str, CodeSize]]] = {}  # extract_code_sizes()
+        self._section_graphs: Dict[str, SectionCallGraph] = {}
+        self._invariance: Dict[str, InvarianceAnalysis] = {}  # root -> memoized get_invariance()
+        # Work counters (files, tokens, declarations, call_sites, regex_evaluations), read by PhaseProfiler
+        self.stats: Dict[str, int] = defaultdict(int)
+        self.module_parse_times: Dict[str, float] = {}  # filename -> seconds spent tokenizing and extracting facts
         self.builtin_functions = {
             # JSFX built-in mathematical functions
             'abs', 'min', 'max', 'floor', 'ceil', 'round', 'exp', 'log', 'log10', 'sqrt', 'sin', 'cos', 'tan',
@@ -134,512 +3204,1742 @@ class JSFXFunctionAnalyzer:
             'get_host_placement', 'get_host_numchan', 'get_pin_mapping'
         }
         
-    def load_modules(self):
-        """Load all JSFX module files from the base path (including subdirectories)"""
-        # Search recursively for all .jsfx-inc and .jsfx files
-        jsfx_files = list(self.base_path.rglob("*.jsfx-inc")) + list(self.base_path.glob("*.jsfx"))
+    def load_modules(self, jobs: int = 1):
+        """Load all JSFX module files from the base path (including subdirectories)
+
+        Modules whose content hash is found in the analysis cache get their facts
+        restored from disk and are not tokenized again. With jobs > 1, files are
+        read, tokenized and their facts extracted in a process pool.
+        """
+        if jobs > 1:
+            self._load_modules_parallel(jobs)
+            return
         
-        for file_path in jsfx_files:
+        for file_path in self.discover_files():
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
                     # Store with relative path from base_path
-                    relative_path = file_path.relative_to(self.base_path)
-                    self.modules[str(relative_path)] = content
-                    print(f"Loaded: {relative_path}")
+                    relative_path = str(file_path.relative_to(self.base_path))
+                    self.modules[relative_path] = content
+                    self.stats['files'] += 1
+                    self.content_digests[relative_path] = content_digest(content)
+                    cached = self._load_cached_facts(relative_path)
+                    if cached is not None:
+                        self.module_facts[relative_path] = cached
+                        self._log(f"Loaded: {relative_path} (cached)")
+                    else:
+                        self._log(f"Loaded: {relative_path}")
             except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+                self._print(f"Error loading {file_path}: {e}")
     
+    def _load_modules_parallel(self, jobs: int):
+        """Read and parse every module in a process pool, then merge the per-file facts"""
+        jsfx_files = self.discover_files()
+        cache_dir = str(self.cache_dir) if self.use_cache else None
+        work = [(str(path), cache_dir, self.builtin_functions) for path in jsfx_files]
+        chunksize = max(1, len(work) // (jobs * 4))
+        
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_load_and_extract_module, work, chunksize=chunksize))
+        
+        for file_path, (content, digest, facts, cached, error, stats, seconds) in zip(jsfx_files, results):
+            if error is not None:
+                self._print(f"Error loading {file_path}: {error}")
+                continue
+            relative_path = str(file_path.relative_to(self.base_path))
+            self.modules[relative_path] = content
+            self.content_digests[relative_path] = digest
+            self.module_facts[relative_path] = facts
+            self.stats['files'] += 1
+            for counter, count in stats.items():
+                self.stats[counter] += count
+            if not cached:
+                self.module_parse_times[relative_path] = seconds
+            if self.use_cache:
+                if cached:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            self._log(f"Loaded: {relative_path}{' (cached)' if cached else ''}")
+
+    def discover_files(self) -> List[Path]:
+        """Return every .jsfx-inc file under the base path and the .jsfx files at its top level"""
+        # Search recursively for all .jsfx-inc and .jsfx files
+        return list(self.base_path.rglob("*.jsfx-inc")) + list(self.base_path.glob("*.jsfx"))
+
+    def _print(self, *args):
+        print(*args, file=self.output)
+
+    def _log(self, message: str):
+        if self.verbose:
+            self._print(message)
+
+    def _load_cached_facts(self, filename: str) -> Optional[ModuleFacts]:
+        """Return the cached facts for a module, or None if absent or stale"""
+        if not self.use_cache:
+            return None
+        facts = load_cached_facts(self.cache_dir, self.content_digests[filename])
+        if facts is None:
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return facts
+
+    def _store_cached_facts(self, filename: str, facts: ModuleFacts):
+        """Write a module's facts to the analysis cache (failures are not fatal)"""
+        if not self.use_cache:
+            return
+        try:
+            store_cached_facts(self.cache_dir, self.content_digests[filename], facts)
+        except OSError as e:
+            self._print(f"Warning: could not write analysis cache for {filename}: {e}")
+
+    def get_tokens(self, filename: str) -> List[Token]:
+        """Return the token stream for a module, tokenizing it on first use"""
+        tokens = self.tokens.get(filename)
+        if tokens is None:
+            start = time.perf_counter()
+            tokens = tokenize_jsfx(self.modules[filename], self.stats)
+            self.tokens[filename] = tokens
+            self._add_parse_time(filename, time.perf_counter() - start)
+        return tokens
+
+    def get_paren_table(self, filename: str) -> Tuple[List[int], List[int]]:
+        """Return the (partner, argument_count) bracket table for a module, built once"""
+        table = self.paren_tables.get(filename)
+        if table is None:
+            table = match_parentheses(self.get_tokens(filename))
+            self.paren_tables[filename] = table
+        return table
+
+    def get_module_facts(self, filename: str) -> ModuleFacts:
+        """Return a module's imports, declarations and call sites (cached or freshly parsed)"""
+        facts = self.module_facts.get(filename)
+        if facts is None:
+            tokens = self.get_tokens(filename)
+            start = time.perf_counter()
+            facts = extract_module_facts(tokens, self.builtin_functions, self.stats)
+            self._add_parse_time(filename, time.perf_counter() - start)
+            self.module_facts[filename] = facts
+            if filename in self.content_digests:
+                self._store_cached_facts(filename, facts)
+        return facts
+
+    def _add_parse_time(self, filename: str, seconds: float):
+        self.module_parse_times[filename] = self.module_parse_times.get(filename, 0.0) + seconds
+
+    def _iter_declarations(self, filename: str) -> Iterator[Tuple[int, str, int]]:
+        """Yield (token_index, function_name, param_count) for each declaration in a module"""
+        partner, argument_count = self.get_paren_table(filename)
+        return iter_declarations(self.get_tokens(filename), partner, argument_count)
+
+    def _iter_call_sites(self, filename: str) -> Iterator[Tuple[int, str]]:
+        """Yield (token_index, function_name) for each user function call in a module"""
+        return iter_call_sites(self.get_tokens(filename), self.builtin_functions)
+
     def parse_imports(self):
         """Parse import statements from each module (handles folder paths)"""
-        # Updated pattern to handle folder paths like 01_Utils/02_math_utils.jsfx-inc
-        import_pattern = r'import\s+([a-zA-Z0-9_\-/\.]+\.jsfx-inc)'
-        
-        for filename, content in self.modules.items():
-            imports = re.findall(import_pattern, content, re.IGNORECASE)
+        for filename in self.modules:
+            imports = list(self.get_module_facts(filename).imports)
             self.imports[filename] = imports
             if imports:
-                print(f"{filename} imports: {imports}")
+                self._log(f"{filename} imports: {imports}")
     
     def parse_function_declarations(self):
         """Parse function declarations from each module"""
-        # Pattern to match function declarations
-        # Matches: function function_name(...) or function function_name(...) local(...) (...)
-        # Now handles multi-line local() declarations
-        function_pattern = r'function\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-        
-        for filename, content in self.modules.items():
+        for filename in self.modules:
             functions = set()
             function_params = {}
             
-            # Remove comments first
-            lines = []
-            for line in content.split('\n'):
-                # Skip comment-only lines
-                stripped = line.strip()
-                if stripped.startswith('//') or stripped.startswith('/*'):
-                    continue
-                # Remove inline comments
-                if '//' in line:
-                    line = line[:line.find('//')]
-                lines.append(line)
-            
-            # Join lines to handle multi-line declarations
-            clean_content = ' '.join(lines)
-            
-            # Find all function declarations
-            matches = re.finditer(function_pattern, clean_content)
-            for match in matches:
-                func_name = match.group(1)
-                # Verify this is actually a function declaration by checking what follows
-                # Look for the opening parenthesis of the function body
-                pos = match.end()
-                # Skip to find the function body opening (
-                # This could be after ) or after local(...) )
-                remaining = clean_content[pos:pos+500]  # Look ahead max 500 chars
-                
-                # Simple heuristic: if we see a pattern like ") (" or ") local(...) ("
-                # then it's a function declaration
-                if re.search(r'\)(?:\s+local\s*\([^)]*\))?\s*\(', remaining):
-                    functions.add(func_name)
-                    
-                    # Extract parameter count
-                    param_count = self._extract_parameter_count(clean_content, match.start())
-                    function_params[func_name] = param_count
+            declarations = self.get_module_facts(filename).declarations
+            self.stats['declarations'] += len(declarations)
+            for declaration in declarations:
+                functions.add(declaration.name)
+                function_params[declaration.name] = declaration.param_count
             
             self.function_declarations[filename] = functions
             self.function_parameters[filename] = function_params
             if functions:
-                print(f"{filename} declares: {sorted(functions)}")
+                self._log(f"{filename} declares: {sorted(functions)}")
                 if function_params:
-                    print(f"{filename} parameters: {function_params}")
-    
-    def _extract_parameter_count(self, content: str, func_start: int) -> int:
-        """Extract parameter count from function declaration"""
-        # Find the opening parenthesis after function name
-        paren_pos = content.find('(', func_start)
-        if paren_pos == -1:
-            return 0
-        
-        # Find the matching closing parenthesis
-        paren_count = 0
-        i = paren_pos
-        while i < len(content):
-            if content[i] == '(':
-                paren_count += 1
-            elif content[i] == ')':
-                paren_count -= 1
-                if paren_count == 0:
-                    # Found the closing parenthesis
-                    param_text = content[paren_pos + 1:i].strip()
-                    if not param_text:
-                        return 0
-                    
-                    # Count parameters by splitting on commas, but be careful with nested parentheses
-                    # Simple approach: count commas not inside parentheses
-                    comma_count = 0
-                    paren_depth = 0
-                    for char in param_text:
-                        if char == '(':
-                            paren_depth += 1
-                        elif char == ')':
-                            paren_depth -= 1
-                        elif char == ',' and paren_depth == 0:
-                            comma_count += 1
-                    
-                    return comma_count + 1  # Number of parameters = commas + 1
-            i += 1
-        
-        return 0  # Couldn't find matching parenthesis
-
-    def _extract_call_parameter_count_regex_only(self, content: str, line_num: int, call_start: int, func_name: str = None) -> int:
-        """Extract parameter count from function call using pure regex approach"""
-        import re
-        
-        lines = content.split('\n')
-        current_line = lines[line_num]
-        
-        # Find the opening parenthesis after function name
-        paren_pos = current_line.find('(', call_start)
-        if paren_pos == -1:
-            return 0
-        
-        # Get the text from the current line starting at the opening paren
-        text_from_paren = current_line[paren_pos:]
-        
-        # Get all lines from current line to end of file
-        remaining_lines = lines[line_num:]
-        remaining_text = ' '.join(remaining_lines)
-        
-        # Find the matching closing parenthesis by tracking depth
-        # Start from the opening parenthesis we found (after the function name)
-        paren_count = 0
-        start_pos = 0
-        end_pos = 0
-        
-        # Get all lines from current line to end of file
-        remaining_lines = lines[line_num:]
-        remaining_text = ' '.join(remaining_lines)
-        
-        # Find the opening parenthesis in the remaining text
-        # This should be the one after the function name
-        if func_name:
-            # We need to find the specific opening parenthesis for this function call
-            # by looking from the function name position
-            func_name_pos = remaining_text.find(func_name)
-            if func_name_pos == -1:
-                return 0
-            
-            # Find the opening parenthesis after this specific function name
-            paren_pos_in_remaining = remaining_text.find('(', func_name_pos)
-            if paren_pos_in_remaining == -1:
-                return 0
-        else:
-            # Fallback to original logic if no function name provided
-            paren_pos_in_remaining = remaining_text.find('(', 0)
-            if paren_pos_in_remaining == -1:
-                return 0
-        
-        # Start tracking from the opening parenthesis
-        for i in range(paren_pos_in_remaining, len(remaining_text)):
-            char = remaining_text[i]
-            if char == '(':
-                if paren_count == 0:
-                    start_pos = i
-                paren_count += 1
-            elif char == ')':
-                paren_count -= 1
-                if paren_count == 0:
-                    # Found the matching closing parenthesis
-                    end_pos = i
-                    break
-        
-        if paren_count != 0:
-            return 0  # Couldn't find matching parenthesis
-        
-        # Extract the parameters between the parentheses
-        param_text = remaining_text[start_pos + 1:end_pos]
-        
-        # Clean up the parameter text by removing extra whitespace
-        param_text = ' '.join(param_text.split())
-        
-        # Count commas not inside nested parentheses
-        comma_count = 0
-        paren_depth = 0
-        for char in param_text:
-            if char == '(':
-                paren_depth += 1
-            elif char == ')':
-                paren_depth -= 1
-            elif char == ',' and paren_depth == 0:
-                comma_count += 1
-        
-        # Number of parameters = commas + 1 (or 0 if empty)
-        return comma_count + 1 if param_text.strip() else 0
-
+                    self._log(f"{filename} parameters: {function_params}")
+    
     def parse_function_calls(self):
         """Parse function calls from each module"""
-        for filename, content in self.modules.items():
+        for filename in self.modules:
             calls = set()
             call_params = {}
-            lines = content.split('\n')
-            in_multiline_comment = False
-            
-            for line_num, line in enumerate(lines):
-                # Handle multiline comments
-                if '/*' in line:
-                    in_multiline_comment = True
-                    # If the comment closes on the same line, handle it
-                    if '*/' in line:
-                        in_multiline_comment = False
-                        # Remove the comment from the line
-                        comment_start = line.find('/*')
-                        comment_end = line.find('*/') + 2
-                        line = line[:comment_start] + line[comment_end:]
-                    else:
-                        continue
-                
-                if in_multiline_comment:
-                    if '*/' in line:
-                        in_multiline_comment = False
-                    continue
-                
-                # Skip comment lines
-                stripped_line = line.strip()
-                if stripped_line.startswith('//') or stripped_line.startswith('/*'):
-                    continue
-                
-                # Skip slider definition lines (e.g., slider1:attack_ms=10<0.1,100,0.1>-Attack (ms))
-                if re.match(r'^\s*slider\d+:', stripped_line, re.IGNORECASE):
-                    continue
-                
-                # Skip desc: lines
-                if re.match(r'^\s*desc:', stripped_line, re.IGNORECASE):
-                    continue
-                
-                # Remove inline comments (preserve code before //)
-                if '//' in line:
-                    line = line[:line.find('//')]
-                
-                # Skip if line is now empty after comment removal
-                if not line.strip():
-                    continue
-                
-                # Remove string literals to avoid false matches from format strings
-                # Remove double-quoted strings
-                line_no_strings = re.sub(r'"[^"]*"', '""', line)
-                
-                # Look for function calls - must be standalone function calls
-                # Pattern: word boundary, function name, optional whitespace, opening parenthesis
-                call_pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-                matches = re.finditer(call_pattern, line_no_strings)
-                
-                for match in matches:
-                    func_name = match.group(1)
-                    
-                    # Skip single-letter identifiers (likely false positives)
-                    if len(func_name) == 1:
-                        continue
-                    
-                    # Skip if it's a builtin function
-                    if func_name in self.builtin_functions:
-                        continue
-                    
-                    # Skip if it's a function declaration
-                    before_match = line_no_strings[:match.start()].strip()
-                    if before_match.endswith('function'):
-                        continue
-                    
-                    # Skip if it looks like a variable assignment or part of a larger expression
-                    # Check if there's an assignment operator before the function call
-                    before_context = line_no_strings[:match.start()].strip()
-                    if '=' in before_context and not before_context.endswith('='):
-                        # Check if this is an assignment to the function name
-                        assignment_pattern = r'\b' + re.escape(func_name) + r'\s*='
-                        if re.search(assignment_pattern, before_context):
-                            continue
-                    
-                    # Skip if it's part of a conditional or logical expression
-                    # Check for standalone operators before the function call (not compound operators like +=)
-                    if re.search(r'[+\-*/<>!&|]\s*$', before_context):
-                        continue
-                    
-                    # Skip if it's in a variable declaration context
-                    if re.search(r'\b(var|local|global)\s+\w*\s*$', before_context, re.IGNORECASE):
-                        continue
-                    
-                    # Skip string-like identifiers (JSFX string variables start with #)
-                    if func_name.startswith('#'):
-                        continue
-                    
-                    calls.add(func_name)
-                    
-                    # Extract parameter count for this call (handle multi-line)
-                    param_count = self._extract_call_parameter_count_regex_only(content, line_num, match.start(), func_name)
-                    call_params[func_name] = param_count
+            
+            module_calls = self.get_module_facts(filename).calls
+            self.stats['call_sites'] += len(module_calls)
+            for call in module_calls:
+                calls.add(call.name)
+                call_params[call.name] = call.arg_count
             
             self.function_calls[filename] = calls
             self.function_call_parameters[filename] = call_params
             if calls:
-                print(f"{filename} calls: {sorted(calls)}")
+                self._log(f"{filename} calls: {sorted(calls)}")
                 if call_params:
-                    print(f"{filename} call parameters: {call_params}")
+                    self._log(f"{filename} call parameters: {call_params}")
     
-    def resolve_dependencies(self) -> List[str]:
-        """Resolve import dependencies and return processing order
+    def update_module(self, filename: str) -> bool:
+        """Re-read a single module and refresh its facts in place
+
+        Returns True if the module changed (including being added or removed).
+        Only this module is re-tokenized; everything else keeps its parsed state.
+        A file that is not valid UTF-8 keeps its last decoded content and is
+        reported as a RULE_UNREADABLE finding (and in read_errors).
+        """
+        path = self.base_path / filename
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except UnicodeDecodeError as e:
+            # Usually a file caught mid-save: keep the last content that decoded and report the bad byte
+            line = e.object.count(b'\n', 0, e.start) + 1
+            col = e.start - (e.object.rfind(b'\n', 0, e.start) + 1)
+            message = f"{filename} is not valid UTF-8 ({e.reason} at line {line})"
+            finding = Finding(RULE_UNREADABLE, filename, line, col, '', message)
+            self.read_errors[filename] = finding
+            self._print(f"Warning: {message}; "
+                        f"{'keeping the last version that decoded' if filename in self.modules else 'not loaded'}")
+            self._emit(finding)
+            return False
+        except OSError:
+            if filename not in self.modules:
+                return False
+            self.remove_module(filename)
+            return True
+        self.read_errors.pop(filename, None)
+        return self.set_module_content(filename, content)
+
+    def set_module_content(self, filename: str, content: str) -> bool:
+        """Replace a module's content (an unsaved editor buffer, say) and refresh its facts in place
+
+        Returns True if the content changed. Only this module is re-tokenized.
+        """
+        if self.modules.get(filename) == content:
+            return False
+        old_imports = self.imports.get(filename)
+        self.modules[filename] = content
+        self.content_digests[filename] = content_digest(content)
+        self.tokens.pop(filename, None)
+        self.paren_tables.pop(filename, None)
+        self.module_facts.pop(filename, None)
+        self.module_parse_times.pop(filename, None)
+        self.code_blocks.pop(filename, None)
+        self.flow_blocks.pop(filename, None)
+        self.code_sizes.pop(filename, None)
+        cached = self._load_cached_facts(filename)
+        if cached is not None:
+            self.module_facts[filename] = cached
         
-        For JSFX modular architecture, the main .jsfx file imports all modules
-        in a specific order. We need to respect this sequential import order
-        since it defines the dependency chain.
+        facts = self.get_module_facts(filename)
+        self.imports[filename] = list(facts.imports)
+        self.function_declarations[filename] = {d.name for d in facts.declarations}
+        self.function_parameters[filename] = {d.name: d.param_count for d in facts.declarations}
+        self.function_calls[filename] = {c.name for c in facts.calls}
+        self.function_call_parameters[filename] = {c.name: c.arg_count for c in facts.calls}
+        if old_imports != self.imports[filename]:
+            self._root_orders = None
+            self._processing_order = None
+        self._symbol_index = None
+        self._section_graphs = {}
+        self._invariance = {}
+        return True
+
+    def remove_module(self, filename: str):
+        """Forget a module that no longer exists on disk"""
+        for table in (self.modules, self.content_digests, self.tokens, self.paren_tables,
+                      self.module_facts, self.module_parse_times, self.code_blocks, self.flow_blocks,
+                      self.code_sizes, self.imports, self.function_declarations, self.function_parameters,
+                      self.function_calls, self.function_call_parameters, self.read_errors):
+            table.pop(filename, None)
+        self._root_orders = None
+        self._processing_order = None
+        self._symbol_index = None
+        self._section_graphs = {}
+        self._invariance = {}
+
+    def retarget(self, base_path: str) -> Set[str]:
+        """Point the analyzer at another copy of the tree, keeping the parse of every unchanged module
+
+        Modules whose content differs are re-read through update_module(),
+        ones missing from the new tree are removed and new ones added.
+        Returns the modules that changed.
+        """
+        self.base_path = Path(base_path)
+        present = {str(path.relative_to(self.base_path)) for path in self.discover_files()}
+        changed = {filename for filename in sorted(present | set(self.modules)) if self.update_module(filename)}
+        # A module the new tree has but that did not decode must not keep the old tree's content
+        for filename in sorted(set(self.read_errors) & set(self.modules)):
+            self._print(f"Warning: leaving {filename} out of {self.base_path}")
+            self.remove_module(filename)
+            changed.add(filename)
+        for filename in sorted(changed):
+            self._log(f"Changed: {filename}")
+        return changed
+
+    def get_root_orders(self) -> Dict[str, List[str]]:
+        """Return resolve_root_orders(), computed once until imports change"""
+        if self._root_orders is None:
+            self._root_orders = self.resolve_root_orders()
+        return self._root_orders
+
+    def get_processing_order(self) -> List[str]:
+        """Return resolve_dependencies(), computed once until imports change"""
+        if self._processing_order is None:
+            self._processing_order = self.resolve_dependencies()
+        return self._processing_order
+
+    def get_symbol_index(self) -> SymbolIndex:
+        """Return the cross-file symbol table, built once until a module changes"""
+        if self._symbol_index is None:
+            module_facts = {filename: self.get_module_facts(filename) for filename in self.modules}
+            self._symbol_index = SymbolIndex(module_facts, self.get_root_orders())
+        return self._symbol_index
+
+    def get_code_blocks(self, filename: str) -> Tuple[Dict[str, CodeBlock], Dict[str, CodeBlock]]:
+        """Return a module's measured function bodies and section code (see extract_code_blocks)"""
+        blocks = self.code_blocks.get(filename)
+        if blocks is None:
+            partner, argument_count = self.get_paren_table(filename)
+            blocks = extract_code_blocks(filename, self.get_tokens(filename), partner, argument_count,
+                                         self.builtin_functions)
+            self.code_blocks[filename] = blocks
+        return blocks
+
+    def get_section_call_graph(self, root: str) -> SectionCallGraph:
+        """Return the section-aware call graph of one root, built once until a module changes"""
+        graph = self._section_graphs.get(root)
+        if graph is None:
+            functions = {}
+            entries = defaultdict(list)
+            for filename in self.get_root_orders()[root]:
+                if filename not in self.modules:
+                    continue
+                module_functions, module_sections = self.get_code_blocks(filename)
+                functions.update(module_functions)
+                for section, block in module_sections.items():
+                    entries[section].append(block)
+            graph = SectionCallGraph(root, functions, dict(entries))
+            self._section_graphs[root] = graph
+        return graph
+
+    def get_code_sizes(self, filename: str) -> Tuple[Dict[str, CodeSize], Dict[str, CodeSize]]:
+        """Return a module's token counts per function and section (see extract_code_sizes)"""
+        sizes = self.code_sizes.get(filename)
+        if sizes is None:
+            partner, argument_count = self.get_paren_table(filename)
+            sizes = extract_code_sizes(filename, self.get_tokens(filename), partner, argument_count,
+                                       self.builtin_functions)
+            self.code_sizes[filename] = sizes
+        return sizes
+
+    def get_inline_expansion(self, root: str) -> InlineExpansion:
+        """Return the inlined code size model of one root"""
+        functions = {}
+        entries = defaultdict(list)
+        for filename in self.get_root_orders()[root]:
+            if filename not in self.modules:
+                continue
+            module_functions, module_sections = self.get_code_sizes(filename)
+            functions.update(module_functions)
+            for section, block in module_sections.items():
+                entries[section].append(block)
+        return InlineExpansion(root, functions, dict(entries))
+
+    def get_flow_blocks(self, filename: str) -> Tuple[Dict[str, FlowBlock], Dict[str, FlowBlock]]:
+        """Return a module's data flow facts per function and section (see extract_flow_blocks)"""
+        blocks = self.flow_blocks.get(filename)
+        if blocks is None:
+            partner, argument_count = self.get_paren_table(filename)
+            blocks = extract_flow_blocks(filename, self.modules[filename], self.get_tokens(filename), partner,
+                                         argument_count, self.builtin_functions)
+            self.flow_blocks[filename] = blocks
+        return blocks
+
+    def get_invariance(self, root: str) -> InvarianceAnalysis:
+        """Return the @sample invariance analysis of one root, built once until a module changes"""
+        analysis = self._invariance.get(root)
+        if analysis is None:
+            functions = {}
+            entries = defaultdict(list)
+            for filename in self.get_root_orders()[root]:
+                if filename not in self.modules:
+                    continue
+                module_functions, module_sections = self.get_flow_blocks(filename)
+                functions.update(module_functions)
+                for section, block in module_sections.items():
+                    entries[section].append(block)
+            analysis = InvarianceAnalysis(self.get_section_call_graph(root), functions, dict(entries))
+            self._invariance[root] = analysis
+        return analysis
+
+    def get_slider_definitions(self, root: str) -> Dict[str, SliderDefinition]:
+        """Return the slider definitions of one .jsfx root (none for UNIMPORTED_ROOT)"""
+        if root not in self.modules:
+            return {}
+        return parse_slider_definitions(self.get_tokens(root))
+
+    def get_value_ranges(self, root: str) -> ValueRanges:
+        """Return variable bounds for one root, derived from its slider ranges"""
+        return ValueRanges(self.get_invariance(root), self.get_slider_definitions(root),
+                           lambda filename: (self.get_tokens(filename), self.get_paren_table(filename)[0]))
+
+    def get_memory_layout(self, root: str, srate: float) -> MemoryLayout:
+        """Return the static memory map of one root at a given sample rate"""
+        ranges = ValueRanges(self.get_invariance(root), self.get_slider_definitions(root),
+                             lambda filename: (self.get_tokens(filename), self.get_paren_table(filename)[0]),
+                             {'srate': (srate, srate)})
+        return MemoryLayout(self.get_invariance(root), ranges)
+
+    def get_render_graph(self, root: str) -> Tuple[SectionCallGraph, LoopBounds]:
+        """Return a call graph of one root whose @gfx loops run their LoopBounds trip counts
+
+        Code only other sections reach keeps the default trip counts.
         """
-        all_files = set(self.modules.keys())
+        reachable = self.get_section_call_graph(root).reachable.get('@gfx', set())
+        bounds = LoopBounds(self.get_invariance(root), self.get_value_ranges(root),
+                            lambda filename: self.modules[filename].split('\n'))
         
-        # Find main .jsfx file(s) that have imports
-        main_files = [f for f in all_files if f.endswith('.jsfx') and self.imports.get(f)]
+        def trips(filename: str, name: str, index: int) -> Optional[float]:
+            if name != '@gfx' and name not in reachable:
+                return None
+            return bounds.trips(filename, name, index)
         
-        if not main_files:
-            print("Warning: No main .jsfx file found with imports. Using alphabetical order.")
-            return sorted(all_files)
-        
-        # For JSFX modular architecture, there should be one main file
-        # that imports all modules in dependency order
-        main_file = main_files[0]
-        if len(main_files) > 1:
-            print(f"Warning: Multiple .jsfx files with imports found: {main_files}")
-            print(f"Using import order from: {main_file}")
+        functions = {}
+        entries = defaultdict(list)
+        for filename in self.get_root_orders()[root]:
+            if filename not in self.modules:
+                continue
+            partner, argument_count = self.get_paren_table(filename)
+            module_functions, module_sections = extract_code_blocks(
+                filename, self.get_tokens(filename), partner, argument_count, self.builtin_functions,
+                lambda name, index, filename=filename: trips(filename, name, index))
+            functions.update(module_functions)
+            for section, block in module_sections.items():
+                entries[section].append(block)
+        return SectionCallGraph(root, functions, dict(entries)), bounds
+
+    def get_entry_roots(self) -> List[str]:
+        """Return the .jsfx roots (or UNIMPORTED_ROOT when there are none)"""
+        roots = [root for root in self.get_root_orders() if root != UNIMPORTED_ROOT]
+        return roots or list(self.get_root_orders())
+
+    def iter_root_modules(self, only: Optional[Set[str]] = None) -> Iterator[Tuple[str, str]]:
+        """Yield (root, filename) for every module to check under every root
+
+        Modules are yielded in each root's processing order. Under the
+        UNIMPORTED_ROOT group only the unimported modules themselves are checked.
+        """
+        root_orders = self.get_root_orders()
+        roots_exist = any(root != UNIMPORTED_ROOT for root in root_orders)
+        imported = set(_merge_orders(order for root, order in root_orders.items() if root != UNIMPORTED_ROOT))
+        for root, order in root_orders.items():
+            for filename in order:
+                if filename not in self.modules or (only is not None and filename not in only):
+                    continue
+                if root == UNIMPORTED_ROOT and roots_exist and filename in imported:
+                    continue
+                yield root, filename
+
+    def _emit(self, finding: Finding):
+        if self.on_finding is not None:
+            self.on_finding(finding)
+
+    def _merge_root_findings(self, rule: str, found: Dict[Tuple[str, str, str, int, int], Set[str]]) -> Dict[str, List[str]]:
+        """Collapse per-root findings into {filename: [finding, ...]} and emit them
+
+        `found` maps (filename, finding, function, line, col) to the roots it
+        occurs under. A finding that only occurs under some of the roots
+        checking its module is annotated with those roots.
+        """
+        checked_roots = defaultdict(set)
+        for root, filename in self.iter_root_modules():
+            checked_roots[filename].add(root)
         
-        # Get the import order from the main file
-        # This is the explicit dependency order defined by the developer
-        import_order = self.imports.get(main_file, [])
+        merged = defaultdict(list)
+        for (filename, finding, function, line, col), roots in found.items():
+            suffix = ''
+            if len(roots) < len(checked_roots[filename]):
+                suffix = f" (in {', '.join(sorted(roots))})"
+            merged[filename].append(finding + suffix)
+            message = f"{function} is called but not declared" if rule == RULE_UNDECLARED else finding
+            self._emit(Finding(rule, filename, line, col, function, message + suffix))
+        return merged
+
+    def modules_affected_by(self, changed: Set[str],
+                            previous_orders: Optional[Dict[str, List[str]]] = None) -> Set[str]:
+        """Return the modules whose results may change when the given modules change
+
+        Declarations accumulate along each root's processing order, so a change
+        can only affect the changed module and those processed after it under
+        the roots that include it. `previous_orders` is get_root_orders() from
+        before the change: a removed module, or one whose imports were dropped,
+        is only found in those orders. The result includes `changed` and is
+        limited to the modules still loaded.
+        """
+        affected = set(changed)
+        unresolved = set(changed)
+        for root_orders in (previous_orders or {}, self.get_root_orders()):
+            for order in root_orders.values():
+                positions = [order.index(f) for f in changed if f in order]
+                if positions:
+                    affected.update(order[min(positions):])
+                    unresolved.difference_update(order)
+        if unresolved:
+            return set(self.modules)
+        return affected & set(self.modules)
+
+    def resolve_root_orders(self) -> Dict[str, List[str]]:
+        """Resolve the shared import graph into a processing order per .jsfx root
+
+        Every .jsfx file is a root. Its order lists the modules it imports,
+        directly or through other modules, depth-first in import order (each
+        module once, after its own imports), followed by the root itself.
+        Modules no root reaches are grouped under UNIMPORTED_ROOT, checked
+        after every imported module.
+        """
+        all_files = set(self.modules.keys())
+        roots = sorted(f for f in all_files if f.endswith('.jsfx'))
+        root_orders = {}
         
-        # Filter to only include files that exist in our modules
-        result = [f for f in import_order if f in all_files]
+        if not roots:
+            self._print("Warning: No main .jsfx file found. Using alphabetical order.")
+            root_orders[UNIMPORTED_ROOT] = sorted(all_files)
+            return root_orders
         
-        # Add the main file at the end
-        result.append(main_file)
+        for root in roots:
+            order = []
+            done = set()
+            visiting = set()
+            
+            def visit(filename: str):
+                if filename in done:
+                    return
+                if filename in visiting:
+                    self._print(f"Warning: Circular import involving {filename} (from {root})")
+                    return
+                visiting.add(filename)
+                for imported in self.imports.get(filename, []):
+                    if imported in all_files:
+                        visit(imported)
+                    else:
+                        self._print(f"Warning: {filename} imports missing module {imported}")
+                visiting.discard(filename)
+                done.add(filename)
+                order.append(filename)
+            
+            visit(root)
+            root_orders[root] = order
         
-        # Add any remaining files that weren't imported (shouldn't happen normally)
-        remaining = all_files - set(result)
+        imported = _merge_orders(root_orders.values())
+        remaining = all_files - set(imported)
         if remaining:
-            print(f"Warning: Files not imported by main file: {remaining}")
-            result.extend(sorted(remaining))
+            self._print(f"Warning: Files not imported by any .jsfx root: {sorted(remaining)}")
+            root_orders[UNIMPORTED_ROOT] = imported + sorted(remaining)
         
-        return result
+        return root_orders
+
+    def resolve_dependencies(self) -> List[str]:
+        """Resolve import dependencies and return processing order
+        
+        For JSFX modular architecture, each .jsfx file imports its modules in a
+        specific order that defines the dependency chain. This merges every
+        root's order (see resolve_root_orders) into a single list.
+        """
+        return _merge_orders(self.get_root_orders().values())
     
-    def check_intra_file_function_order(self) -> Dict[str, List[str]]:
+    def check_intra_file_function_order(self, only: Optional[Set[str]] = None) -> Dict[str, List[str]]:
         """Check for function declaration order issues within individual files"""
         order_issues = defaultdict(list)
         
-        for filename, content in self.modules.items():
-            if filename.endswith('.jsfx-inc'):
-                # Parse function declarations with line numbers
-                function_declarations = {}
-                function_calls_with_lines = []
+        for filename in self.modules:
+            if filename.endswith('.jsfx-inc') and (only is None or filename in only):
+                facts = self.get_module_facts(filename)
                 
-                lines = content.split('\n')
-                for line_num, line in enumerate(lines, 1):
-                    # Skip comments
-                    stripped = line.strip()
-                    if stripped.startswith('//') or stripped.startswith('/*'):
-                        continue
-                    
-                    # Remove inline comments
-                    if '//' in line:
-                        line = line[:line.find('//')]
-                    
-                    # Find function declarations
-                    func_decl_match = re.search(r'function\s+([a-zA-Z_][a-zA-Z0-9_]*)\s*\(', line)
-                    if func_decl_match:
-                        func_name = func_decl_match.group(1)
-                        function_declarations[func_name] = line_num
-                    
-                    # Find function calls
-                    call_pattern = r'\b([a-zA-Z_][a-zA-Z0-9_]*)\s*\('
-                    matches = re.finditer(call_pattern, line)
-                    for match in matches:
-                        func_name = match.group(1)
-                        # Skip builtins and single letters
-                        if (func_name not in self.builtin_functions and 
-                            len(func_name) > 1 and
-                            not line[:match.start()].strip().endswith('function')):
-                            function_calls_with_lines.append((func_name, line_num))
+                # Function declarations with line numbers
+                function_declarations = {}
+                for declaration in facts.declarations:
+                    function_declarations[declaration.name] = declaration.line
                 
                 # Check for order issues
-                for func_call, call_line in function_calls_with_lines:
+                for call in facts.calls:
+                    func_call = call.name
                     if func_call in function_declarations:
+                        call_line = call.line
                         decl_line = function_declarations[func_call]
                         if decl_line > call_line:
-                            order_issues[filename].append(f"{func_call} called at line {call_line} but declared at line {decl_line}")
+                            issue = f"{func_call} called at line {call_line} but declared at line {decl_line}"
+                            order_issues[filename].append(issue)
+                            self._emit(Finding(RULE_ORDER, filename, call.line, call.col, func_call, issue))
         
         return order_issues
 
-    def check_parameter_mismatches(self) -> Dict[str, List[str]]:
-        """Check for parameter count mismatches between declarations and calls"""
-        parameter_issues = defaultdict(list)
-        processing_order = self.resolve_dependencies()
+    def check_parameter_mismatches(self, only: Optional[Set[str]] = None) -> Dict[str, List[str]]:
+        """Check for parameter count mismatches between declarations and calls
+
+        Every call site is compared against the definition in effect for its
+        module under each root. If `only` is given, calls are checked in those
+        modules alone.
+        """
+        index = self.get_symbol_index()
+        found = defaultdict(set)
         
-        # Track all declared functions with their parameter counts as we process files
-        all_declared_functions = set(self.builtin_functions)
-        all_function_params = {}
+        for root, filename in self.iter_root_modules(only):
+            for call in index.calls_by_module.get(filename, ()):
+                symbol = index.definition_visible_from(call.name, filename, root)
+                if symbol is not None and symbol.param_count != call.arg_count:
+                    issue = f"{call.name} declared with {symbol.param_count} parameters but called with {call.arg_count} parameters at line {call.line}"
+                    found[(filename, issue, call.name, call.line, call.col)].add(root)
         
-        for filename in processing_order:
-            if filename not in self.modules:
-                continue
-                
-            # Add functions declared in this file
-            declared_in_file = self.function_declarations.get(filename, set())
-            all_declared_functions.update(declared_in_file)
-            
-            # Add parameter counts for functions declared in this file
-            file_params = self.function_parameters.get(filename, {})
-            for func_name, param_count in file_params.items():
-                all_function_params[func_name] = param_count
-            
-            # Check function calls in this file
-            calls_in_file = self.function_calls.get(filename, set())
-            call_params = self.function_call_parameters.get(filename, {})
-            
-            # Find parameter mismatches
-            for func_call in calls_in_file:
-                if func_call in all_declared_functions:
-                    # Function is declared, check parameter count
-                    declared_params = all_function_params.get(func_call, 0)
-                    call_params_count = call_params.get(func_call, 0)
-                    
-                    if declared_params != call_params_count:
-                        parameter_issues[filename].append(
-                            f"{func_call} declared with {declared_params} parameters but called with {call_params_count} parameters"
-                        )
-        
-        return parameter_issues
+        return self._merge_root_findings(RULE_PARAMETERS, found)
 
     def check_unused_functions(self) -> Dict[str, List[str]]:
         """Check for functions that are declared but never called"""
         unused_functions = defaultdict(list)
+        index = self.get_symbol_index()
         
-        # Collect all declared functions across all files
-        all_declared_functions = set()
-        function_declaration_locations = {}  # function_name -> filename
+        for func_name, definitions in index.definitions.items():
+            if not index.find_callers(func_name):
+                for symbol in definitions:
+                    unused_functions[symbol.filename].append(func_name)
+                    self._emit(Finding(RULE_UNUSED, symbol.filename, symbol.line, symbol.col, func_name,
+                                       f"{func_name} is declared but never called"))
         
-        for filename, declared_funcs in self.function_declarations.items():
-            for func_name in declared_funcs:
-                all_declared_functions.add(func_name)
-                function_declaration_locations[func_name] = filename
-        
-        # Collect all called functions across all files
-        all_called_functions = set()
-        for called_funcs in self.function_calls.values():
-            all_called_functions.update(called_funcs)
+        return unused_functions
+
+    def analyze_function_usage(self, only: Optional[Set[str]] = None) -> Dict[str, List[str]]:
+        """Analyze function usage and return undeclared function calls
+
+        Each root is checked against its own processing order. If `only` is
+        given, calls are checked in those modules alone (declarations from every
+        module before them still count).
+        """
+        self._log(f"\nProcessing order: {self.get_processing_order()}")
         
-        # Find unused functions (declared but never called)
-        unused_funcs = all_declared_functions - all_called_functions
+        index = self.get_symbol_index()
+        found = defaultdict(set)
+        current_root = None
         
-        # Group unused functions by file
-        for func_name in unused_funcs:
-            filename = function_declaration_locations.get(func_name, "unknown")
-            unused_functions[filename].append(func_name)
+        for root, filename in self.iter_root_modules(only):
+            if root != current_root:
+                self._log(f"\nRoot: {root}")
+                current_root = root
+            self._log(f"\nProcessing: {filename}")
+            self._log(f"  Declares: {sorted(self.function_declarations.get(filename, set()))}")
+            
+            # Check function calls in this file (reporting the first call site of each)
+            first_calls = {}
+            for call in index.calls_by_module.get(filename, ()):
+                first_calls.setdefault(call.name, call)
+            self._log(f"  Calls: {sorted(first_calls)}")
+            
+            # Find undeclared calls
+            for func_call, call in first_calls.items():
+                if func_call not in self.builtin_functions and index.definition_visible_from(func_call, filename, root) is None:
+                    found[(filename, func_call, func_call, call.line, call.col)].add(root)
+                    self._log(f"  ❌ UNDECLARED: {func_call}")
+                else:
+                    self._log(f"  ✅ Declared: {func_call}")
         
-        return unused_functions
+        return self._merge_root_findings(RULE_UNDECLARED, found)
+    
+    def analyze_sections(self) -> Dict[str, SectionCallGraph]:
+        """Build the section-aware call graph of every root
+
+        Each function is tagged with the sections (@init, @slider, @block,
+        @sample, @gfx, @serialize) whose code can reach it.
+        """
+        graphs = {}
+        for root in self.get_entry_roots():
+            graph = self.get_section_call_graph(root)
+            graphs[root] = graph
+            for section in SECTION_NAMES:
+                if section in graph.entries:
+                    self._log(f"{root} {section} reaches {len(graph.reachable[section])} functions")
+        return graphs
+
+    def section_summary(self, graph: SectionCallGraph, top: int = 15) -> Dict:
+        """Summarize one root's section graph and @sample hot path as plain data"""
+        modes = (COST_STEADY_STATE, COST_WORST_CASE, COST_UNCONDITIONAL)
+        sample_counts = {mode: graph.section_counts('@sample', mode) for mode in modes}
+        executions = graph.executions('@sample', COST_WORST_CASE)
+        steady_executions = graph.executions('@sample', COST_STEADY_STATE)
+        hot_functions = []
+        for name, per_sample in executions.items():
+            block = graph.functions[name]
+            steady = steady_executions.get(name, 0.0)
+            hot_functions.append({
+                'function': name, 'file': block.filename, 'line': block.line,
+                'calls_per_sample': steady,
+                'worst_case_calls_per_sample': per_sample,
+                'self_cost_per_sample': code_cost(block.counts) * steady,
+                'inclusive_cost_per_call': code_cost(graph.inclusive_counts(name, COST_STEADY_STATE)),
+                'counts_per_call': block.counts,
+            })
+        hot_functions.sort(key=lambda entry: (entry['self_cost_per_sample'], entry['worst_case_calls_per_sample']),
+                           reverse=True)
+        return {
+            'root': graph.root,
+            'sections': {section: sorted(graph.reachable[section]) for section in SECTION_NAMES
+                         if section in graph.entries},
+            'function_sections': {name: [section for section in SECTION_NAMES if section in sections]
+                                  for name, sections in sorted(graph.function_sections.items())},
+            'unreachable_functions': sorted(set(graph.functions) - set(graph.function_sections)),
+            'has_sample': '@sample' in graph.entries,
+            'per_sample_counts': sample_counts,
+            'per_sample_cost': {mode: code_cost(counts) for mode, counts in sample_counts.items()},
+            'hot_functions': hot_functions[:top],
+        }
+
+    def find_hoist_candidates(self, root: str, min_savings: float = 1.0) -> List[Dict]:
+        """Return the per-sample assignments and calls of a root whose inputs only change with sliders
 
-    def analyze_function_usage(self) -> Dict[str, List[str]]:
-        """Analyze function usage and return undeclared function calls"""
-        processing_order = self.resolve_dependencies()
-        print(f"\nProcessing order: {processing_order}")
+        Each candidate carries its estimated saving per sample: the cost of
+        the expression (or of the call, callees included) times how often it
+        runs per sample in the steady state. Work already inside a
+        recompute-on-change block (`a != a_prev ? (...)`) is not reported.
+        Work that reads @block state or HOST_VARIABLES is pointed at @block.
+        """
+        analysis = self.get_invariance(root)
+        graph = analysis.graph
+        executions = graph.executions('@sample', COST_STEADY_STATE)
+        slider_writes = analysis.section_writes('@init') | analysis.section_writes('@slider')
+        block_writes = (analysis.section_writes('@block') - slider_writes) | HOST_VARIABLES
+        candidates = []
         
-        # Track all declared functions as we process files
-        all_declared_functions = set(self.builtin_functions)
-        undeclared_calls = defaultdict(list)
+        def describe(block: FlowBlock, facts: ValueFacts) -> Tuple[str, str]:
+            """Return (section to move the work to, note about parameters)"""
+            scoped = {name for name in facts.reads if block.name in analysis.functions and
+                      (name in block.params or name in block.locals)}
+            section = '@block' if (facts.reads - scoped) & block_writes else '@slider'
+            params = sorted(name for name in scoped if name in block.params)
+            return section, f"; inputs arrive through parameters {', '.join(params)}" if params else ''
         
-        for filename in processing_order:
-            if filename not in self.modules:
+        for block in analysis.sample_blocks:
+            runs = executions.get(block.name, 0.0) if block.name in analysis.functions else 1.0
+            if runs == 0:
+                continue
+            reported_spans = []
+            for assignment in block.assignments:
+                if assignment.change_guarded or not analysis.is_invariant(block, assignment.value):
+                    continue
+                first, last = assignment.span
+                cost = assignment.cost + sum(
+                    code_cost(graph.inclusive_counts(call.name, COST_STEADY_STATE))
+                    for call in block.calls if first <= call.span[0] and call.span[1] <= last and call.name in graph.functions)
+                savings = cost * assignment.weight * runs
+                if savings < min_savings:
+                    continue
+                section, note = describe(block, assignment.value)
+                reported_spans.append(assignment.span)
+                candidates.append({
+                    'root': root, 'file': block.filename, 'line': assignment.line, 'col': assignment.col,
+                    'function': block.name, 'code': f"{assignment.target} {assignment.operator} {assignment.text}",
+                    'kind': 'expression', 'runs_per_sample': assignment.weight * runs,
+                    'savings_per_sample': savings, 'target_section': section, 'note': note,
+                })
+            for call in block.calls:
+                if call.change_guarded or call.name not in analysis.functions or call.name in analysis.stateful:
+                    continue
+                if any(first <= call.span[0] and call.span[1] <= last for first, last in reported_spans):
+                    continue
+                arguments = _merge_facts(call.args)
+                if not analysis.is_invariant(block, arguments):
+                    continue
+                savings = code_cost(graph.inclusive_counts(call.name, COST_STEADY_STATE)) * call.weight * runs
+                if savings < min_savings:
+                    continue
+                section, note = describe(block, arguments)
+                candidates.append({
+                    'root': root, 'file': block.filename, 'line': call.line, 'col': call.col,
+                    'function': block.name, 'code': call.text, 'kind': 'call',
+                    'runs_per_sample': call.weight * runs, 'savings_per_sample': savings,
+                    'target_section': section, 'note': note,
+                })
+        candidates.sort(key=lambda candidate: candidate['savings_per_sample'], reverse=True)
+        return candidates
+
+    def check_hoisting_candidates(self, min_savings: float = 1.0) -> Dict[str, List[str]]:
+        """Report per-sample work that only depends on slider state, largest saving first"""
+        found = defaultdict(set)
+        for root in self.get_entry_roots():
+            for candidate in self.find_hoist_candidates(root, min_savings):
+                runs = candidate['runs_per_sample']
+                state = 'per-block' if candidate['target_section'] == '@block' else 'slider'
+                issue = (f"{candidate['code']} (in {candidate['function']}, line {candidate['line']}) only depends on "
+                         f"{state} state but runs {runs:g}x per sample; compute it in {candidate['target_section']} "
+                         f"instead (saves ~{candidate['savings_per_sample']:.0f} per sample{candidate['note']})")
+                found[(candidate['file'], issue, candidate['function'], candidate['line'], candidate['col'])].add(root)
+        return self._merge_root_findings(RULE_HOIST, found)
+
+    def generate_hoisting_report(self, hoist_candidates: Dict[str, List[str]]):
+        """Print the hoisting candidates found by check_hoisting_candidates"""
+        total = sum(len(issues) for issues in hoist_candidates.values())
+        self._print("\n" + "="*80)
+        self._print("HOISTING CANDIDATES (per-sample work that only depends on slider state)")
+        self._print("="*80)
+        if total == 0:
+            self._print("\n✅ No per-sample work found that could move to @slider or @block.")
+            return
+        self._print(f"\n💡 Found {total} hoisting candidates:")
+        for filename, issues in hoist_candidates.items():
+            self._print(f"\n  {filename}:")
+            for issue in issues:
+                self._print(f"    - {issue}")
+        for root in self.get_entry_roots():
+            candidates = self.find_hoist_candidates(root)
+            if candidates:
+                savings = sum(candidate['savings_per_sample'] for candidate in candidates)
+                steady = code_cost(self.get_section_call_graph(root).section_counts('@sample', COST_STEADY_STATE))
+                self._print(f"\n  {root}: ~{savings:.0f} of ~{steady:.0f} estimated steady-state cost per sample "
+                            f"could move out of @sample")
+
+    def find_lut_candidates(self, root: str) -> List[Dict]:
+        """Return the functions on a root's @sample path that a lookup table could replace
+
+        A candidate's return value depends on exactly one parameter that varies
+        per sample; everything else it reads only changes with sliders, so a
+        table rebuilt when those change (as build_compression_lut() does for
+        the compression curve) gives the same result. Only functions with a
+        transcendental in their steady-state cost, costing more per call than
+        an interpolated lookup, are returned. The input range is bounded from
+        the @sample call sites' arguments and slider ranges.
+        """
+        analysis = self.get_invariance(root)
+        graph = analysis.graph
+        executions = graph.executions('@sample', COST_STEADY_STATE)
+        ranges = self.get_value_ranges(root)
+        candidates = []
+        for name, runs in executions.items():
+            block = analysis.functions.get(name)
+            if runs == 0 or block is None:
+                continue
+            inputs = analysis.result_inputs(name)
+            if inputs is None:
+                continue
+            params, external = inputs
+            varying = [param for param in block.params if param in params and param in analysis.varying_scoped[name]]
+            if len(varying) != 1 or any(analysis.is_varying(block, variable) for variable in external):
+                continue
+            counts = graph.inclusive_counts(name, COST_STEADY_STATE)
+            cost = code_cost(counts)
+            if counts['transcendentals'] < 1 or cost <= LUT_LOOKUP_COST:
                 continue
-                
-            print(f"\nProcessing: {filename}")
             
-            # Add functions declared in this file
-            declared_in_file = self.function_declarations.get(filename, set())
-            all_declared_functions.update(declared_in_file)
-            print(f"  Declares: {sorted(declared_in_file)}")
+            # Bound the varying argument over every @sample call site; the other
+            # arguments pick the table, so each distinct combination needs its own
+            index = block.params.index(varying[0])
+            table_params = [param for param in block.params if param in params and param != varying[0]]
+            input_range = None
+            sliders = set()
+            tables = set()
+            for caller in analysis.sample_blocks:
+                for call in caller.calls:
+                    if call.name != name:
+                        continue
+                    tokens, partner = self.get_tokens(caller.filename), self.get_paren_table(caller.filename)[0]
+                    arguments = _split_arguments(tokens, partner, call.span[0] + 1)
+                    if index >= len(arguments):
+                        continue
+                    tables.add(tuple(' '.join(token.value for token in tokens[first:last + 1])
+                                     for position, (first, last) in enumerate(arguments)
+                                     if block.params[position] in table_params))
+                    bounds, used = ranges.expression(caller, *arguments[index], call.conditions)
+                    sliders |= used
+                    input_range = bounds if input_range is None else _hull(input_range, bounds)
+            low, high = input_range or _UNBOUNDED
+            slots = (LUT_TABLE_ENTRIES + 1) * max(len(tables), 1)
+            candidates.append({
+                'root': root, 'file': block.filename, 'line': block.line, 'function': name,
+                'input': varying[0], 'table_params': table_params,
+                'rebuild_on': sorted(variable for variable in external
+                                     if ranges.variable(block, variable)[0][0] != ranges.variable(block, variable)[0][1]),
+                'calls_per_sample': runs,
+                'cost_per_call': cost, 'transcendentals_per_call': counts['transcendentals'],
+                'savings_per_sample': (cost - LUT_LOOKUP_COST) * runs,
+                'input_min': low if math.isfinite(low) else None, 'input_max': high if math.isfinite(high) else None,
+                'range_sliders': sorted(sliders),
+                'tables': max(len(tables), 1), 'entries': LUT_TABLE_ENTRIES + 1,
+                'memory_slots': slots, 'memory_bytes': slots * MEMORY_SLOT_BYTES,
+            })
+        candidates.sort(key=lambda candidate: candidate['savings_per_sample'], reverse=True)
+        return candidates
+
+    def check_lut_candidates(self) -> Dict[str, List[str]]:
+        """Report functions on the @sample path that a lookup table could replace, largest saving first"""
+        found = defaultdict(set)
+        for root in self.get_entry_roots():
+            for candidate in self.find_lut_candidates(root):
+                low, high = candidate['input_min'], candidate['input_max']
+                source = (f" (from sliders {', '.join(candidate['range_sliders'])})"
+                          if candidate['range_sliders'] else '')
+                if low is not None and high is not None:
+                    domain = f"input {candidate['input']} in [{low:g}, {high:g}]{source}"
+                else:
+                    domain = (f"input {candidate['input']} in [{'-inf' if low is None else f'{low:g}'}, "
+                              f"{'inf' if high is None else f'{high:g}'}]{source}, so clamp it to the range that matters")
+                rebuild = candidate['table_params'] + candidate['rebuild_on']
+                rebuild_note = f"; rebuild when {', '.join(rebuild)} change" if rebuild else ''
+                tables = f"{candidate['tables']} tables x " if candidate['tables'] > 1 else ''
+                issue = (f"{candidate['function']}() costs ~{candidate['cost_per_call']:.0f} per call "
+                         f"({candidate['transcendentals_per_call']:g} exp/log/pow/tanh) x{candidate['calls_per_sample']:g}"
+                         f"/sample; a lookup table saves ~{candidate['savings_per_sample']:.0f} per sample. "
+                         f"{domain}; {tables}{candidate['entries']} entries = {candidate['memory_slots']} memory slots "
+                         f"({candidate['memory_bytes'] / 1024:.1f} KiB){rebuild_note}")
+                found[(candidate['file'], issue, candidate['function'], candidate['line'], 0)].add(root)
+        return self._merge_root_findings(RULE_LUT, found)
+
+    def generate_lut_report(self, lut_candidates: Dict[str, List[str]]):
+        """Print the lookup table candidates found by check_lut_candidates"""
+        total = sum(len(issues) for issues in lut_candidates.values())
+        self._print("\n" + "="*80)
+        self._print("LOOKUP TABLE CANDIDATES (pure single-input functions on the @sample path)")
+        self._print("="*80)
+        self._print(f"Tables are sized at {LUT_TABLE_ENTRIES} entries with linear interpolation; "
+                    f"a lookup is costed at ~{LUT_LOOKUP_COST:g}.")
+        if total == 0:
+            self._print("\n✅ No transcendental-heavy single-input functions found on the @sample path.")
+            return
+        self._print(f"\n💡 Found {total} lookup table candidates:")
+        for filename, issues in lut_candidates.items():
+            self._print(f"\n  {filename}:")
+            for issue in issues:
+                self._print(f"    - {issue}")
+
+    def memory_summary(self, root: str, sample_rates: Tuple[float, ...] = SAMPLE_RATE_RANGE) -> Dict:
+        """Map one root's memory regions at each sample rate and check every indexed access against them
+
+        Issues are overlapping regions, accesses whose index bounds reach
+        outside their region, accesses bounded only by a value loaded with
+        file_var() (one issue per region and function, listing the lines),
+        repeated allocations of one base, and a footprint above
+        options:maxmem. Accesses whose index cannot be bounded are counted
+        as unverified.
+        """
+        maxmem = JSFX_DEFAULT_MAXMEM
+        for token in (self.get_tokens(root) if root in self.modules else []):
+            if token.kind == TOKEN_DIRECTIVE and token.value.startswith('options:'):
+                match = MAXMEM_PATTERN.search(token.value)
+                if match:
+                    maxmem = int(match.group(1))
+        layouts = {srate: self.get_memory_layout(root, srate) for srate in sample_rates}
+        regions = {}
+        for srate, layout in layouts.items():
+            for region in layout.regions:
+                entry = regions.setdefault(region.name, {
+                    'name': region.name, 'file': region.filename, 'line': region.line,
+                    'function': region.function, 'section': region.section, 'start': {}, 'size': {}})
+                entry['start'][srate] = region.start
+                entry['size'][srate] = region.size
+        
+        issues = {}
+        unverified = defaultdict(int)
+        file_loaded = {}
+        
+        def issue(filename: str, line: int, col: int, function: str, message: str):
+            issues.setdefault((filename, line, col), {'file': filename, 'line': line, 'col': col,
+                                                      'function': function, 'message': message})
+        
+        for srate in sorted(sample_rates, reverse=True):
+            layout = layouts[srate]
+            label = f"{srate / 1000:g} kHz"
+            ordered = sorted(layout.regions, key=lambda region: region.start)
+            for region, following in zip(ordered, ordered[1:]):
+                if region.start + region.size > following.start:
+                    issue(following.filename, following.line, 0, following.function,
+                          f"{following.name} starts at {following.start:g}, inside {region.name} "
+                          f"[{region.start:g}, {region.start + region.size:g}) at {label}")
+            if layout.end > maxmem:
+                issue(root, 1, 0, '@init', f"memory footprint {layout.end:g} slots at {label} exceeds "
+                                           f"maxmem {maxmem} slots")
+            for base, filename, line in layout.reallocations:
+                issue(filename, line, 0, base, f"{base} is allocated from {MEMORY_POINTER} a second time; "
+                                               f"the earlier region is no longer referenced (the map shows the first)")
             
-            # Check function calls in this file
-            calls_in_file = self.function_calls.get(filename, set())
-            print(f"  Calls: {sorted(calls_in_file)}")
+            sizes = {region.name: region for region in layout.regions}
+            ranges = layout.ranges
+            for block in ranges.blocks:
+                for access in block.memory:
+                    region = sizes.get(access.base)
+                    if region is None or self.get_invariance(root)._scoped(block, access.base):
+                        continue
+                    low, high = ranges.expression(block, *access.span, access.conditions, flow_sensitive=True)[0]
+                    if math.isfinite(high) and high >= region.size or math.isfinite(low) and low < 0:
+                        reach = f"index {high:g}" if math.isfinite(high) and high >= region.size else f"negative index {low:g}"
+                        issue(block.filename, access.line, access.col, block.name,
+                              f"{access.text} (line {access.line}) can reach {reach} but {region.name} has {region.size:g} slots at {label} "
+                              f"({region.filename}:{region.line})")
+                    elif not (math.isfinite(low) and math.isfinite(high)):
+                        tokens, _ = ranges.token_tables(block.filename)
+                        involved = set(value_facts(tokens, access.span[0], access.span[1], self.builtin_functions).reads)
+                        for variable, _, (first, last) in ranges.constraints(block, access.conditions):
+                            if variable in involved:
+                                involved |= value_facts(tokens, first, last, self.builtin_functions).reads
+                        loaded = sorted(involved & ranges.builtin_writes)
+                        if loaded:
+                            group = file_loaded.setdefault((block.filename, block.name, region.name),
+                                                           {'size': region.size, 'loaded': set(), 'accesses': {}})
+                            group['loaded'].update(loaded)
+                            group['accesses'].setdefault((access.line, access.col), access.text)
+                        elif srate == max(sample_rates):
+                            unverified[region.name] += 1
+        
+        for (filename, function, name), group in file_loaded.items():
+            (line, col), text = min(group['accesses'].items())
+            lines = sorted({line for line, _ in group['accesses']})
+            where = f"in {function}, line{'s' if len(lines) > 1 else ''} {', '.join(map(str, lines))}"
+            subject = (f"{text} ({where}) is" if len(group['accesses']) == 1 else
+                       f"{len(group['accesses'])} accesses to {name} ({where}) are")
+            issue(filename, line, col, function,
+                  f"{subject} only bounded by {', '.join(sorted(group['loaded']))}, which file_var() loads "
+                  f"without a range check; {name} has {group['size']:g} slots")
+        
+        return {
+            'root': root,
+            'sample_rates': list(sample_rates),
+            'maxmem': maxmem,
+            'regions': list(regions.values()),
+            'total_slots': {srate: layout.end for srate, layout in layouts.items()},
+            'total_bytes': {srate: layout.end * MEMORY_SLOT_BYTES for srate, layout in layouts.items()},
+            'issues': sorted(issues.values(), key=lambda entry: (entry['file'], entry['line'], entry['col'])),
+            'unverified_accesses': dict(unverified),
+        }
+
+    def check_memory_layout(self) -> Dict[str, List[str]]:
+        """Report memory region overlaps, out-of-region indexing and footprints over maxmem"""
+        found = defaultdict(set)
+        for root in self.get_entry_roots():
+            for entry in self.memory_summary(root)['issues']:
+                found[(entry['file'], entry['message'], entry['function'], entry['line'], entry['col'])].add(root)
+        return self._merge_root_findings(RULE_MEMORY, found)
+
+    def generate_memory_report(self, memory_issues: Dict[str, List[str]]):
+        """Print each root's memory region map and the issues found by check_memory_layout"""
+        self._print("\n" + "="*80)
+        self._print(f"MEMORY LAYOUT (regions allocated from {MEMORY_POINTER})")
+        self._print("="*80)
+        for root in self.get_entry_roots():
+            summary = self.memory_summary(root)
+            if not summary['regions']:
+                self._print(f"\n{root}: no {MEMORY_POINTER} allocations")
+                continue
+            rates = summary['sample_rates']
+            low, high = min(rates), max(rates)
+            self._print(f"\n{root} (maxmem {summary['maxmem']} slots):")
+            self._print(f"  {'Region':<26}{'Start':>10}{f'{low / 1000:g} kHz':>12}{f'{high / 1000:g} kHz':>12}  Allocated in")
+            for region in summary['regions']:
+                self._print(f"  {region['name']:<26}{region['start'].get(high, 0):>10.0f}"
+                            f"{region['size'].get(low, 0):>12.0f}{region['size'].get(high, 0):>12.0f}  "
+                            f"{region['function']} ({region['file']}:{region['line']}, {region['section']})")
+            totals = summary['total_slots']
+            self._print(f"  {'Total (slots)':<26}{'':>10}{totals[low]:>12.0f}{totals[high]:>12.0f}")
+            self._print(f"  {'Per instance (MiB)':<26}{'':>10}{summary['total_bytes'][low] / 2 ** 20:>12.2f}"
+                        f"{summary['total_bytes'][high] / 2 ** 20:>12.2f}")
+            largest = max(summary['regions'], key=lambda region: region['size'].get(high, 0))
+            self._print(f"  Largest region at {high / 1000:g} kHz: {largest['name']} "
+                        f"({largest['size'][high] / max(totals[high], 1):.0%} of the footprint)")
+            if summary['unverified_accesses']:
+                self._print("  Accesses whose index could not be bounded: " +
+                            ', '.join(f"{name} {count}" for name, count in sorted(summary['unverified_accesses'].items())))
+        
+        total = sum(len(issues) for issues in memory_issues.values())
+        if total == 0:
+            self._print("\n✅ No region overlaps or out-of-region indexing found.")
+            return
+        self._print(f"\n⚠️  Found {total} memory layout issues:")
+        for filename, issues in memory_issues.items():
+            self._print(f"\n  {filename}:")
+            for issue in issues:
+                self._print(f"    - {issue}")
+
+    def get_cache_invalidation(self, root: str) -> CacheInvalidation:
+        """Return the dirty-flag cache check of one root"""
+        return CacheInvalidation(self.get_invariance(root), self.get_slider_definitions(root),
+                                 lambda filename: (self.get_tokens(filename), self.get_paren_table(filename)[0]),
+                                 self.builtin_functions)
+
+    def cache_summary(self, root: str) -> Dict:
+        """Describe one root's dirty-flag caches (see CacheInvalidation) and their issues as plain data"""
+        check = self.get_cache_invalidation(root)
+        return {
+            'root': root,
+            'caches': [cache._asdict() for cache in check.caches],
+            'issues': sorted(({'file': block.filename, 'line': line, 'col': col, 'function': block.name,
+                               'message': message} for block, line, col, message in check.issues),
+                             key=lambda entry: (entry['file'], entry['line'], entry['col'])),
+        }
+
+    def check_cache_invalidation(self) -> Dict[str, List[str]]:
+        """Report cache inputs written without invalidation, and invalidations that only cause rebuilds"""
+        found = defaultdict(set)
+        for root in self.get_entry_roots():
+            for entry in self.cache_summary(root)['issues']:
+                found[(entry['file'], entry['message'], entry['function'], entry['line'], entry['col'])].add(root)
+        return self._merge_root_findings(RULE_CACHE, found)
+
+    def generate_cache_report(self, cache_issues: Dict[str, List[str]]):
+        """Print each root's dirty-flag caches and the issues found by check_cache_invalidation"""
+        self._print("\n" + "="*80)
+        self._print(f"CACHE INVALIDATION ({', '.join(CACHE_INVALIDATORS)})")
+        self._print("="*80)
+        for root in self.get_entry_roots():
+            summary = self.cache_summary(root)
+            if not summary['caches']:
+                self._print(f"\n{root}: none of the invalidators are defined")
+                continue
+            self._print(f"\n{root}:")
+            for cache in summary['caches']:
+                builders = ', '.join(f"{name}()" for name in cache['builders'])
+                sliders = f"; sliders {', '.join(cache['sliders'])}" if cache['sliders'] else ''
+                self._print(f"  {cache['flag']}: set by {', '.join(f'{name}()' for name in cache['invalidators'])}, "
+                            f"{f'cleared by {builders}' if builders else 'never cleared'}")
+                if cache['inputs']:
+                    self._print(f"    inputs: {', '.join(cache['inputs'])}{sliders}")
+        
+        total = sum(len(issues) for issues in cache_issues.values())
+        if total == 0:
+            self._print("\n✅ Every write to a cache input invalidates it, and no invalidation is redundant.")
+            return
+        self._print(f"\n⚠️  Found {total} cache invalidation issues:")
+        for filename, issues in cache_issues.items():
+            self._print(f"\n  {filename}:")
+            for issue in issues:
+                self._print(f"    - {issue}")
+
+    def render_summary(self, root: str, top: int = 15) -> Dict:
+        """Count the draw primitives one root's @gfx code issues per frame, and which draw paths use the curve cache
+
+        Loops are weighted by their LoopBounds (unbounded ones run
+        DEFAULT_LOOP_ITERATIONS times and are listed). A draw path is a
+        function that issues primitives itself; it goes through the curve
+        cache when it, or every caller on each path from @gfx to it, calls
+        one of CURVE_CACHE_FUNCTIONS. Paths that draw from a loop of their own
+        (geometry recomputed every frame) and do not are reported as
+        bypassing it.
+        """
+        graph, bounds = self.get_render_graph(root)
+        if '@gfx' not in graph.entries:
+            return {'root': root, 'has_gfx': False}
+        modes = (COST_STEADY_STATE, COST_WORST_CASE, COST_UNCONDITIONAL)
+        executions = {mode: graph.executions('@gfx', mode) for mode in modes}
+        
+        def drawn(block: CodeBlock, mode: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+            primitives = defaultdict(float)
+            state = defaultdict(float)
+            for name, times, guard in block.builtin_calls:
+                if mode == COST_UNCONDITIONAL and guard is not None:
+                    continue
+                if name in GFX_DRAW_PRIMITIVES:
+                    primitives[name] += times
+                elif name.startswith('gfx_'):
+                    state[name] += times
+            return primitives, state
+        
+        per_frame = {}
+        for mode in modes:
+            primitives = defaultdict(float)
+            state = defaultdict(float)
+            blocks = [(block, 1.0) for block in graph.entries['@gfx']]
+            blocks += [(graph.functions[name], times) for name, times in executions[mode].items()]
+            for block, times in blocks:
+                own_primitives, own_state = drawn(block, mode)
+                for name, count in own_primitives.items():
+                    primitives[name] += count * times
+                for name, count in own_state.items():
+                    state[name] += count * times
+            per_frame[mode] = {'primitives': sum(primitives.values()), 'state_calls': sum(state.values()),
+                               'by_primitive': dict(sorted(primitives.items(), key=lambda item: -item[1])),
+                               'by_state_call': dict(sorted(state.items(), key=lambda item: -item[1]))}
+        
+        # Shortest call chain from @gfx to every function, and who calls whom on the @gfx path
+        steady = executions[COST_STEADY_STATE]
+        parents: Dict[str, Optional[str]] = {}
+        callers = defaultdict(set)
+        queue = deque()
+        for block in graph.entries['@gfx']:
+            for name, _, _ in block.calls:
+                if name in graph.functions:
+                    callers[name].add('@gfx')
+                    if name not in parents:
+                        parents[name] = None
+                        queue.append(name)
+        while queue:
+            name = queue.popleft()
+            for callee, _, _ in graph.functions[name].calls:
+                if callee in graph.functions:
+                    callers[callee].add(name)
+                    if callee not in parents:
+                        parents[callee] = name
+                        queue.append(callee)
+        
+        def chain(name: str) -> List[str]:
+            path = [name]
+            while parents.get(path[-1]) is not None:
+                path.append(parents[path[-1]])
+            return ['@gfx'] + path[::-1]
+        
+        cache_functions = [name for name in CURVE_CACHE_FUNCTIONS if name in graph.functions]
+        covered = set()
+        if cache_functions:
+            def calls_cache(block: CodeBlock) -> bool:
+                return any(name in cache_functions for name, _, _ in block.calls)
             
-            # Find undeclared calls
-            for func_call in calls_in_file:
-                if func_call not in all_declared_functions:
-                    undeclared_calls[filename].append(func_call)
-                    print(f"  ❌ UNDECLARED: {func_call}")
+            entry_covered = any(calls_cache(block) for block in graph.entries['@gfx'])
+            covered = set(parents)  # greatest fixed point: drop functions some uncovered caller reaches
+            changed = True
+            while changed:
+                changed = False
+                for name in list(covered):
+                    if calls_cache(graph.functions[name]):
+                        continue
+                    if any(caller not in covered if caller != '@gfx' else not entry_covered
+                           for caller in callers[name]):
+                        covered.discard(name)
+                        changed = True
+        
+        draw_paths = []
+        for name in parents:
+            block = graph.functions[name]
+            own = drawn(block, COST_STEADY_STATE)[0]
+            if not own:
+                continue
+            calls_per_frame = steady.get(name, 0.0)
+            draw_paths.append({
+                'function': name, 'file': block.filename, 'line': block.line,
+                'calls_per_frame': calls_per_frame,
+                'primitives_per_call': sum(own.values()),
+                'primitives_per_frame': sum(own.values()) * calls_per_frame,
+                'looped': block.counts['loops'] > 0,
+                'cached': name in covered,
+                'path': chain(name),
+            })
+        draw_paths.sort(key=lambda entry: (entry['primitives_per_frame'], entry['primitives_per_call']), reverse=True)
+        
+        loops = [{'file': bound.filename, 'line': bound.line, 'function': bound.function, 'kind': bound.kind,
+                  'condition': bound.text, 'iterations': bound.iterations}
+                 for bound in sorted(bounds.loops.values(), key=lambda bound: (bound.filename, bound.line))]
+        return {
+            'root': root,
+            'has_gfx': True,
+            'per_frame': per_frame,
+            'draw_paths': draw_paths[:top],
+            'curve_cache': cache_functions,
+            'cached_paths': [entry['function'] for entry in draw_paths if entry['cached']],
+            'bypassing_paths': [{'function': entry['function'], 'primitives_per_frame': entry['primitives_per_frame'],
+                                 'path': entry['path']}
+                                for entry in draw_paths if cache_functions and entry['looped'] and not entry['cached']],
+            'loops': loops,
+        }
+
+    def generate_gfx_report(self, summaries: List[Dict]):
+        """Print the per-frame draw calls of every root with a @gfx section (see render_summary)"""
+        self._print("\n" + "="*80)
+        self._print("@gfx DRAW CALLS PER FRAME")
+        self._print("="*80)
+        self._print(f"Loops run their bounded trip count ({DEFAULT_LOOP_ITERATIONS}x if unbounded); "
+                    f"both branches of conditionals are counted unless noted.")
+        for summary in summaries:
+            if not summary['has_gfx']:
+                self._print(f"\n{summary['root']}: no @gfx section")
+                continue
+            self._print(f"\n{summary['root']}:")
+            self._print("  🎨 Draw calls per frame:")
+            for mode, label in ((COST_STEADY_STATE, "steady state (no dirty-flag rebuilds)"),
+                                (COST_WORST_CASE, "worst case (every branch taken)"),
+                                (COST_UNCONDITIONAL, "outside all conditionals")):
+                frame = summary['per_frame'][mode]
+                primitives = ', '.join(f"{name} {count:g}" for name, count in frame['by_primitive'].items())
+                self._print(f"    {frame['primitives']:8.0f}  {label}: {primitives or 'no primitives'}; "
+                            f"{frame['state_calls']:g} state calls")
+            if summary['draw_paths']:
+                self._print("  Draw paths issuing the most primitives (own primitives x steady-state calls per frame):")
+                for entry in summary['draw_paths']:
+                    cache = (" via curve cache" if entry['cached'] else " bypasses curve cache") if summary['curve_cache'] else ""
+                    self._print(f"    {entry['primitives_per_frame']:8.0f}  {entry['function']} "
+                                f"({entry['file']}:{entry['line']}) x{entry['calls_per_frame']:g}/frame, "
+                                f"{entry['primitives_per_call']:g}/call{cache}")
+                    self._print(f"              {' -> '.join(entry['path'])}")
+            if summary['curve_cache']:
+                self._print(f"  Curve cache ({', '.join(summary['curve_cache'])}):")
+                self._print(f"    Draw paths through the cache: {', '.join(summary['cached_paths']) or 'none'}")
+                if summary['bypassing_paths']:
+                    self._print("    Looped draw paths that bypass it:")
+                    for entry in summary['bypassing_paths']:
+                        self._print(f"      {entry['primitives_per_frame']:8.0f}/frame  {' -> '.join(entry['path'])}")
+            unbounded = [loop for loop in summary['loops'] if loop['iterations'] is None]
+            if unbounded:
+                self._print(f"  ⚠️  {len(unbounded)} of {len(summary['loops'])} loops on the @gfx path could not be bounded "
+                            f"(counted {DEFAULT_LOOP_ITERATIONS}x):")
+                for loop in unbounded:
+                    self._print(f"    {loop['file']}:{loop['line']} {loop['function']}: {loop['kind']} ({loop['condition']})")
+
+    def inlining_summary(self, root: str, top: int = 15) -> Dict:
+        """Expanded code size of one root's sections and functions, and the call sites that duplicate the most
+
+        Sizes are in tokens (see InlineExpansion). A section's duplicated
+        tokens are those of every function copy beyond the first. Call sites
+        are listed when their callee is compiled more than once in the
+        section, largest first. Functions are ranked by the tokens their
+        copies add to the compiled root (own tokens times copies, over every
+        section).
+        """
+        expansion = self.get_inline_expansion(root)
+        sections = {}
+        copies = defaultdict(int)
+        sites = []
+        for section in sorted(expansion.entries, key=lambda name: SECTION_NAMES.index(name)
+                              if name in SECTION_NAMES else len(SECTION_NAMES)):
+            own, expanded = expansion.section_size(section)
+            section_copies = expansion.copies(section)
+            sections[section] = {'own': own, 'expanded': expanded, 'duplicated': sum(
+                (count - 1) * expansion.functions[name].tokens for name, count in section_copies.items())}
+            for name, count in section_copies.items():
+                copies[name] += count
+            sites.extend({'section': section, **site} for site in expansion.call_sites(section)
+                         if site['callee_copies'] > 1)
+        sites.sort(key=lambda site: (-site['tokens'], site['file'], site['line'], site['col']))
+        functions = [{'function': name, 'file': expansion.functions[name].filename,
+                      'line': expansion.functions[name].line, 'own': expansion.functions[name].tokens,
+                      'expanded': expansion.expanded(name), 'copies': count,
+                      'tokens': count * expansion.functions[name].tokens}
+                     for name, count in copies.items()]
+        functions.sort(key=lambda entry: (-entry['tokens'], entry['function']))
+        return {
+            'root': root,
+            'sections': sections,
+            'own': sum(entry['own'] for entry in sections.values()),
+            'expanded': sum(entry['expanded'] for entry in sections.values()),
+            'duplicated': sum(entry['duplicated'] for entry in sections.values()),
+            'functions': functions[:top],
+            'call_sites': sites[:top],
+        }
+
+    def generate_inlining_report(self, summaries: List[Dict]):
+        """Print the expanded code size of every root, with the call sites and functions that add the most"""
+        self._print("\n" + "="*80)
+        self._print("INLINED CODE SIZE (tokens, every user function call expanded as EEL2 compiles it)")
+        self._print("="*80)
+        for summary in summaries:
+            self._print(f"\n{summary['root']}:")
+            self._print(f"  {'Section':<12}{'Own':>10}{'Expanded':>12}{'Duplicated':>12}")
+            for section, entry in list(summary['sections'].items()) + [('Total', summary)]:
+                self._print(f"  {section:<12}{entry['own']:>10}{entry['expanded']:>12}{entry['duplicated']:>12}")
+            
+            if summary['call_sites']:
+                self._print("\n  Call sites of functions inlined more than once (tokens added: copies x size):")
+                for site in summary['call_sites']:
+                    self._print(f"    {site['tokens']:>8} tokens  {' -> '.join(site['path'])}  "
+                                f"({site['file']}:{site['line']}, {site['copies']} x {site['size']})")
+            if summary['functions']:
+                self._print("\n  Functions by compiled tokens (own tokens x copies):")
+                self._print(f"    {'Function':<36}{'Own':>7}{'Expanded':>10}{'Copies':>8}{'Compiled':>10}")
+                for entry in summary['functions']:
+                    self._print(f"    {entry['function']:<36}{entry['own']:>7}{entry['expanded']:>10}"
+                                f"{entry['copies']:>8}{entry['tokens']:>10}")
+
+    def get_denormal_risk(self, root: str) -> DenormalRisk:
+        """Return the recursive @sample state of one root and its denormal protection"""
+        return DenormalRisk(self.get_invariance(root), self.get_value_ranges(root),
+                            lambda filename: (self.get_tokens(filename), self.get_paren_table(filename)[0]),
+                            lambda filename: self.modules[filename].split('\n'), self.builtin_functions)
+
+    def denormal_summary(self, root: str) -> Dict:
+        """Describe one root's recursive @sample state (see DenormalRisk) as plain data"""
+        check = self.get_denormal_risk(root)
+        return {
+            'root': root,
+            'states': sorted((state._asdict() for state in check.states),
+                             key=lambda entry: (entry['filename'], entry['line'], entry['col'])),
+        }
+
+    def check_denormal_risk(self) -> Dict[str, List[str]]:
+        """Report recursive @sample state that nothing keeps out of the denormal range"""
+        found = defaultdict(set)
+        for root in self.get_entry_roots():
+            for state in self.denormal_summary(root)['states']:
+                if state['protection'] is not None:
+                    continue
+                via = f" through {', '.join(state['via'])}" if state['via'] else ''
+                message = (f"{state['text']} feeds {state['variable']} back into itself{via} with no DC offset "
+                           f"or flush to zero, so it decays into denormals in silence; add a tiny offset "
+                           f"(+ 1e-30) or set it to 0 below a threshold")
+                found[(state['filename'], message, state['function'], state['line'], state['col'])].add(root)
+        return self._merge_root_findings(RULE_DENORMAL, found)
+
+    def generate_denormal_report(self, denormal_issues: Dict[str, List[str]]):
+        """Print each root's recursive @sample state and the unprotected sites found by check_denormal_risk"""
+        self._print("\n" + "="*80)
+        self._print("DENORMAL RISK (recursive @sample state)")
+        self._print("="*80)
+        for root in self.get_entry_roots():
+            states = self.denormal_summary(root)['states']
+            if not states:
+                self._print(f"\n{root}: no recursive state on the @sample path")
+                continue
+            self._print(f"\n{root}:")
+            for state in states:
+                status = f"{state['protection']}: {state['detail']}" if state['protection'] else "unprotected"
+                self._print(f"  {state['variable']:<28} {state['function']} "
+                            f"({state['filename']}:{state['line']}) - {status}")
+        
+        total = sum(len(issues) for issues in denormal_issues.values())
+        if total == 0:
+            self._print("\n✅ All recursive @sample state has a DC offset or a flush to zero.")
+            return
+        self._print(f"\n⚠️  Found {total} unprotected recursive state updates:")
+        for filename, issues in denormal_issues.items():
+            self._print(f"\n  {filename}:")
+            for issue in issues:
+                self._print(f"    - {issue}")
+
+    def performance_metrics(self, root: str) -> Dict[str, float]:
+        """Return one root's static performance metrics (see REGRESSION_METRICS)
+
+        Calls, cost and transcendentals are steady-state figures per sample,
+        draw primitives are steady-state per @gfx frame, the memory footprint
+        is the largest over SAMPLE_RATE_RANGE and the code size counts every
+        section with its function calls inlined.
+        """
+        graph = self.get_section_call_graph(root)
+        counts = graph.section_counts('@sample', COST_STEADY_STATE)
+        render = self.render_summary(root)
+        return {
+            'sample_calls': sum(graph.executions('@sample', COST_STEADY_STATE).values()),
+            'sample_cost': code_cost(counts),
+            'transcendentals': counts['transcendentals'],
+            'gfx_primitives': render['per_frame'][COST_STEADY_STATE]['primitives'] if render['has_gfx'] else 0.0,
+            'memory_slots': max(self.get_memory_layout(root, srate).end for srate in SAMPLE_RATE_RANGE),
+            'code_tokens': self.inlining_summary(root)['expanded'],
+        }
+
+    def compare_with(self, base_path: str, thresholds: Dict[str, float],
+                     labels: Optional[Tuple[str, str]] = None) -> Dict:
+        """Compare the performance metrics of the loaded tree with another copy of it
+
+        The analyzer is retargeted at base_path, so only the modules that
+        differ are parsed again. thresholds maps a metric (or '*' for every
+        metric) to the largest increase allowed, in percent; each metric of a
+        root present in both trees that grows past its limit is listed under
+        'regressions'.
+        """
+        labels = labels or (str(self.base_path), str(base_path))
+        before = {root: self.performance_metrics(root) for root in self.get_entry_roots()}
+        modules = set(self.modules)
+        changed = self.retarget(base_path)
+        after = {root: self.performance_metrics(root) for root in self.get_entry_roots()}
+        
+        roots = []
+        regressions = []
+        for root in list(before) + [root for root in after if root not in before]:
+            entry = {'root': root, 'before': before.get(root), 'after': after.get(root), 'deltas': {}}
+            roots.append(entry)
+            if entry['before'] is None or entry['after'] is None:
+                continue
+            for metric in REGRESSION_METRICS:
+                old, new = entry['before'][metric], entry['after'][metric]
+                change = 0.0 if old == new else new - old
+                if change == 0:
+                    percent = 0.0
+                elif old and math.isfinite(old):
+                    percent = change / abs(old) * 100
                 else:
-                    print(f"  ✅ Declared: {func_call}")
+                    percent = math.copysign(math.inf, change)
+                limit = thresholds.get(metric, thresholds.get('*'))
+                entry['deltas'][metric] = {'before': old, 'after': new, 'change': change, 'percent': percent,
+                                           'limit': limit}
+                if limit is not None and percent > limit:
+                    regressions.append({'root': root, 'metric': metric, 'before': old, 'after': new,
+                                        'percent': percent, 'limit': limit})
+        return {
+            'before': labels[0],
+            'after': labels[1],
+            'changed_modules': sorted(changed),
+            'reused_modules': len(modules & set(self.modules) - changed),
+            'thresholds': dict(thresholds),
+            'roots': roots,
+            'regressions': regressions,
+        }
+
+    def generate_regression_report(self, comparison: Dict):
+        """Print the metric deltas found by compare_with and the ones over their limit"""
+        def number(value: float) -> str:
+            if not math.isfinite(value):
+                return f"{value}"
+            return f"{value:,.0f}" if value == int(value) else f"{value:,.1f}"
         
-        return undeclared_calls
-    
+        self._print("\n" + "="*80)
+        self._print(f"PERFORMANCE REGRESSION ({comparison['before']} -> {comparison['after']})")
+        self._print("="*80)
+        changed = len(comparison['changed_modules'])
+        reused = comparison['reused_modules']
+        self._print(f"{changed} module{'s' if changed != 1 else ''} changed and {'were' if changed != 1 else 'was'} "
+                    f"parsed again; {reused} unchanged module{'s' if reused != 1 else ''} "
+                    f"{'were' if reused != 1 else 'was'} reused.")
+        for filename in comparison['changed_modules']:
+            self._print(f"  {filename}")
+        
+        for entry in comparison['roots']:
+            if entry['before'] is None or entry['after'] is None:
+                side = comparison['after'] if entry['before'] is None else comparison['before']
+                self._print(f"\n{entry['root']}: only in {side}")
+                continue
+            self._print(f"\n{entry['root']}:")
+            self._print(f"  {'Metric':<34}{'Before':>14}{'After':>14}{'Change':>10}")
+            for metric, delta in entry['deltas'].items():
+                change = f"{delta['percent']:+.2f}%" if delta['change'] else '-'
+                over = (f"  ❌ limit +{delta['limit']:g}%"
+                        if delta['limit'] is not None and delta['percent'] > delta['limit'] else '')
+                self._print(f"  {REGRESSION_METRICS[metric]:<34}{number(delta['before']):>14}"
+                            f"{number(delta['after']):>14}{change:>10}{over}")
+        
+        regressions = comparison['regressions']
+        if regressions:
+            self._print(f"\n❌ {len(regressions)} metric{'s' if len(regressions) != 1 else ''} "
+                        f"grew past {'their limits' if len(regressions) != 1 else 'its limit'}:")
+            for regression in regressions:
+                self._print(f"  - {regression['root']}: {REGRESSION_METRICS[regression['metric']]} "
+                            f"{number(regression['before'])} -> {number(regression['after'])} "
+                            f"({regression['percent']:+.2f}%, limit +{regression['limit']:g}%)")
+        elif comparison['thresholds']:
+            self._print("\n✅ No metric grew past its limit.")
+        else:
+            self._print("\nNo --max-increase limit set, so the comparison cannot fail.")
+
+    def write_slider_tables(self) -> List[Dict]:
+        """Regenerate SLIDER_TABLE_MODULE from the slider lines of the root that imports it
+
+        The file is only rewritten when its content changes. Returns one
+        summary per importing root; two roots with different sliders cannot
+        share the module.
+        """
+        summaries = []
+        written = {}
+        for root in self.get_entry_roots():
+            if SLIDER_TABLE_MODULE not in self.imports.get(root, []):
+                continue
+            sliders = self.get_slider_definitions(root)
+            text = slider_table_source(root, sliders)
+            if written.setdefault(SLIDER_TABLE_MODULE, text) != text:
+                raise ValueError(f"{root} and another root import {SLIDER_TABLE_MODULE} with different sliders")
+            path = self.base_path / SLIDER_TABLE_MODULE
+            current = path.read_text(encoding='utf-8') if path.exists() else None
+            if current != text:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(text, encoding='utf-8')
+            summaries.append({
+                'root': root,
+                'path': str(path),
+                'sliders': len(sliders),
+                'dropdowns': sum(1 for slider in sliders.values() if slider.options),
+                'dropdown_options': sum(len(slider.options) for slider in sliders.values()),
+                'updated': current != text,
+            })
+        return summaries
+
+    def generate_slider_table_report(self, summaries: List[Dict]):
+        """Print which slider tables were regenerated"""
+        self._print("\n" + "="*80)
+        self._print(f"SLIDER TABLE ({SLIDER_TABLE_MODULE})")
+        self._print("="*80)
+        if not summaries:
+            self._print(f"\nNo .jsfx root imports {SLIDER_TABLE_MODULE}.")
+        for summary in summaries:
+            self._print(f"\n{summary['root']} -> {summary['path']}: {summary['sliders']} sliders, "
+                        f"{summary['dropdowns']} dropdowns with {summary['dropdown_options']} options")
+            self._print(f"  {'✅ Regenerated' if summary['updated'] else '✅ Up to date'}")
+
+    def bundle_root(self, root: str, strip: bool = False) -> Tuple[str, Dict]:
+        """Flatten one root and its imports into a single .jsfx, without unreachable functions
+
+        Modules are inlined in the root's processing order: each section
+        collects the matching section of every module, imports first, as
+        JSFX itself does. A function is kept if any section's code reaches
+        it through any of its definitions, or if it redefines a built-in. The root's header (desc, sliders,
+        options, ...) is copied as is, without its import lines. With
+        `strip`, comments and blank lines are removed from section code.
+        Returns (text, summary).
+        """
+        order = [filename for filename in self.get_root_orders()[root] if filename in self.modules]
+        definitions = defaultdict(list)
+        stack = []
+        for filename in order:
+            functions, sections = self.get_code_blocks(filename)
+            for name, block in functions.items():
+                definitions[name].append(block)
+            stack.extend(name for block in sections.values() for name, _, _ in block.calls)
+        # Calls to a name on the built-in list are not tracked, so a user definition of one (tanh) always stays
+        stack.extend(name for name in definitions if name in self.builtin_functions)
+        keep = set()
+        while stack:
+            name = stack.pop()
+            if name in keep or name not in definitions:
+                continue
+            keep.add(name)
+            stack.extend(callee for block in definitions[name] for callee, _, _ in block.calls)
+        
+        header = ''
+        sections: Dict[str, Dict] = {}
+        removed = []
+        ignored = []
+        for filename in order:
+            content = self.modules[filename]
+            tokens = self.get_tokens(filename)
+            partner, argument_count = self.get_paren_table(filename)
+            offsets = _line_offsets(content)
+            
+            def offset(token: Token) -> int:
+                return offsets[token.line - 1] + token.col
+            
+            cuts = []
+            for name_index, name, _, _, close in iter_function_definitions(tokens, partner, argument_count):
+                if name in keep or close == -1:
+                    continue
+                last = close + 1 if close + 1 < len(tokens) and tokens[close + 1].value == ';' else close
+                cuts.append(_widen_to_lines(content, offset(tokens[name_index - 1]),
+                                            offset(tokens[last]) + len(tokens[last].value)))
+                removed.append({'file': filename, 'line': tokens[name_index].line, 'function': name})
+            
+            markers = [token for token in tokens if token.kind == TOKEN_SECTION]
+            body_end = offsets[markers[0].line - 1] if markers else len(content)
+            if filename == root:
+                cuts.extend((offsets[token.line - 1], offsets[token.line] if token.line < len(offsets) else len(content))
+                            for token in tokens if token.kind == TOKEN_DIRECTIVE and token.value.startswith('import'))
+                header = _cut_ranges(content, 0, body_end, cuts)
+            elif any(token.kind != TOKEN_DIRECTIVE for token in tokens[:tokens.index(markers[0]) if markers else None]):
+                ignored.append(filename)
+            
+            for k, marker in enumerate(markers):
+                marker_start = offsets[marker.line - 1]
+                body_start = offsets[marker.line] if marker.line < len(offsets) else len(content)
+                body_end = offsets[markers[k + 1].line - 1] if k + 1 < len(markers) else len(content)
+                section = sections.setdefault(marker.value, {'marker': None, 'parts': []})
+                if section['marker'] is None or filename == root:
+                    marker_line = content[marker_start:body_start]
+                    section['marker'] = (strip_comments(marker_line) if strip else marker_line).strip()  # root's @gfx size wins
+                code = _cut_ranges(content, body_start, body_end, cuts)
+                section['parts'].append((filename, strip_comments(code) if strip else code))
+        
+        lines = [f"// Bundled from {root} and {len(order) - 1} imported modules by function_analyzer2.py --bundle;",
+                 "// edit the modules, not this file.", header.rstrip('\n'), '']
+        for name in sorted(sections, key=lambda name: SECTION_NAMES.index(name) if name in SECTION_NAMES
+                           else len(SECTION_NAMES)):
+            lines.append(sections[name]['marker'])
+            for filename, code in sections[name]['parts']:
+                if not code.strip():
+                    continue
+                if not strip:
+                    lines.append(f"// ---- {filename} ----")
+                lines.append(code.rstrip('\n'))
+            if not strip:
+                lines.append('')
+        text = '\n'.join(lines) + '\n'
+        
+        source = ''.join(self.modules[filename] for filename in order)
+        return text, {
+            'root': root,
+            'modules': order,
+            'functions_kept': sum(len(definitions[name]) for name in keep),
+            'functions_removed': removed,
+            'ignored_modules': ignored,
+            'source_lines': source.count('\n'),
+            'source_bytes': len(source.encode('utf-8')),
+            'bundle_lines': text.count('\n'),
+            'bundle_bytes': len(text.encode('utf-8')),
+        }
+
+    def write_bundles(self, out_dir: str, strip: bool = False) -> List[Dict]:
+        """Write a flattened copy of every .jsfx root into out_dir (see bundle_root) and return the summaries"""
+        summaries = []
+        for root in self.get_entry_roots():
+            if root == UNIMPORTED_ROOT:
+                continue
+            path = Path(out_dir) / root
+            if path.resolve() == (self.base_path / root).resolve():
+                raise ValueError(f"--bundle would overwrite the source file {root}; choose another directory")
+            text, summary = self.bundle_root(root, strip)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+            summaries.append({**summary, 'path': str(path)})
+        return summaries
+
+    def generate_bundle_report(self, summaries: List[Dict]):
+        """Print what each bundled .jsfx contains and how much dead code was dropped"""
+        self._print("\n" + "="*80)
+        self._print("BUNDLES (imports inlined, unreachable functions removed)")
+        self._print("="*80)
+        if not summaries:
+            self._print("\nNo .jsfx roots to bundle.")
+        for summary in summaries:
+            self._print(f"\n{summary['root']} -> {summary['path']}")
+            self._print(f"  Modules inlined: {len(summary['modules'])}")
+            self._print(f"  Functions kept: {summary['functions_kept']}, removed: {len(summary['functions_removed'])}")
+            self._print(f"  Size: {summary['source_lines']} -> {summary['bundle_lines']} lines, "
+                        f"{summary['source_bytes'] / 1024:.1f} -> {summary['bundle_bytes'] / 1024:.1f} KiB")
+            for entry in summary['functions_removed']:
+                self._print(f"    - removed {entry['function']} ({entry['file']}:{entry['line']})")
+            for filename in summary['ignored_modules']:
+                self._print(f"  ⚠️  {filename} has code before its first section; it is not part of any section "
+                            f"and was left out")
+
+    def generate_section_report(self, graphs: Dict[str, SectionCallGraph], top: int = 15):
+        """Print the section call graph and @sample cost estimate of every root"""
+        self._print("\n" + "="*80)
+        self._print("SECTION CALL GRAPH AND @sample COST")
+        self._print("="*80)
+        self._print("Costs are static estimates in rough cycles: transcendental x"
+                    f"{COST_WEIGHTS['transcendentals']:g}, division/sqrt x{COST_WEIGHTS['divisions']:g}, "
+                    f"loop x{COST_WEIGHTS['loops']:g}, call x{COST_WEIGHTS['calls']:g}, operation x{COST_WEIGHTS['operations']:g}. "
+                    f"Both branches of conditionals are counted and loops run {DEFAULT_LOOP_ITERATIONS}x unless literal.")
+        
+        for root, graph in graphs.items():
+            summary = self.section_summary(graph, top)
+            self._print(f"\n{root}:")
+            for section, names in summary['sections'].items():
+                self._print(f"  {section}: reaches {len(names)} functions")
+            
+            # Group functions by the exact set of sections reaching them
+            groups = defaultdict(list)
+            for name, sections in summary['function_sections'].items():
+                groups[', '.join(sections)].append(name)
+            self._print("\n  Functions by reaching sections:")
+            for sections, names in sorted(groups.items()):
+                self._print(f"    [{sections}] ({len(names)}): {', '.join(names)}")
+            if summary['unreachable_functions']:
+                self._print(f"    [no section] ({len(summary['unreachable_functions'])}): "
+                            f"{', '.join(summary['unreachable_functions'])}")
+            
+            if not summary['has_sample']:
+                self._print("\n  No @sample section.")
+                continue
+            self._print("\n  ⚡ Estimated @sample cost per sample:")
+            for mode, label in ((COST_STEADY_STATE, "steady state (no dirty-flag rebuilds)"),
+                                (COST_WORST_CASE, "worst case (every branch taken)"),
+                                (COST_UNCONDITIONAL, "outside all conditionals")):
+                counts = summary['per_sample_counts'][mode]
+                self._print(f"    {summary['per_sample_cost'][mode]:8.0f}  {label}: "
+                            f"{counts['transcendentals']:g} transcendentals, {counts['divisions']:g} divisions, "
+                            f"{counts['loops']:g} loops, {counts['calls']:g} calls, {counts['operations']:g} operations")
+            if summary['hot_functions']:
+                self._print("  Most expensive functions on the @sample path (own cost x steady-state calls per sample):")
+                for entry in summary['hot_functions']:
+                    own = entry['counts_per_call']
+                    self._print(f"    {entry['self_cost_per_sample']:8.0f}  {entry['function']} "
+                                f"({entry['file']}:{entry['line']}) x{entry['calls_per_sample']:g}/sample "
+                                f"(worst case x{entry['worst_case_calls_per_sample']:g}), "
+                                f"exp/log/pow/tanh {own['transcendentals']:g}, div {own['divisions']:g}, "
+                                f"loops {own['loops']:g}, calls {own['calls']:g}; "
+                                f"inclusive {entry['inclusive_cost_per_call']:.0f}/call")
+
     def generate_report(self, undeclared_calls: Dict[str, List[str]], order_issues: Dict[str, List[str]], parameter_issues: Dict[str, List[str]], unused_functions: Dict[str, List[str]]):
         """Generate a comprehensive report"""
-        print("\n" + "="*80)
-        print("JSFX FUNCTION ANALYSIS REPORT")
-        print("="*80)
+        self._print("\n" + "="*80)
+        self._print("JSFX FUNCTION ANALYSIS REPORT")
+        self._print("="*80)
         
         # Summary statistics
         total_modules = len(self.modules)
@@ -650,57 +4950,60 @@ class JSFXFunctionAnalyzer:
         total_parameter_issues = sum(len(issues) for issues in parameter_issues.values())
         total_unused = sum(len(funcs) for funcs in unused_functions.values())
         
-        print(f"\nSUMMARY:")
-        print(f"  Modules analyzed: {total_modules}")
-        print(f"  Total function declarations: {total_declarations}")
-        print(f"  Total function calls: {total_calls}")
-        print(f"  Undeclared function calls: {total_undeclared}")
-        print(f"  Function order issues: {total_order_issues}")
-        print(f"  Parameter count mismatches: {total_parameter_issues}")
-        print(f"  Unused functions: {total_unused}")
+        roots = [root for root in self.get_root_orders() if root != UNIMPORTED_ROOT]
+        
+        self._print("\nSUMMARY:")
+        self._print(f"  Roots analyzed: {len(roots)} ({', '.join(roots)})")
+        self._print(f"  Modules analyzed: {total_modules}")
+        self._print(f"  Total function declarations: {total_declarations}")
+        self._print(f"  Total function calls: {total_calls}")
+        self._print(f"  Undeclared function calls: {total_undeclared}")
+        self._print(f"  Function order issues: {total_order_issues}")
+        self._print(f"  Parameter count mismatches: {total_parameter_issues}")
+        self._print(f"  Unused functions: {total_unused}")
         
         if total_undeclared == 0 and total_order_issues == 0 and total_parameter_issues == 0 and total_unused == 0:
-            print(f"\n🎉 SUCCESS: All function calls have corresponding declarations, proper order, correct parameter counts, and no unused functions!")
+            self._print("\n🎉 SUCCESS: All function calls have corresponding declarations, proper order, correct parameter counts, and no unused functions!")
         else:
             if total_undeclared > 0:
-                print(f"\n⚠️  WARNING: Found {total_undeclared} undeclared function calls:")
+                self._print(f"\n⚠️  WARNING: Found {total_undeclared} undeclared function calls:")
                 
                 for filename, calls in undeclared_calls.items():
                     if calls:
-                        print(f"\n  {filename}:")
+                        self._print(f"\n  {filename}:")
                         for call in sorted(calls):
-                            print(f"    - {call}")
+                            self._print(f"    - {call}")
             
             if total_order_issues > 0:
-                print(f"\n⚠️  WARNING: Found {total_order_issues} function order issues:")
+                self._print(f"\n⚠️  WARNING: Found {total_order_issues} function order issues:")
                 
                 for filename, issues in order_issues.items():
                     if issues:
-                        print(f"\n  {filename}:")
+                        self._print(f"\n  {filename}:")
                         for issue in issues:
-                            print(f"    - {issue}")
+                            self._print(f"    - {issue}")
             
             if total_parameter_issues > 0:
-                print(f"\n⚠️  WARNING: Found {total_parameter_issues} parameter count mismatches:")
+                self._print(f"\n⚠️  WARNING: Found {total_parameter_issues} parameter count mismatches:")
                 
                 for filename, issues in parameter_issues.items():
                     if issues:
-                        print(f"\n  {filename}:")
+                        self._print(f"\n  {filename}:")
                         for issue in issues:
-                            print(f"    - {issue}")
+                            self._print(f"    - {issue}")
             
             if total_unused > 0:
-                print(f"\n⚠️  WARNING: Found {total_unused} unused functions:")
+                self._print(f"\n⚠️  WARNING: Found {total_unused} unused functions:")
                 
                 for filename, funcs in unused_functions.items():
                     if funcs:
-                        print(f"\n  {filename}:")
+                        self._print(f"\n  {filename}:")
                         for func in sorted(funcs):
-                            print(f"    - {func}")
+                            self._print(f"    - {func}")
         
         # Detailed module breakdown
-        print(f"\nDETAILED BREAKDOWN:")
-        processing_order = self.resolve_dependencies()
+        self._print("\nDETAILED BREAKDOWN:")
+        processing_order = self.get_processing_order()
         
         for filename in processing_order:
             if filename not in self.modules:
@@ -713,82 +5016,686 @@ class JSFXFunctionAnalyzer:
             parameter_problems = parameter_issues.get(filename, [])
             unused = unused_functions.get(filename, [])
             
-            print(f"\n  {filename}:")
-            print(f"    Declares: {len(declared)} functions")
-            print(f"    Calls: {len(called)} functions")
-            print(f"    Undeclared: {len(undeclared)} functions")
-            print(f"    Order issues: {len(order_problems)} functions")
-            print(f"    Parameter issues: {len(parameter_problems)} functions")
-            print(f"    Unused: {len(unused)} functions")
+            self._print(f"\n  {filename}:")
+            self._print(f"    Declares: {len(declared)} functions")
+            self._print(f"    Calls: {len(called)} functions")
+            self._print(f"    Undeclared: {len(undeclared)} functions")
+            self._print(f"    Order issues: {len(order_problems)} functions")
+            self._print(f"    Parameter issues: {len(parameter_problems)} functions")
+            self._print(f"    Unused: {len(unused)} functions")
             
             if declared:
-                print(f"    Functions declared: {sorted(declared)}")
+                self._print(f"    Functions declared: {sorted(declared)}")
             
             if undeclared:
-                print(f"    ❌ Undeclared calls: {sorted(undeclared)}")
+                self._print(f"    ❌ Undeclared calls: {sorted(undeclared)}")
             
             if order_problems:
-                print(f"    ❌ Order issues: {order_problems}")
+                self._print(f"    ❌ Order issues: {order_problems}")
             
             if parameter_problems:
-                print(f"    ❌ Parameter issues: {parameter_problems}")
+                self._print(f"    ❌ Parameter issues: {parameter_problems}")
             
             if unused:
-                print(f"    ❌ Unused functions: {sorted(unused)}")
+                self._print(f"    ❌ Unused functions: {sorted(unused)}")
+
+
+class JsonLinesReporter:
+    """Stream findings as JSON Lines: one object per finding, then a summary object"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.counts = defaultdict(int)
+
+    def __call__(self, finding: Finding):
+        self.counts[finding.rule] += 1
+        record = {'type': 'finding', 'rule': finding.rule, 'file': finding.filename, 'line': finding.line,
+                  'column': finding.col + 1, 'function': finding.function, 'message': finding.message}
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+
+    def close(self, analyzer: 'JSFXFunctionAnalyzer'):
+        summary = {'type': 'summary', 'modules': len(analyzer.modules),
+                   'findings': {rule: self.counts[rule] for rule in RULE_DESCRIPTIONS}}
+        self.stream.write(json.dumps(summary) + '\n')
+        self.stream.flush()
+
+
+class SarifReporter:
+    """Stream findings as a SARIF 2.1.0 log (results are written as they arrive)"""
+
+    LEVELS = {RULE_UNDECLARED: 'error', RULE_ORDER: 'error', RULE_PARAMETERS: 'error', RULE_UNUSED: 'warning',
+              RULE_HOIST: 'note', RULE_LUT: 'note', RULE_MEMORY: 'warning',
+              RULE_CACHE: 'warning', RULE_DENORMAL: 'warning', RULE_UNREADABLE: 'error'}
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.result_count = 0
+        driver = {
+            'name': 'function_analyzer2',
+            'version': ANALYZER_VERSION,
+            'rules': [{'id': rule, 'shortDescription': {'text': text}} for rule, text in RULE_DESCRIPTIONS.items()],
+        }
+        header = json.dumps({
+            '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+            'version': '2.1.0',
+            'runs': [{'tool': {'driver': driver}, 'results': []}],
+        })
+        # Everything up to the (empty) results array; results are appended before closing it
+        self.stream.write(header[:header.rindex('[]') + 1])
+
+    def __call__(self, finding: Finding):
+        result = {
+            'ruleId': finding.rule,
+            'level': self.LEVELS[finding.rule],
+            'message': {'text': finding.message},
+            'locations': [{'physicalLocation': {
+                'artifactLocation': {'uri': Path(finding.filename).as_posix()},
+                'region': {'startLine': finding.line, 'startColumn': finding.col + 1},
+            }}],
+        }
+        self.stream.write(('\n' if self.result_count == 0 else ',\n') + json.dumps(result))
+        self.result_count += 1
+        self.stream.flush()
+
+    def close(self, analyzer: 'JSFXFunctionAnalyzer'):
+        self.stream.write('\n]}]}\n')
+        self.stream.flush()
+
+
+class StackSampler:
+    """Sample the Python call stack on a CPU-time timer and write collapsed stacks
+
+    The output has one `frame;frame;frame count` line per distinct stack, the input
+    format of flamegraph.pl and speedscope. Relies on SIGPROF, so it is only
+    available on Unix; worker processes started by --jobs are not sampled.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Dict[str, int] = defaultdict(int)
+        self._previous_handler = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        if not hasattr(signal, 'setitimer'):
+            raise RuntimeError("collapsed-stack sampling needs signal.setitimer (not available on this platform)")
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def write(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class PhaseProfiler:
+    """Record wall time, peak memory and work counters for each analysis phase
+
+    Counters are read from analyzer.stats before and after every phase, so each
+    phase reports the files, tokens, declarations, call sites and regex
+    evaluations it caused. Peak memory is measured with tracemalloc in this
+    process (reset at the start of each phase). A disabled profiler does nothing.
+    """
+
+    COUNTERS = ('files', 'tokens', 'declarations', 'call_sites', 'regex_evaluations')
+
+    def __init__(self, analyzer: 'JSFXFunctionAnalyzer', enabled: bool = True, slowest_modules: int = 10):
+        self.analyzer = analyzer
+        self.enabled = enabled
+        self.slowest_modules = slowest_modules
+        self.phases: List[Dict] = []
+        self._started_tracing = False
+        self._start_time = 0.0
+        self.total_seconds = 0.0
+
+    def start(self):
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_time = time.perf_counter()
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.total_seconds = time.perf_counter() - self._start_time
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        before = {counter: self.analyzer.stats[counter] for counter in self.COUNTERS}
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            self.phases.append({
+                'phase': name,
+                'seconds': seconds,
+                'peak_memory_bytes': peak,
+                'counts': {counter: self.analyzer.stats[counter] - before[counter] for counter in self.COUNTERS},
+            })
+
+    def to_dict(self) -> Dict:
+        slowest = sorted(self.analyzer.module_parse_times.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'type': 'profile',
+            'analyzer_version': ANALYZER_VERSION,
+            'python': sys.version.split()[0],
+            'total_seconds': self.total_seconds,
+            'peak_memory_bytes': max((phase['peak_memory_bytes'] for phase in self.phases), default=0),
+            'phases': self.phases,
+            'counts': {counter: self.analyzer.stats[counter] for counter in self.COUNTERS},
+            'slowest_modules': [{'module': module, 'parse_seconds': seconds}
+                                for module, seconds in slowest[:self.slowest_modules]],
+        }
+
+    def write_report(self, print_function: Callable[..., None]):
+        """Print the profile as a text table using print_function (e.g. analyzer._print)"""
+        profile = self.to_dict()
+        print_function("\n⏱️  PROFILE")
+        print_function("-" * 40)
+        print_function(f"{'Phase':<34}{'Time (ms)':>11}{'Peak (KiB)':>12}{'Files':>7}{'Tokens':>9}"
+                       f"{'Decls':>7}{'Calls':>7}{'Regex':>9}")
+        for phase in profile['phases']:
+            counts = phase['counts']
+            print_function(f"{phase['phase']:<34}{phase['seconds'] * 1000:>11.2f}"
+                           f"{phase['peak_memory_bytes'] / 1024:>12.1f}{counts['files']:>7}{counts['tokens']:>9}"
+                           f"{counts['declarations']:>7}{counts['call_sites']:>7}{counts['regex_evaluations']:>9}")
+        print_function(f"{'total':<34}{profile['total_seconds'] * 1000:>11.2f}"
+                       f"{profile['peak_memory_bytes'] / 1024:>12.1f}")
+        if profile['slowest_modules']:
+            print_function("\nSlowest modules to tokenize and parse:")
+            for entry in profile['slowest_modules']:
+                print_function(f"  {entry['parse_seconds'] * 1000:8.2f} ms  {entry['module']}")
+
+
+def _snapshot_mtimes(analyzer: JSFXFunctionAnalyzer) -> Dict[str, Tuple[int, int]]:
+    """Return {relative_path: (mtime_ns, size)} for every module file on disk"""
+    snapshot = {}
+    for file_path in analyzer.discover_files():
+        try:
+            stat = file_path.stat()
+        except OSError:
+            continue
+        snapshot[str(file_path.relative_to(analyzer.base_path))] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def parse_thresholds(values: List[str]) -> Dict[str, float]:
+    """Parse --max-increase values ('PCT' for every metric, or 'METRIC=PCT') into {metric or '*': percent}"""
+    thresholds = {}
+    for value in values:
+        metric, _, percent = value.rpartition('=')
+        metric = metric or '*'
+        if metric != '*' and metric not in REGRESSION_METRICS:
+            raise ValueError(f"unknown metric '{metric}' in --max-increase (choose from "
+                             f"{', '.join(REGRESSION_METRICS)})")
+        try:
+            thresholds[metric] = float(percent.rstrip('%'))
+        except ValueError:
+            raise ValueError(f"--max-increase expects a percentage, got '{value}'") from None
+    return thresholds
+
+
+def export_revision(repo_path: str, revision: str, destination: Path) -> Path:
+    """Extract a git revision of the tree at repo_path into destination and return it
+
+    git archive run from repo_path only includes that directory, with paths
+    relative to it, so the result lines up with the working tree.
+    """
+    try:
+        result = subprocess.run(['git', 'archive', '--format=tar', revision], cwd=repo_path, capture_output=True)
+    except OSError as e:
+        raise ValueError(f"cannot run git to export '{revision}': {e}") from None
+    if result.returncode != 0:
+        raise ValueError(f"'{revision}' is neither a directory nor a git revision of {repo_path}: "
+                         f"{result.stderr.decode(errors='replace').strip()}")
+    destination.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(fileobj=io.BytesIO(result.stdout)) as archive:
+        archive.extractall(destination, filter='data')
+    return destination
+
+
+def _print_findings(title: str, findings: Dict[str, List[str]], modules: Optional[Set[str]] = None):
+    for filename in sorted(findings):
+        if findings[filename] and (modules is None or filename in modules):
+            for finding in sorted(findings[filename]):
+                print(f"  {title} {filename}: {finding}")
+
+
+def watch_modules(analyzer: JSFXFunctionAnalyzer, interval: float = 0.5, jobs: int = 1):
+    """Keep the analyzer resident and re-analyze incrementally when files change
+
+    Polls file mtimes every `interval` seconds. Changed modules are re-parsed on
+    their own; undeclared calls and parameter mismatches are recomputed only for
+    the modules at or after them in processing order (before or after the
+    change, so deleting a module re-checks its importers), and order issues
+    only for the changed modules. The initial load reads and parses modules in `jobs`
+    worker processes. Runs until interrupted with Ctrl+C.
+    """
+    analyzer.load_modules(jobs=jobs)
+    analyzer.parse_imports()
+    analyzer.parse_function_declarations()
+    analyzer.parse_function_calls()
+    undeclared_calls = dict(analyzer.analyze_function_usage())
+    order_issues = dict(analyzer.check_intra_file_function_order())
+    parameter_issues = dict(analyzer.check_parameter_mismatches())
+    unused_functions = analyzer.check_unused_functions()
+    
+    def print_summary():
+        print(f"  {sum(map(len, undeclared_calls.values()))} undeclared, "
+              f"{sum(map(len, order_issues.values()))} order issues, "
+              f"{sum(map(len, parameter_issues.values()))} parameter mismatches, "
+              f"{sum(map(len, unused_functions.values()))} unused")
+    
+    print(f"Watching {len(analyzer.modules)} modules in {analyzer.base_path.resolve()} (Ctrl+C to stop)")
+    print_summary()
+    _print_findings("❌ UNDECLARED", undeclared_calls)
+    _print_findings("❌ ORDER", order_issues)
+    _print_findings("❌ PARAMETERS", parameter_issues)
+    
+    snapshot = _snapshot_mtimes(analyzer)
+    try:
+        while True:
+            time.sleep(interval)
+            current = _snapshot_mtimes(analyzer)
+            touched = {f for f in current.keys() | snapshot.keys() if current.get(f) != snapshot.get(f)}
+            snapshot = current
+            if not touched:
+                continue
+            
+            start = time.perf_counter()
+            previous_orders = analyzer.get_root_orders()
+            changed = {f for f in touched if analyzer.update_module(f)}
+            if not changed:
+                continue
+            affected = analyzer.modules_affected_by(changed, previous_orders)
+            removed = changed - set(analyzer.modules)
+            
+            for results in (undeclared_calls, parameter_issues):
+                for filename in affected | removed:
+                    results.pop(filename, None)
+            for filename in changed:
+                order_issues.pop(filename, None)
+            undeclared_calls.update(analyzer.analyze_function_usage(only=affected))
+            parameter_issues.update(analyzer.check_parameter_mismatches(only=affected))
+            order_issues.update(analyzer.check_intra_file_function_order(only=changed))
+            previous_unused = {(f, name) for f, names in unused_functions.items() for name in names}
+            unused_functions = analyzer.check_unused_functions()
+            current_unused = {(f, name) for f, names in unused_functions.items() for name in names}
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            
+            print(f"\n[{time.strftime('%H:%M:%S')}] Changed: {', '.join(sorted(changed))} "
+                  f"({len(affected)} modules re-checked in {elapsed_ms:.1f} ms)")
+            for filename in sorted(removed):
+                print(f"  Removed {filename}")
+            print_summary()
+            _print_findings("❌ UNDECLARED", undeclared_calls, affected)
+            _print_findings("❌ ORDER", order_issues, changed)
+            _print_findings("❌ PARAMETERS", parameter_issues, affected)
+            for filename, name in sorted(current_unused - previous_unused):
+                print(f"  ⚠️  NEWLY UNUSED {filename}: {name}")
+            for filename, name in sorted(previous_unused - current_unused):
+                print(f"  ✅ NOW USED {filename}: {name}")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
 
 
 def main():
-    if len(sys.argv) > 2:
-        print("Usage: python3 function_analyzer2.py [path_to_jsfx_directory]")
-        print("If no path is provided, the current directory will be used.")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Analyze JSFX function declarations and calls.")
+    parser.add_argument('path', nargs='?', default='.',
+                        help="path to the JSFX directory (default: current directory)")
+    parser.add_argument('--format', choices=['text', 'jsonl', 'sarif'], default='text',
+                        help="report format; jsonl and sarif stream findings as they are produced (default: text)")
+    parser.add_argument('-o', '--output',
+                        help="output file, or '-' for stdout (default: final_analysis.txt for text, stdout otherwise)")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="include per-module and per-call progress output")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f"do not read or write the {CACHE_DIR_NAME} analysis cache")
+    parser.add_argument('--cache-dir',
+                        help=f"analysis cache location (default: <path>/{CACHE_DIR_NAME})")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="read and parse modules in N worker processes (0 = one per CPU)")
+    parser.add_argument('--watch', action='store_true',
+                        help="stay resident and re-analyze incrementally whenever a module changes")
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help="polling interval in seconds for --watch (default: 0.5)")
+    parser.add_argument('--sections', action='store_true',
+                        help="report the per-section call graph and the estimated @sample cost per sample")
+    parser.add_argument('--hoisting', action='store_true',
+                        help="report per-sample work whose inputs only change when a slider moves")
+    parser.add_argument('--lut', action='store_true',
+                        help="report pure single-input functions on the @sample path that a lookup table could replace")
+    parser.add_argument('--memory', action='store_true',
+                        help="map the memory regions allocated from freemem and check indexing against them")
+    parser.add_argument('--gfx', action='store_true',
+                        help="count the draw primitives @gfx issues per frame and the draw paths that bypass the curve cache")
+    parser.add_argument('--caches', action='store_true',
+                        help="check that code writing a cache's inputs invalidates it, and flag redundant invalidations")
+    parser.add_argument('--denormals', action='store_true',
+                        help="find recursive @sample state (s = a*s + b*x) with no DC offset or flush to zero")
+    parser.add_argument('--inlining', action='store_true',
+                        help="report each section's code size with every function call inlined, and the call sites "
+                             "that add the most")
+    parser.add_argument('--slider-table', action='store_true',
+                        help=f"regenerate {SLIDER_TABLE_MODULE} from the slider lines of the root that imports it")
+    parser.add_argument('--compare', nargs='+', metavar='REV_OR_DIR',
+                        help="compare the static performance metrics of BEFORE and AFTER (git revisions of path, or "
+                             "directories; AFTER defaults to path) and report the change in each")
+    parser.add_argument('--max-increase', action='append', metavar='[METRIC=]PCT',
+                        help="with --compare, exit with status 1 when a metric grows by more than PCT percent; "
+                             f"repeat per metric ({', '.join(REGRESSION_METRICS)})")
+    parser.add_argument('--bundle', metavar='DIR',
+                        help="write each .jsfx root to DIR as a single file with imports inlined and unreachable "
+                             "functions removed")
+    parser.add_argument('--strip-comments', action='store_true',
+                        help="with --bundle, also remove comments and blank lines from section code")
+    parser.add_argument('--profile', action='store_true',
+                        help="record time, peak memory and work counts per phase in the report and a JSON sidecar")
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help="profile sidecar location (default: <output>.profile.json, or analysis_profile.json)")
+    parser.add_argument('--profile-dump', metavar='FILE',
+                        help="also write a cProfile dump (.prof) or collapsed stacks for flamegraphs "
+                             "(.collapsed/.folded); implies --profile")
+    args = parser.parse_args()
+    if args.profile_dump or args.profile_json:
+        args.profile = True
+    if args.strip_comments and not args.bundle:
+        parser.error("--strip-comments requires --bundle")
+    if args.max_increase and not args.compare:
+        parser.error("--max-increase requires --compare")
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes a BEFORE and an optional AFTER revision or directory")
+    if args.compare and args.format == 'sarif':
+        parser.error("--compare reports as text or jsonl")
+    
+    def reject_ignored(mode: str, dests: Tuple[str, ...]):
+        """Refuse flags a mode would silently drop"""
+        report_dests = ('sections', 'hoisting', 'lut', 'memory', 'gfx', 'caches', 'denormals', 'inlining',
+                        'slider_table', 'bundle', 'strip_comments', 'profile_json', 'profile_dump')
+        ignored = [f"--{dest.replace('_', '-')}" for dest in dests + report_dests if getattr(args, dest)]
+        if args.profile and not (args.profile_json or args.profile_dump):
+            ignored.append('--profile')
+        if ignored:
+            parser.error(f"{mode} cannot be combined with {', '.join(ignored)}")
+    
+    # Watch mode prints its own text summary and the comparison only runs the metrics in REGRESSION_METRICS
+    if args.watch:
+        reject_ignored('--watch', ('compare', 'output', 'verbose'))
+        if args.format != 'text':
+            parser.error("--watch reports as text")
+    if args.compare:
+        reject_ignored('--compare', ())
+    try:
+        thresholds = parse_thresholds(args.max_increase or [])
+    except ValueError as e:
+        parser.error(str(e))
     
     # Use provided path or default to current directory
-    base_path = sys.argv[1] if len(sys.argv) == 2 else "."
+    base_path = args.path
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
     if not os.path.exists(base_path):
         print(f"Error: Path '{base_path}' does not exist")
         sys.exit(1)
     
-    # Redirect output to final_analysis.txt
-    output_file = "final_analysis.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # Save original stdout
-        original_stdout = sys.stdout
-        # Redirect stdout to file
-        sys.stdout = f
+    if args.watch:
+        analyzer = JSFXFunctionAnalyzer(base_path, use_cache=not args.no_cache, cache_dir=args.cache_dir, verbose=False)
+        watch_modules(analyzer, args.interval, jobs)
+        return
+    
+    if args.compare:
+        specs = args.compare + [base_path] * (2 - len(args.compare))
+        stream = sys.stdout if not args.output or args.output == '-' else open(args.output, 'w', encoding='utf-8')
+        try:
+            with tempfile.TemporaryDirectory(prefix='jsfx_compare_') as workdir:
+                trees = []
+                for index, spec in enumerate(specs):
+                    try:
+                        trees.append(spec if os.path.isdir(spec) else
+                                     str(export_revision(base_path, spec, Path(workdir) / str(index))))
+                    except ValueError as e:
+                        parser.error(str(e))
+                log_stream = stream if args.format == 'text' else sys.stderr
+                print(f"Comparing {specs[0]} -> {specs[1]} in: {os.path.abspath(base_path)}", file=log_stream)
+                print("-" * 60, file=log_stream)
+                # The cache lives with the working tree, so exported revisions share it between runs
+                analyzer = JSFXFunctionAnalyzer(trees[0], use_cache=not args.no_cache,
+                                                cache_dir=args.cache_dir or os.path.join(base_path, CACHE_DIR_NAME),
+                                                verbose=args.verbose, output=log_stream)
+                analyzer.load_modules(jobs=jobs)
+                analyzer.parse_imports()
+                analyzer.parse_function_declarations()
+                analyzer.parse_function_calls()
+                comparison = analyzer.compare_with(trees[1], thresholds, (specs[0], specs[1]))
+            if args.format == 'jsonl':
+                stream.write(json.dumps({'type': 'regression', **comparison}) + '\n')
+            else:
+                analyzer.generate_regression_report(comparison)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        sys.exit(1 if comparison['regressions'] else 0)
+    
+    output_path = args.output or ("final_analysis.txt" if args.format == 'text' else '-')
+    stream = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+    try:
+        reporter = None
+        if args.format == 'jsonl':
+            reporter = JsonLinesReporter(stream)
+        elif args.format == 'sarif':
+            reporter = SarifReporter(stream)
+        # Structured formats keep the stream machine-readable; progress and warnings go to stderr
+        log_stream = stream if reporter is None else sys.stderr
         
-        print(f"Analyzing JSFX modules in: {os.path.abspath(base_path)}")
-        print("-" * 60)
+        print(f"Analyzing JSFX modules in: {os.path.abspath(base_path)}", file=log_stream)
+        print("-" * 60, file=log_stream)
         
-        analyzer = JSFXFunctionAnalyzer(base_path)
+        analyzer = JSFXFunctionAnalyzer(base_path, use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                        verbose=args.verbose, output=log_stream, on_finding=reporter)
+        profiler = PhaseProfiler(analyzer, enabled=args.profile)
+        
+        # Optional flamegraph input: a cProfile dump or sampled collapsed stacks
+        sampler = None
+        c_profiler = None
+        if args.profile_dump and Path(args.profile_dump).suffix in ('.collapsed', '.folded'):
+            sampler = StackSampler()
+            sampler.start()
+        elif args.profile_dump:
+            c_profiler = cProfile.Profile()
+            c_profiler.enable()
+        profiler.start()
         
         # Load and analyze modules
-        analyzer.load_modules()
-        analyzer.parse_imports()
-        analyzer.parse_function_declarations()
-        analyzer.parse_function_calls()
+        with profiler.phase('load_modules'):
+            analyzer.load_modules(jobs=jobs)
+        if analyzer.use_cache:
+            print(f"Analysis cache: {analyzer.cache_hits} hits, {analyzer.cache_misses} misses ({analyzer.cache_dir})", file=log_stream)
+        with profiler.phase('parse_imports'):
+            analyzer.parse_imports()
+        with profiler.phase('parse_function_declarations'):
+            analyzer.parse_function_declarations()
+        with profiler.phase('parse_function_calls'):
+            analyzer.parse_function_calls()
         
         # Analyze function usage
-        undeclared_calls = analyzer.analyze_function_usage()
+        with profiler.phase('analyze_function_usage'):
+            undeclared_calls = analyzer.analyze_function_usage()
         
         # Check intra-file function order
-        order_issues = analyzer.check_intra_file_function_order()
+        with profiler.phase('check_intra_file_function_order'):
+            order_issues = analyzer.check_intra_file_function_order()
         
         # Check parameter count mismatches
-        parameter_issues = analyzer.check_parameter_mismatches()
+        with profiler.phase('check_parameter_mismatches'):
+            parameter_issues = analyzer.check_parameter_mismatches()
         
         # Check for unused functions
-        unused_functions = analyzer.check_unused_functions()
+        with profiler.phase('check_unused_functions'):
+            unused_functions = analyzer.check_unused_functions()
+        
+        # Section call graph and @sample hot path
+        section_graphs = {}
+        if args.sections:
+            with profiler.phase('analyze_sections'):
+                section_graphs = analyzer.analyze_sections()
+        
+        # Per-sample work that could move to @slider/@block
+        hoist_candidates = None
+        if args.hoisting:
+            with profiler.phase('check_hoisting_candidates'):
+                hoist_candidates = analyzer.check_hoisting_candidates()
+        
+        # Per-sample functions a lookup table could replace
+        lut_candidates = None
+        if args.lut:
+            with profiler.phase('check_lut_candidates'):
+                lut_candidates = analyzer.check_lut_candidates()
+        
+        # Memory region map
+        memory_issues = None
+        if args.memory:
+            with profiler.phase('check_memory_layout'):
+                memory_issues = analyzer.check_memory_layout()
+        
+        # Dirty-flag cache invalidation
+        cache_issues = None
+        if args.caches:
+            with profiler.phase('check_cache_invalidation'):
+                cache_issues = analyzer.check_cache_invalidation()
+        
+        # Recursive state that can decay into denormals
+        denormal_issues = None
+        if args.denormals:
+            with profiler.phase('check_denormal_risk'):
+                denormal_issues = analyzer.check_denormal_risk()
+        
+        # Draw calls per @gfx frame
+        render_summaries = None
+        if args.gfx:
+            with profiler.phase('render_summary'):
+                render_summaries = [analyzer.render_summary(root) for root in analyzer.get_entry_roots()]
+        
+        # Code size after inlining
+        inlining_summaries = None
+        if args.inlining:
+            with profiler.phase('inlining_summary'):
+                inlining_summaries = [analyzer.inlining_summary(root) for root in analyzer.get_entry_roots()]
+        
+        # Precomputed slider metadata
+        slider_tables = None
+        if args.slider_table:
+            with profiler.phase('write_slider_tables'):
+                try:
+                    slider_tables = analyzer.write_slider_tables()
+                except ValueError as e:
+                    parser.error(str(e))
+        
+        # Single-file export
+        bundles = None
+        if args.bundle:
+            with profiler.phase('write_bundles'):
+                try:
+                    bundles = analyzer.write_bundles(args.bundle, args.strip_comments)
+                except ValueError as e:
+                    parser.error(str(e))
         
         # Generate report
-        analyzer.generate_report(undeclared_calls, order_issues, parameter_issues, unused_functions)
+        with profiler.phase('generate_report'):
+            if reporter is None:
+                analyzer.generate_report(undeclared_calls, order_issues, parameter_issues, unused_functions)
+                if section_graphs:
+                    analyzer.generate_section_report(section_graphs)
+                if hoist_candidates is not None:
+                    analyzer.generate_hoisting_report(hoist_candidates)
+                if lut_candidates is not None:
+                    analyzer.generate_lut_report(lut_candidates)
+                if memory_issues is not None:
+                    analyzer.generate_memory_report(memory_issues)
+                if cache_issues is not None:
+                    analyzer.generate_cache_report(cache_issues)
+                if denormal_issues is not None:
+                    analyzer.generate_denormal_report(denormal_issues)
+                if render_summaries is not None:
+                    analyzer.generate_gfx_report(render_summaries)
+                if inlining_summaries is not None:
+                    analyzer.generate_inlining_report(inlining_summaries)
+                if slider_tables is not None:
+                    analyzer.generate_slider_table_report(slider_tables)
+                if bundles is not None:
+                    analyzer.generate_bundle_report(bundles)
+            elif isinstance(reporter, JsonLinesReporter):
+                for graph in section_graphs.values():
+                    stream.write(json.dumps({'type': 'sections', **analyzer.section_summary(graph)}) + '\n')
+                if memory_issues is not None:
+                    for root in analyzer.get_entry_roots():
+                        stream.write(json.dumps({'type': 'memory', **analyzer.memory_summary(root)}) + '\n')
+                if cache_issues is not None:
+                    for root in analyzer.get_entry_roots():
+                        stream.write(json.dumps({'type': 'caches', **analyzer.cache_summary(root)}) + '\n')
+                if denormal_issues is not None:
+                    for root in analyzer.get_entry_roots():
+                        stream.write(json.dumps({'type': 'denormals', **analyzer.denormal_summary(root)}) + '\n')
+                for summary in render_summaries or ():
+                    stream.write(json.dumps({'type': 'gfx', **summary}) + '\n')
+                for summary in inlining_summaries or ():
+                    stream.write(json.dumps({'type': 'inlining', **summary}) + '\n')
+                for summary in slider_tables or ():
+                    stream.write(json.dumps({'type': 'slider_table', **summary}) + '\n')
+                for summary in bundles or ():
+                    stream.write(json.dumps({'type': 'bundle', **summary}) + '\n')
+        
+        profiler.stop()
+        if sampler is not None:
+            sampler.stop()
+            sampler.write(args.profile_dump)
+        if c_profiler is not None:
+            c_profiler.disable()
+            c_profiler.dump_stats(args.profile_dump)
         
-        # Restore original stdout
-        sys.stdout = original_stdout
+        if args.profile:
+            if reporter is None:
+                profiler.write_report(analyzer._print)
+            elif isinstance(reporter, JsonLinesReporter):
+                stream.write(json.dumps(profiler.to_dict()) + '\n')
+            profile_path = args.profile_json or (f"{output_path}.profile.json" if output_path != '-'
+                                                 else "analysis_profile.json")
+            with open(profile_path, 'w', encoding='utf-8') as f:
+                json.dump(profiler.to_dict(), f, indent=2)
+            print(f"Profile written to: {profile_path}", file=log_stream)
+            if args.profile_dump:
+                print(f"Profile dump written to: {args.profile_dump}", file=log_stream)
+        
+        if reporter is not None:
+            reporter.close(analyzer)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
     
-    print(f"Analysis complete! Results written to: {output_file}")
-
+    if output_path != '-':
+        print(f"Analysis complete! Results written to: {output_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+JSFX Language Server
+
+A Language Server Protocol server on stdin/stdout built on the
+JSFXFunctionAnalyzer of function_analyzer2.py. The workspace is parsed
+once and kept resident; an edit replaces the edited document's content
+and re-tokenizes that module alone, so each request is answered from the
+shared symbol index instead of a full analyzer run.
+
+Usage: python3 jsfx_language_server.py [--path DIR] [--no-cache] [--log FILE]
+
+Example (the editor starts the server and talks to it over stdio):
+    Neovim:  vim.lsp.start({ name = 'jsfx', cmd = { 'python3', '/path/to/jsfx_language_server.py' },
+                             root_dir = vim.fs.root(0, { 'Composure.jsfx' }) })
+    VS Code: any generic LSP client extension, with the same command and
+             the document selector **/*.{jsfx,jsfx-inc}
+
+Features:
+- Go to definition: the definition in effect for the call under its root's
+  processing order (the first one declared if the call comes before it)
+- Find references: every call site of a user function, plus its
+  definitions when the client asks for the declaration
+- Hover: parameter count, definition line and location, call-site count,
+  and the argument count of the call under the cursor
+- Diagnostics for undeclared calls and argument count mismatches, published
+  for the edited document and every module processed after it
+- Full document sync; unsaved buffers are analyzed as they stand, and
+  closing a document goes back to the file on disk
+- --log FILE records how long each message took to handle
+"""
+
+import argparse
+import json
+import sys
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+from urllib.request import url2pathname
+
+from function_analyzer2 import (RULE_PARAMETERS, RULE_UNDECLARED, TOKEN_IDENT, Finding, FunctionSymbol,
+                                JSFXFunctionAnalyzer, SarifReporter, Token)
+
+
+SERVER_NAME = 'jsfx-language-server'
+JSFX_SUFFIXES = ('.jsfx', '.jsfx-inc')
+DIAGNOSTIC_SEVERITIES = {'error': 1, 'warning': 2, 'note': 3}  # SARIF level -> LSP DiagnosticSeverity
+
+# JSON-RPC error codes used by the protocol
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+SERVER_NOT_INITIALIZED = -32002
+
+
+def read_message(stream: BinaryIO) -> Optional[Dict]:
+    """Read one Content-Length framed JSON-RPC message, or None at end of input"""
+    length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            break
+        name, _, value = header.decode('ascii').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    if length is None:
+        return None
+    return json.loads(stream.read(length).decode('utf-8'))
+
+
+def write_message(stream: BinaryIO, message: Dict):
+    """Write one JSON-RPC message with its Content-Length header"""
+    body = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+    stream.flush()
+
+
+class JSFXLanguageServer:
+    """Answers LSP requests from one resident JSFXFunctionAnalyzer
+
+    Positions are converted between the protocol's zero-based lines and the
+    analyzer's one-based ones; columns are zero-based on both sides.
+    """
+
+    def __init__(self, output: BinaryIO, default_root: str = '.', use_cache: bool = True,
+                 log: Optional[BinaryIO] = None):
+        self.output = output
+        self.default_root = default_root
+        self.use_cache = use_cache
+        self.log = log
+        self.analyzer: Optional[JSFXFunctionAnalyzer] = None
+        self.open_documents: Set[str] = set()  # modules whose content comes from the editor
+        self.published: Set[str] = set()  # modules last published with at least one diagnostic
+        self.shutdown_requested = False
+        self.exited = False
+        self.requests = {
+            'initialize': self.initialize,
+            'shutdown': self.shutdown,
+            'textDocument/definition': self.definition,
+            'textDocument/references': self.references,
+            'textDocument/hover': self.hover,
+        }
+        self.notifications = {
+            'initialized': self.initialized,
+            'exit': self.exit,
+            'textDocument/didOpen': self.did_open,
+            'textDocument/didChange': self.did_change,
+            'textDocument/didClose': self.did_close,
+            'workspace/didChangeWatchedFiles': self.did_change_watched_files,
+        }
+
+    def serve(self, stream: BinaryIO) -> int:
+        """Handle messages until exit or end of input; returns the process exit code"""
+        while not self.exited:
+            message = read_message(stream)
+            if message is None:
+                break
+            self.handle(message)
+        return 0 if self.shutdown_requested else 1
+
+    def handle(self, message: Dict):
+        """Dispatch one request or notification and send the response, if any"""
+        method = message.get('method')
+        params = message.get('params') or {}
+        start = time.perf_counter()
+        if 'id' not in message:
+            handler = self.notifications.get(method)
+            if handler is not None and (self.analyzer is not None or method == 'exit'):
+                try:
+                    handler(params)
+                except Exception as e:
+                    self._log(f"{method} failed: {e!r}")
+        else:
+            response = {'jsonrpc': '2.0', 'id': message['id']}
+            handler = self.requests.get(method)
+            if handler is None:
+                response['error'] = {'code': METHOD_NOT_FOUND, 'message': f"unsupported method {method}"}
+            elif self.analyzer is None and method != 'initialize':
+                response['error'] = {'code': SERVER_NOT_INITIALIZED, 'message': "initialize has not been called"}
+            else:
+                try:
+                    response['result'] = handler(params)
+                except Exception as e:
+                    response['error'] = {'code': INTERNAL_ERROR, 'message': f"{method} failed: {e!r}"}
+            write_message(self.output, response)
+        self._log(f"{method} {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    # Lifecycle
+
+    def initialize(self, params: Dict) -> Dict:
+        """Load and parse every module of the workspace once"""
+        root = self.default_root
+        if params.get('rootUri'):
+            root = self._uri_path(params['rootUri'])
+        elif params.get('rootPath'):
+            root = params['rootPath']
+        start = time.perf_counter()
+        # Progress and warnings go to stderr; stdout carries the protocol
+        self.analyzer = JSFXFunctionAnalyzer(str(Path(root).resolve()), use_cache=self.use_cache, verbose=False,
+                                             output=sys.stderr)
+        self.analyzer.load_modules()
+        self.analyzer.parse_imports()
+        self.analyzer.parse_function_declarations()
+        self.analyzer.parse_function_calls()
+        self.analyzer.get_symbol_index()
+        # Buffers change on every keystroke; only files on disk belong in the analysis cache
+        self.analyzer.use_cache = False
+        self._log(f"Indexed {len(self.analyzer.modules)} modules in {self.analyzer.base_path} "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return {
+            'capabilities': {
+                'textDocumentSync': {'openClose': True, 'change': 1},  # full content on every change
+                'definitionProvider': True,
+                'referencesProvider': True,
+                'hoverProvider': True,
+            },
+            'serverInfo': {'name': SERVER_NAME},
+        }
+
+    def initialized(self, params: Dict):
+        """Publish the diagnostics of the whole workspace"""
+        self._publish_diagnostics(set(self.analyzer.modules))
+
+    def shutdown(self, params: Dict) -> None:
+        self.shutdown_requested = True
+        return None
+
+    def exit(self, params: Dict):
+        self.exited = True
+
+    # Document synchronization
+
+    def did_open(self, params: Dict):
+        document = params['textDocument']
+        filename = self._filename(document['uri'])
+        if filename is None:
+            return
+        self.open_documents.add(filename)
+        previous_orders = self.analyzer.get_root_orders()
+        if self.analyzer.set_module_content(filename, document['text']):
+            self._publish_diagnostics({filename}, previous_orders)
+
+    def did_change(self, params: Dict):
+        filename = self._filename(params['textDocument']['uri'])
+        if filename is None or not params['contentChanges']:
+            return
+        previous_orders = self.analyzer.get_root_orders()
+        if self.analyzer.set_module_content(filename, params['contentChanges'][-1]['text']):
+            self._publish_diagnostics({filename}, previous_orders)
+
+    def did_close(self, params: Dict):
+        """Drop the editor's copy of a document in favour of the file on disk"""
+        filename = self._filename(params['textDocument']['uri'])
+        if filename is None:
+            return
+        self.open_documents.discard(filename)
+        previous_orders = self.analyzer.get_root_orders()
+        if self._reload(filename):
+            self._publish_diagnostics({filename}, previous_orders)
+
+    def did_change_watched_files(self, params: Dict):
+        """Pick up files changed outside the editor (a git checkout, say); open documents keep their buffer"""
+        changed = set()
+        previous_orders = self.analyzer.get_root_orders()
+        for change in params.get('changes', ()):
+            filename = self._filename(change['uri'])
+            if filename is not None and filename not in self.open_documents and self._reload(filename):
+                changed.add(filename)
+        if changed:
+            self._publish_diagnostics(changed, previous_orders)
+
+    # Requests
+
+    def definition(self, params: Dict) -> Optional[List[Dict]]:
+        """Go to the definition in effect for the function under the cursor"""
+        found = self._function_at(params)
+        if found is None:
+            return None
+        filename, token = found
+        symbol = self._visible_definition(token.value, filename)
+        return [self._location(symbol.filename, symbol.line, symbol.col, len(symbol.name))] if symbol else None
+
+    def references(self, params: Dict) -> Optional[List[Dict]]:
+        """List every call site of the function under the cursor"""
+        found = self._function_at(params)
+        if found is None:
+            return None
+        _, token = found
+        index = self.analyzer.get_symbol_index()
+        locations = []
+        if params.get('context', {}).get('includeDeclaration'):
+            locations += [self._location(symbol.filename, symbol.line, symbol.col, len(symbol.name))
+                          for symbol in index.definitions.get(token.value, ())]
+        locations += [self._location(call.filename, call.line, call.col, len(token.value))
+                      for call in index.find_callers(token.value)]
+        return locations
+
+    def hover(self, params: Dict) -> Optional[Dict]:
+        """Describe the function under the cursor: signature line, parameter count and call sites"""
+        found = self._function_at(params, builtins=True)
+        if found is None:
+            return None
+        filename, token = found
+        name = token.value
+        span = self._range(token.line, token.col, len(name))
+        if name in self.analyzer.builtin_functions:
+            return {'contents': {'kind': 'markdown', 'value': f"`{name}` is a JSFX built-in"}, 'range': span}
+        symbol = self._visible_definition(name, filename)
+        if symbol is None:
+            return {'contents': {'kind': 'markdown', 'value': f"`{name}` is not declared before this module"},
+                    'range': span}
+        index = self.analyzer.get_symbol_index()
+        signature = self.analyzer.modules[symbol.filename].split('\n')[symbol.line - 1].strip()
+        details = [f"{symbol.param_count} parameter{'s' if symbol.param_count != 1 else ''}",
+                   f"declared at {symbol.filename}:{symbol.line}",
+                   f"{len(index.find_callers(name))} call site{'s' if len(index.find_callers(name)) != 1 else ''}"]
+        if len(index.definitions.get(name, ())) > 1:
+            details.append(f"{len(index.definitions[name])} definitions")
+        call = next((call for call in index.calls_by_module.get(filename, ())
+                     if (call.line, call.col) == (token.line, token.col)), None)
+        if call is not None:
+            mismatch = " ❌" if call.arg_count != symbol.param_count else ""
+            details.append(f"this call passes {call.arg_count}{mismatch}")
+        value = f"```jsfx\n{signature}\n```\n{' · '.join(details)}"
+        return {'contents': {'kind': 'markdown', 'value': value}, 'range': span}
+
+    # Helpers
+
+    def _reload(self, filename: str) -> bool:
+        """Re-read a module from disk; True if its content changed or it started or stopped failing to decode"""
+        had_error = filename in self.analyzer.read_errors
+        changed = self.analyzer.update_module(filename)
+        return changed or had_error or filename in self.analyzer.read_errors
+
+    def _publish_diagnostics(self, changed: Set[str], previous_orders: Optional[Dict[str, List[str]]] = None):
+        """Re-check the changed modules and everything processed after them, and publish the results
+
+        `previous_orders` are the root orders from before the change (see
+        modules_affected_by); removed modules get their diagnostics cleared.
+        """
+        analyzer = self.analyzer
+        checked = analyzer.modules_affected_by(changed, previous_orders)
+        affected = checked | changed
+        findings: List[Finding] = []
+        analyzer.on_finding = findings.append
+        try:
+            analyzer.analyze_function_usage(only=checked)
+            analyzer.check_parameter_mismatches(only=checked)
+        finally:
+            analyzer.on_finding = None
+        findings += [analyzer.read_errors[filename] for filename in sorted(affected)
+                     if filename in analyzer.read_errors]
+
+        diagnostics = defaultdict(list)
+        for finding in findings:
+            length = len(finding.function) if finding.rule in (RULE_UNDECLARED, RULE_PARAMETERS) else 1
+            diagnostics[finding.filename].append({
+                'range': self._range(finding.line, finding.col, length),
+                'severity': DIAGNOSTIC_SEVERITIES[SarifReporter.LEVELS.get(finding.rule, 'warning')],
+                'code': finding.rule,
+                'source': SERVER_NAME,
+                'message': finding.message,
+            })
+        for filename in sorted(affected):
+            if not diagnostics[filename] and filename not in self.published:
+                continue
+            write_message(self.output, {'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                                        'params': {'uri': self._uri(filename), 'diagnostics': diagnostics[filename]}})
+            if diagnostics[filename]:
+                self.published.add(filename)
+            else:
+                self.published.discard(filename)
+
+    def _function_at(self, params: Dict, builtins: bool = False) -> Optional[Tuple[str, Token]]:
+        """Return (filename, identifier token) under the cursor when it names a function"""
+        filename = self._filename(params['textDocument']['uri'])
+        if filename is None or filename not in self.analyzer.modules:
+            return None
+        token = self._token_at(filename, params['position']['line'] + 1, params['position']['character'])
+        if token is None:
+            return None
+        index = self.analyzer.get_symbol_index()
+        if token.value in index.definitions or token.value in index.callers:
+            return filename, token
+        if builtins and token.value in self.analyzer.builtin_functions:
+            return filename, token
+        return None
+
+    def _token_at(self, filename: str, line: int, character: int) -> Optional[Token]:
+        """Return the identifier token covering (line, character), including the position just past its end"""
+        tokens = self.analyzer.get_tokens(filename)
+        position = bisect_right(tokens, (line, character), key=lambda token: (token.line, token.col)) - 1
+        if position < 0:
+            return None
+        token = tokens[position]
+        if token.kind != TOKEN_IDENT or token.line != line or character > token.col + len(token.value):
+            return None
+        return token
+
+    def _visible_definition(self, name: str, filename: str) -> Optional[FunctionSymbol]:
+        index = self.analyzer.get_symbol_index()
+        return index.definition_visible_from(name, filename) or index.find_definition(name)
+
+    def _filename(self, uri: str) -> Optional[str]:
+        """Return the module name of a document URI, or None outside the workspace or for other file types"""
+        path = Path(self._uri_path(uri))
+        if not path.name.endswith(JSFX_SUFFIXES):
+            return None
+        try:
+            return str(path.resolve().relative_to(self.analyzer.base_path))
+        except ValueError:
+            return None
+
+    def _uri(self, filename: str) -> str:
+        return (self.analyzer.base_path / filename).as_uri()
+
+    @staticmethod
+    def _uri_path(uri: str) -> str:
+        return url2pathname(unquote(urlparse(uri).path))
+
+    def _location(self, filename: str, line: int, col: int, length: int) -> Dict:
+        return {'uri': self._uri(filename), 'range': self._range(line, col, length)}
+
+    @staticmethod
+    def _range(line: int, col: int, length: int) -> Dict:
+        return {'start': {'line': line - 1, 'character': col}, 'end': {'line': line - 1, 'character': col + length}}
+
+    def _log(self, message: str):
+        if self.log is not None:
+            self.log.write(f"[{time.strftime('%H:%M:%S')}] {message}\n".encode('utf-8'))
+            self.log.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Language server for JSFX modules, speaking LSP over stdio.")
+    parser.add_argument('--path', default='.',
+                        help="workspace to index when the client sends no root (default: current directory)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="do not read or write the analysis cache while indexing the workspace")
+    parser.add_argument('--log', metavar='FILE', help="append the handling time of every message to FILE")
+    args = parser.parse_args()
+
+    log = open(args.log, 'ab') if args.log else None
+    try:
+        server = JSFXLanguageServer(sys.stdout.buffer, args.path, use_cache=not args.no_cache, log=log)
+        code = server.serve(sys.stdin.buffer)
+    finally:
+        if log is not None:
+            log.close()
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()